@@ -0,0 +1,64 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from distance_kernels import METRICS, STORAGES, VectorStore  # noqa: E402
+
+
+def per_edge(vectors, query, positions):
+    # the loop the batched kernels replace, one Python call per edge
+    distances = []
+    for position in positions:
+        diff = vectors[position] - query
+        distances.append(float(np.dot(diff, diff)))
+    return distances
+
+
+def time_blocks(fn, blocks, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for block in blocks:
+            fn(block)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the batched distance kernels at graph search degrees.")
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--degrees", type=int, nargs="+", default=[32, 48, 64])
+    parser.add_argument("--blocks", type=int, default=2000, help="neighbour blocks scored per measurement")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.vectors, args.dim)).astype(np.float32)
+    query = rng.normal(size=args.dim).astype(np.float32)
+    stores = {(metric, storage): VectorStore(vectors, metric=metric, storage=storage)
+              for metric in METRICS for storage in STORAGES}
+
+    print(f"{'kernel':<20}" + "".join(f"{f'd={degree} (ns)':>14}" for degree in args.degrees))
+    rows = {"per edge l2": [], **{f"{metric} {storage}": [] for metric, storage in stores}}
+    for degree in args.degrees:
+        blocks = [rng.integers(args.vectors, size=degree) for _ in range(args.blocks)]
+        distances = args.blocks * degree
+        rows["per edge l2"].append(time_blocks(lambda b: per_edge(vectors, query, b), blocks, args.repeat) / distances)
+        for (metric, storage), store in stores.items():
+            prepared = store.prepare(query)
+            elapsed = time_blocks(lambda b: store.distances(prepared, b), blocks, args.repeat)
+            rows[f"{metric} {storage}"].append(elapsed / distances)
+    for name, timings in rows.items():
+        print(f"{name:<20}" + "".join(f"{t * 1e9:>14.1f}" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
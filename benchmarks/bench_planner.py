@@ -0,0 +1,97 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ung_search import PLAN_GRAPH, PLAN_SCAN, CostModel, SearchStats, UNGIndex  # noqa: E402
+
+
+def synthetic_index(num_groups=24, max_group_size=4000, dim=32, degree=12, seed=0):
+    """
+    Groups of geometrically spread sizes, each labelled {0, group + 1}, with a k-nearest-neighbour graph inside every
+    group, so a query on one label hits one group and a query on label 0 hits them all.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = np.unique(np.geomspace(2, max_group_size, num_groups).astype(int))
+    vectors, vector_groups, neighbors, group_entries = [], [], [], []
+    offset = 0
+    for group, size in enumerate(sizes):
+        members = rng.normal(size=(size, dim)) + rng.uniform(-2, 2, size=dim)
+        distances = ((members[:, None] - members[None]) ** 2).sum(axis=-1) if size <= 1500 else None
+        for i in range(size):
+            row = distances[i] if distances is not None else ((members - members[i]) ** 2).sum(axis=1)
+            nearest = np.argsort(row)[1:degree + 1]
+            neighbors.append((nearest + offset).tolist())
+        vectors.append(members)
+        vector_groups.extend([group] * size)
+        group_entries.append([offset + int(np.argmin(((members - members.mean(axis=0)) ** 2).sum(axis=1)))])
+        offset += size
+    label_sets = [{0, group + 1} for group in range(len(sizes))]
+    return UNGIndex(np.concatenate(vectors), vector_groups, label_sets, neighbors, group_entries)
+
+
+def time_search(index, query, labels, strategy, beam_width, repeat):
+    timings = []
+    stats = None
+    for _ in range(repeat):
+        stats = SearchStats()
+        start = time.perf_counter()
+        index.search(query, labels, k=10, beam_width=beam_width, stats=stats, strategy=strategy)
+        timings.append(time.perf_counter() - start)
+    return min(timings), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the query planner's cost model on a synthetic UNG.")
+    parser.add_argument("--output", default=None, help="write the fitted cost model to this JSON file")
+    parser.add_argument("--beam-width", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=8, help="queries per group")
+    args = parser.parse_args()
+
+    index = synthetic_index()
+    rng = np.random.default_rng(1)
+    scan_rows, graph_rows, expansions = [], [], []
+    for group, size in enumerate(index.group_sizes):
+        members = index.vectors[index.group_members[group]]
+        for _ in range(args.queries):
+            query = members[rng.integers(size)] + rng.normal(scale=.1, size=members.shape[1])
+            scan_time, _ = time_search(index, query, [group + 1], PLAN_SCAN, args.beam_width, args.repeat)
+            graph_time, stats = time_search(index, query, [group + 1], PLAN_GRAPH, args.beam_width, args.repeat)
+            scan_rows.append((size, scan_time))
+            graph_rows.append((stats.visited_vectors, stats.visited_groups, graph_time))
+            expansions.append(stats.visited_vectors / (args.beam_width * np.log2(size + 1)))
+    for _ in range(args.queries):
+        # label 0 qualifies every group, which separates the cost of crossing groups from the fixed cost
+        query = index.vectors[rng.integers(len(index))]
+        graph_time, stats = time_search(index, query, [0], PLAN_GRAPH, args.beam_width, args.repeat)
+        graph_rows.append((stats.visited_vectors, stats.visited_groups, graph_time))
+
+    scan = np.array(scan_rows, dtype=float)
+    scan_per_vector, scan_fixed = np.polyfit(scan[:, 0], scan[:, 1], 1)
+    graph = np.array(graph_rows, dtype=float)
+    design = np.column_stack([np.ones(len(graph)), graph[:, 0], graph[:, 1]])
+    (graph_fixed, visit_per_vector, group_overhead), *_ = np.linalg.lstsq(design, graph[:, 2], rcond=None)
+    model = CostModel(scan_fixed=max(scan_fixed, 0.), scan_per_vector=max(scan_per_vector, 0.),
+                      graph_fixed=max(graph_fixed, 0.), visit_per_vector=max(visit_per_vector, 0.),
+                      group_overhead=max(group_overhead, 0.), expansion=float(np.median(expansions)))
+
+    print(f"{'parameter':<20}{'value':>14}")
+    for field, value in model.as_dict().items():
+        print(f"{field:<20}{value:>14.3e}")
+    print()
+    print(f"{'group size':>10}{'scan (us)':>12}{'graph (us)':>12}{'planned':>10}")
+    for group, size in enumerate(index.group_sizes):
+        plan = index.plan([group + 1], beam_width=args.beam_width, cost_model=model)
+        print(f"{size:>10}{plan.costs[PLAN_SCAN] * 1e6:>12.1f}{plan.costs[PLAN_GRAPH] * 1e6:>12.1f}{plan.strategy:>10}")
+    if args.output is not None:
+        model.write(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# each probe runs in a fresh interpreter, so module caches from previous imports never hide the cost
+PROBES = {
+    "lng_data": "import lng_data",
+    "graph_util": "import graph_util",
+    "presentation": "import presentation",
+    "presentation + icons": "import presentation; presentation.document_icon(); presentation.embedding_icon()",
+}
+
+PROBE_TEMPLATE = """
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def time_probe(code):
+    result = subprocess.run([sys.executable, "-c", PROBE_TEMPLATE.format(code=code)],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of the deck's modules.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'probe':<24}{'min (ms)':>12}{'median (ms)':>14}")
+    for name, code in PROBES.items():
+        timings = [time_probe(code) for _ in range(args.repeat)]
+        if any(t is None for t in timings):
+            print(f"{name:<24}{'failed':>12}{'':>14}")
+            continue
+        print(f"{name:<24}{min(timings) * 1000:>12.1f}{statistics.median(timings) * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import hashlib
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from manim import config, tempconfig  # noqa: E402
+
+from presentation import LNGDemonstration  # noqa: E402
+
+SECTIONS = ("section_1", "section_2", "section_3", "query_example")
+DEFAULT_BASELINE = ROOT / "benchmarks" / "frame_baselines.json"
+
+
+class RegressionDeck(LNGDemonstration):
+    """
+    The deck rendered without writing any movie, hashing the last frame of every play, and every every-th frame when
+    every is set, and recording the wall time and the peak traced memory of every section. Sections left out of
+    sections still run, with their animations skipped, since the later sections build on what they return.
+    """
+
+    def __init__(self, *args, sections=SECTIONS, every=0, trace_memory=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sections = set(sections)
+        self.every = every
+        self.trace_memory = trace_memory
+        self.results = {}
+        self._section = None
+        self._frames = 0
+        self._last_frame = None
+        self._add_frame = self.renderer.add_frame
+        self.renderer.add_frame = self._hook_frame
+
+    def _hook_frame(self, frame, num_frames=1):
+        self._add_frame(frame, num_frames)
+        if self._section is None or self.renderer.skip_animations:
+            return
+        first = self._frames
+        self._frames += num_frames
+        self._last_frame = frame
+        if self.every and first // self.every != self._frames // self.every:
+            self._record_frame(frame)
+
+    def _record_frame(self, frame):
+        result = self.results[self._section]
+        result["frames"].append([result["plays"], self._frames, hashlib.sha1(frame.tobytes()).hexdigest()])
+
+    def play(self, *args, **kwargs):
+        super().play(*args, **kwargs)
+        if self._section is not None and self._last_frame is not None:
+            self._record_frame(self._last_frame)
+        self._last_frame = None
+        if self._section is not None:
+            self.results[self._section]["plays"] += 1
+
+    def _run_section(self, name, method, *args, **kwargs):
+        renderer = self.renderer
+        skipping = renderer._original_skipping_status
+        renderer._original_skipping_status = renderer.skip_animations = skipping or name not in self.sections
+        self.results[name] = {"rendered": name in self.sections, "plays": 0, "frame_count": 0, "frames": []}
+        self._section, self._frames = name, 0
+        if self.trace_memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            result = self.results[name]
+            result["seconds"] = time.perf_counter() - start
+            result["frame_count"] = self._frames
+            if self.trace_memory:
+                result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self._section = None
+            renderer._original_skipping_status = renderer.skip_animations = skipping
+
+    def section_1(self, *args, **kwargs):
+        return self._run_section("section_1", super().section_1, *args, **kwargs)
+
+    def section_2(self, *args, **kwargs):
+        return self._run_section("section_2", super().section_2, *args, **kwargs)
+
+    def section_3(self, *args, **kwargs):
+        return self._run_section("section_3", super().section_3, *args, **kwargs)
+
+    def query_example(self, *args, **kwargs):
+        return self._run_section("query_example", super().query_example, *args, **kwargs)
+
+    def _save_slides(self, *args, **kwargs):
+        # nothing was written to export
+        pass
+
+
+def compare(results, baseline, slowdown):
+    """One row per section, and whether every hashed frame matched its baseline."""
+    rows, matched = [], True
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is not None and result["rendered"] != base["rendered"]:
+            base = None
+        mismatch = None
+        if base is not None and result["rendered"]:
+            if base["frames"] != result["frames"]:
+                # the first play whose frames differ, or the first one missing on either side
+                pairs = zip(base["frames"], result["frames"])
+                mismatch = next((b[0] for b, r in pairs if b != r),
+                                min(len(base["frames"]), len(result["frames"])))
+                matched = False
+        ratio = result["seconds"] / base["seconds"] if base is not None and base["seconds"] > 0 else None
+        status = ("skipped" if not result["rendered"] else "new" if base is None else
+                  f"differs at play {mismatch}" if mismatch is not None else
+                  "slower" if ratio is not None and ratio > slowdown else "ok")
+        rows.append((name, result, base, ratio, status))
+    return rows, matched
+
+
+def print_table(rows):
+    print(f"{'section':<16}{'plays':>7}{'frames':>8}{'hashed':>8}{'time (s)':>10}{'base (s)':>10}{'ratio':>8}"
+          f"{'peak (MB)':>11}{'base (MB)':>11}  status")
+    for name, result, base, ratio, status in rows:
+        base_seconds = f"{base['seconds']:.2f}" if base is not None else "-"
+        peak = f"{result['peak_bytes'] / 2 ** 20:.1f}" if "peak_bytes" in result else "-"
+        base_peak = f"{base['peak_bytes'] / 2 ** 20:.1f}" if base is not None and "peak_bytes" in base else "-"
+        print(f"{name:<16}{result['plays']:>7}{result['frame_count']:>8}{len(result['frames']):>8}"
+              f"{result['seconds']:>10.2f}{base_seconds:>10}{f'{ratio:.2f}' if ratio else '-':>8}{peak:>11}"
+              f"{base_peak:>11}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render the deck's sections at low quality, hash their frames and compare them, the wall time and "
+                    "the peak memory of every section against a stored baseline.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=list(SECTIONS),
+                        help="the sections to render, the others run with their animations skipped")
+    parser.add_argument("--every", type=int, default=0,
+                        help="also hash every n-th frame of a section, not only the last frame of every play")
+    parser.add_argument("--slowdown", type=float, default=1.2,
+                        help="flag sections slower than the baseline by more than this ratio")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="do not trace allocations, which slows rendering down, for cleaner timings")
+    parser.add_argument("--static-layer-cache", action="store_true")
+    parser.add_argument("--no-cull", action="store_true")
+    args = parser.parse_args()
+    if not args.update and not args.baseline.exists():
+        raise Exception(f"No baseline at {args.baseline}, record one with --update on a known good tree first")
+
+    with tempconfig({"quality": "low_quality", "write_to_movie": False, "save_last_frame": False,
+                     "disable_caching": True, "progress_bar": "none", "verbosity": "WARNING"}):
+        deck = RegressionDeck(sections=args.sections, every=args.every, trace_memory=not args.no_memory,
+                              static_layer_cache=args.static_layer_cache, cull=not args.no_cull)
+        deck.render()
+        meta = {"pixel_width": config.pixel_width, "pixel_height": config.pixel_height,
+                "frame_rate": config.frame_rate, "every": args.every}
+
+    baseline = {}
+    if args.baseline.exists():
+        stored = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if stored["meta"] != meta:
+            print(f"{args.baseline} was recorded with {stored['meta']}, not {meta}, frames are not compared")
+            if not args.update:
+                sys.exit(1)
+        else:
+            baseline = stored["sections"]
+    rows, matched = compare(deck.results, baseline, args.slowdown)
+    print_table(rows)
+    if args.update:
+        # sections skipped this run keep their baseline
+        sections = {**baseline, **{name: result for name, result in deck.results.items() if result["rendered"]}}
+        args.baseline.write_text(json.dumps({"meta": meta, "sections": sections}, indent=1), encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+    elif not matched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
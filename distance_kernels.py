@@ -0,0 +1,87 @@
+# Batched distance kernels for graph search: the out-neighbours of a vector are gathered into one contiguous block and
+# scored with a single NumPy operation.
+import threading
+
+import numpy as np
+
+METRIC_L2 = "l2"
+METRIC_IP = "ip"
+METRIC_COSINE = "cosine"
+METRICS = (METRIC_L2, METRIC_IP, METRIC_COSINE)
+STORAGES = ("float32", "int8")
+
+
+class VectorStore:
+    """
+    Vectors kept in one C-contiguous array, as float32 or as int8 codes with one float32 scale per dimension.
+
+    Every metric is a distance, smaller is closer: squared L2, negated inner product, and one minus the cosine
+    similarity, computed as an inner product over vectors normalised once at construction. gather copies the rows of a
+    block into a buffer reused across calls, one per thread, in increasing row order so the copy walks memory forward,
+    and distances scores the whole block at once.
+    """
+
+    def __init__(self, vectors, metric=METRIC_L2, storage="float32", max_block=1024):
+        if metric not in METRICS:
+            raise Exception(f"Unknown metric {metric}, expected one of {METRICS}")
+        if storage not in STORAGES:
+            raise Exception(f"Unknown storage {storage}, expected one of {STORAGES}")
+        self.metric = metric
+        self.storage = storage
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if metric == METRIC_COSINE:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        if storage == "int8":
+            self.scale = np.abs(vectors).max(axis=0) / 127 if len(vectors) != 0 else np.ones(vectors.shape[1])
+            self.scale = np.where(self.scale == 0, 1, self.scale).astype(np.float32)
+            self.data = np.ascontiguousarray(np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8))
+        else:
+            self.scale = None
+            self.data = np.ascontiguousarray(vectors)
+        self.dim = self.data.shape[1]
+        self.max_block = max_block
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self.data)
+
+    def prepare(self, query):
+        """The query in the space distances are computed in, done once per query."""
+        query = np.asarray(query, dtype=np.float32)
+        if self.metric == METRIC_COSINE:
+            norm = np.linalg.norm(query)
+            query = query / norm if norm != 0 else query
+        if self.scale is not None and self.metric != METRIC_L2:
+            # fold the dequantisation into the query, the block is then used as is
+            query = query * self.scale
+        return query
+
+    def gather(self, positions):
+        """The rows at positions, copied into the reusable block buffer."""
+        n = len(positions)
+        buffer = getattr(self._local, "block", None)
+        if buffer is None or n > len(buffer):
+            buffer = self._local.block = np.empty((max(n, self.max_block), self.dim), dtype=self.data.dtype)
+        block = buffer[:n]
+        np.take(self.data, positions, axis=0, out=block)
+        return block
+
+    def distances(self, query, positions):
+        """Distances from a prepared query to the vectors at positions, in the order of positions."""
+        positions = np.asarray(positions, dtype=np.int64)
+        if len(positions) == 0:
+            return np.empty(0, dtype=np.float32)
+        order = np.argsort(positions, kind="stable") if len(positions) > 1 else None
+        block = self.gather(positions if order is None else positions[order])
+        if self.metric == METRIC_L2:
+            diff = (block if self.scale is None else block * self.scale) - query
+            result = np.einsum("ij,ij->i", diff, diff)
+        else:
+            similarity = block @ query if self.scale is None else block.astype(np.float32) @ query
+            result = -similarity if self.metric == METRIC_IP else 1 - similarity
+        if order is None:
+            return result
+        unsorted = np.empty_like(result)
+        unsorted[order] = result
+        return unsorted
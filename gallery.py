@@ -0,0 +1,172 @@
+import argparse
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from manim import *
+
+from graph_util import EdgeManager, apply_graph_layout, get_graph_layout
+from presentation import LNGDemonstration, make_label_set_rep
+from tex_cache import precompile_tex
+from trace_player import (MetricsOverlay, SubgraphTraceView, TracePlayer, UNGTraceView, project_positions,
+                          trace_vector_ids)
+from ung_build import load_index
+from ung_search import (PLAN_AUTO, PLAN_GRAPH, PLAN_HYBRID, PLAN_SCAN, SearchStats, SearchTrace, UNGIndex,
+                        example_index, example_query_vector)
+
+
+class QueryGalleryScene(LNGDemonstration):
+    """
+    One filtered query of the gallery, played from its trace on the deck's UNG with a precomputed layout, or, given
+    the positions of the vectors it visited, on that subgraph of an index built with ung_build.py.
+    """
+
+    def __init__(self, query, trace: SearchTrace, layout, *args, positions=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.query = query
+        self.trace = trace
+        self.layout = layout
+        self.positions = positions
+
+    def construct(self):
+        if self.positions is not None:
+            return self.construct_subgraph()
+        unified_navigating_graph_rep = self.make_unified_navigating_graph_rep()
+        apply_graph_layout(self.layout, unified_navigating_graph_rep)
+        unified_navigating_graph_edges = self.add_unified_navigating_graph_edges(unified_navigating_graph_rep)
+        unified_navigating_graph_objects = EdgeManager(unified_navigating_graph_rep)
+        filter_rep = VGroup(Text("Filter", font_size=72),
+                            make_label_set_rep([self.label_rep[l_id - 1] for l_id in self.query["labels"]]),
+                            Text(f"selectivity {self.query['selectivity']:.0%}", font_size=72))
+        filter_rep.arrange(RIGHT, buff=.75).to_edge(UP)
+        metrics_overlay = MetricsOverlay().to_corner(DR)
+        self.play(FadeIn(filter_rep), FadeIn(metrics_overlay))
+        self.title = filter_rep
+        player = TracePlayer(self, UNGTraceView(unified_navigating_graph_objects, unified_navigating_graph_edges,
+                                                name_of=lambda d_id: self.documents[d_id]["rep_name"],
+                                                group_of=self.document_to_label_set.get),
+                             overlay=metrics_overlay)
+        player.play(self.trace)
+        self.next_slide()
+
+    def construct_subgraph(self):
+        filter_rep = VGroup(Text("Filter", font_size=72),
+                            Text(", ".join(f"#{l_id}" for l_id in self.query["labels"]), font_size=60),
+                            Text(f"selectivity {self.query['selectivity']:.0%}", font_size=72))
+        filter_rep.arrange(RIGHT, buff=.75).to_edge(UP)
+        metrics_overlay = MetricsOverlay().to_corner(DR)
+        self.play(FadeIn(filter_rep), FadeIn(metrics_overlay))
+        self.title = filter_rep
+        player = TracePlayer(self, SubgraphTraceView(self.positions), overlay=metrics_overlay)
+        player.play(self.trace)
+        self.next_slide()
+
+
+def load_workload(path, sample=None, seed=0):
+    """Queries from a workload file, one {"vector": [...], "labels": [...]} object per line, optionally sampled."""
+    with open(path, encoding="utf-8") as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+    if sample is not None and sample < len(queries):
+        queries = random.Random(seed).sample(queries, sample)
+    return queries
+
+
+def example_queries():
+    """One query per label set of the example, filtering on exactly its labels, with a vector among its vectors."""
+    index = example_index()
+    return [{"vector": example_query_vector(index, group_id).tolist(), "labels": sorted(index.label_sets[group])}
+            for group, group_id in enumerate(index.group_ids)]
+
+
+def check_queries(queries, index: UNGIndex):
+    """Raise on the first query the index cannot answer: a vector of another dimension, or a label it never saw."""
+    dim = index.vectors.shape[1]
+    for i, query in enumerate(queries):
+        if len(query["vector"]) != dim:
+            raise Exception(f"query {i} has a {len(query['vector'])}-dimensional vector, the index holds {dim}-"
+                            f"dimensional vectors, pass the index built over its dataset with --index")
+        unknown = [label for label in query["labels"] if label not in index.label_groups]
+        if len(unknown) != 0:
+            raise Exception(f"query {i} filters on labels {unknown} the index does not know, pass the index built "
+                            f"over its dataset with --index")
+
+
+def _subgraph_positions(index: UNGIndex, trace: SearchTrace):
+    ids = trace_vector_ids(trace)
+    vectors = index.vectors[[index.id_position[vector_id] for vector_id in ids]]
+    return project_positions(ids, vectors, config.frame_width * .8, config.frame_height * .7, center=DOWN * .5)
+
+
+def _init_worker(tex_dir):
+    config.tex_dir = tex_dir
+
+
+def _render_query(job):
+    idx, query, events, layout, positions, quality = job
+    # a class per query, the scene name picks the movie file, the partial movie folder and the slide folder
+    scene_class = type(f"QueryGallery{idx:03d}", (QueryGalleryScene,), {})
+    with tempconfig({"quality": quality}):
+        scene = scene_class(query, SearchTrace(events), layout, positions=positions)
+        scene.render()
+        return idx, str(scene.renderer.file_writer.movie_file_path)
+
+
+def render_gallery(queries, max_workers=None, quality="low_quality", k=2, beam_width=4, index_dir=None,
+                   strategy=PLAN_AUTO):
+    """
+    Search every query on the example index, or on the index ung_build.py wrote to index_dir, then render one scene
+    per query in a pool of processes. On the example index the Tex cache is filled and the UNG layout computed once,
+    here, and shared with every scene, on another index each scene draws the subgraph its query visited. Queries are
+    planned with strategy, by default each picks the cheapest, see UNGIndex.plan.
+    """
+    if index_dir is not None:
+        index, layout = load_index(index_dir), None
+    else:
+        deck = LNGDemonstration()
+        precompile_tex(deck.tex_strings())
+        index, layout = example_index(), get_graph_layout(deck.make_unified_navigating_graph_rep())
+    check_queries(queries, index)
+    summary, jobs = [], []
+    for idx, query in enumerate(queries):
+        trace, stats = SearchTrace(), SearchStats()
+        index.search(query["vector"], query["labels"], k=k, beam_width=beam_width, trace=trace, stats=stats,
+                     strategy=strategy)
+        query = {**query, "selectivity": index.selectivity(query["labels"])}
+        summary.append({"query": idx, "labels": query["labels"], "selectivity": query["selectivity"],
+                        "strategy": trace.first("plan")["strategy"], "entry_sets": trace.first("entry_sets")["sets"],
+                        **stats.as_dict()})
+        positions = _subgraph_positions(index, trace) if index_dir is not None else None
+        jobs.append((idx, query, trace.events, layout, positions, quality))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(str(config.get_dir("tex_dir")),)) as pool:
+        for idx, movie in pool.map(_render_query, jobs):
+            summary[idx]["movie"] = movie
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a gallery of filtered queries, one scene per query.")
+    parser.add_argument("--workload", default=None, help="queries JSONL, defaults to one query per label set")
+    parser.add_argument("--index", default=None,
+                        help="index directory written by ung_build.py to search the workload on, instead of the "
+                             "example, each query is then drawn on the subgraph it visited")
+    parser.add_argument("--sample", type=int, default=None, help="render a random sample of the workload")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--quality", default="low_quality")
+    parser.add_argument("-k", type=int, default=2)
+    parser.add_argument("--beam-width", type=int, default=4)
+    parser.add_argument("--strategy", default=PLAN_AUTO, choices=[PLAN_AUTO, PLAN_SCAN, PLAN_GRAPH, PLAN_HYBRID])
+    parser.add_argument("--summary", default=None, help="write the per-query summary to this JSON file")
+    args = parser.parse_args()
+    gallery_queries = (load_workload(args.workload, sample=args.sample, seed=args.seed)
+                       if args.workload is not None else example_queries())
+    gallery = render_gallery(gallery_queries, max_workers=args.workers, quality=args.quality, k=args.k,
+                             beam_width=args.beam_width, index_dir=args.index,
+                             strategy=args.strategy)
+    for row in sorted(gallery, key=lambda r: r["selectivity"]):
+        print(f"{row['selectivity']:>6.1%}  labels={row['labels']}  {row['strategy']:<6}  entry_sets={row['entry_sets']}  "
+              f"distances={row['distance_computations']}  groups={row['visited_groups']}  {row['movie']}")
+    if args.summary is not None:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(gallery, f, indent=2)
@@ -1,12 +1,270 @@
 from manim import *
 import random
 import math
+import weakref
+from pathlib import Path
+import numpy as np
 from typing import List, Dict, Tuple, Any
 
-random.seed(1028)
+from layout_cache import LAYOUT_SEED, LayoutCache, layout_key, layout_seed
+from tex_cache import make_tex
 
 SOLID = "solid"
 DASHED = "dashed"
+LOD_FULL = "full"
+LOD_DOT = "dot"
+LOD_DENSITY = "density"
+RGBA_ATTRS = ("fill_rgbas", "stroke_rgbas", "background_stroke_rgbas")
+
+
+def _gather_rgbas(mobject):
+    """All colour arrays of a family stacked into one (n, 4) array, with the slice each member owns."""
+    views = []
+    rows = []
+    offset = 0
+    for mob in mobject.get_family():
+        for attr in RGBA_ATTRS:
+            rgbas = getattr(mob, attr, None)
+            if isinstance(rgbas, np.ndarray) and len(rgbas) > 0:
+                views.append((mob, attr, offset, offset + len(rgbas)))
+                rows.append(rgbas)
+                offset += len(rgbas)
+    return views, np.concatenate(rows) if rows else np.zeros((0, 4))
+
+
+class _Members(Group):
+    """
+    The Group a MobjectsAnimation runs on. It compares equal to each of its members, so Scene.play does not add it to
+    the scene when they are already there, which would pull them out of their parents, and counts them as animated
+    when it splits moving from static mobjects. It is hashed by identity, so sets of mobjects are unaffected.
+    """
+
+    def __init__(self, *mobjects, **kwargs):
+        super().__init__(*mobjects, **kwargs)
+        self._member_ids = {id(mob) for mob in mobjects}
+
+    def __eq__(self, other):
+        return other is self or id(other) in self._member_ids
+
+    __hash__ = Group.__hash__
+
+
+class MobjectsAnimation(Animation):
+    """
+    An animation over several mobjects that leaves the structure of the scene alone: the mobjects stay where they are
+    in the scene, and the wrapping group (see _Members) is never part of it. Mobjects missing from the scene are added
+    on their own when the animation starts, and a remover takes them out at the end.
+
+    Subclasses only change colours and stroke widths, or swap parts within a member, so nothing is drawn outside the
+    members' own bounds: in_place tells StaticLayerMixin to redraw only what overlaps them.
+    """
+
+    in_place = True
+
+    def __init__(self, mobjects, **kwargs):
+        self.members = list(mobjects)
+        super().__init__(self.members[0] if len(self.members) == 1 else _Members(*self.members), **kwargs)
+
+    def _setup_scene(self, scene):
+        if scene is None or len(self.members) == 1:
+            return super()._setup_scene(scene)
+        # Scene.play adds the group itself when none of the members is in the scene yet, take it out again
+        for i, mob in enumerate(scene.mobjects):
+            if mob is self.mobject:
+                scene.mobjects[i:i + 1] = []
+                break
+        in_scene = {id(mob) for mob in scene.get_mobject_family_members()}
+        missing = [mob for mob in self.members if id(mob) not in in_scene]
+        if len(missing) != 0:
+            scene.add(*missing)
+
+
+class GroupOpacity(MobjectsAnimation):
+    """
+    Animates the opacity of many mobjects as one animation.
+
+    FadeIn / FadeOut / .animate.set_opacity each copy their mobject and interpolate every point on every frame. Here
+    only the alpha channels move: all of them are gathered into one array when the animation begins, so a frame costs
+    one numpy expression plus a slice assignment per family member, no matter how many mobjects are faded.
+    """
+
+    def __init__(self, *mobjects, opacity=None, fade_in=False, fade_out=False, **kwargs):
+        if (opacity is not None) + fade_in + fade_out != 1:
+            raise Exception("Exactly one of opacity, fade_in and fade_out must be given")
+        self.opacity = opacity
+        self.fade_in = fade_in
+        self.fade_out = fade_out
+        self._alpha_views: List[Tuple[Mobject, str, int, int]] = []
+        self._start_alphas = self._end_alphas = np.zeros(0)
+        super().__init__(mobjects, introducer=fade_in, remover=fade_out, **kwargs)
+
+    def create_starting_mobject(self):
+        # nothing but the alpha channels change, so there is no need for a copy
+        return self.mobject
+
+    def begin(self):
+        self._alpha_views, rgbas = _gather_rgbas(self.mobject)
+        current = rgbas[:, 3]
+        if self.fade_in:
+            self._start_alphas, self._end_alphas = np.zeros_like(current), current
+        elif self.fade_out:
+            self._start_alphas, self._end_alphas = current, np.zeros_like(current)
+        else:
+            self._start_alphas, self._end_alphas = current, np.full_like(current, self.opacity)
+        super().begin()
+
+    def interpolate_mobject(self, alpha):
+        alphas = interpolate(self._start_alphas, self._end_alphas, self.rate_func(alpha))
+        for mob, attr, start, end in self._alpha_views:
+            getattr(mob, attr)[:, 3] = alphas[start:end]
+
+    def clean_up_from_scene(self, scene):
+        super().clean_up_from_scene(scene)
+        if self.fade_out:
+            # like FadeOut, leave the removed mobjects as they were so they can be faded back in
+            self.interpolate(0)
+
+
+class StyleSnapshot:
+    """The colours and opacities of a mobject family, recorded without copying any of its points."""
+
+    def __init__(self, mobject):
+        self.mobject = mobject
+        views, rgbas = _gather_rgbas(mobject)
+        self.records = {(id(mob), attr): rgbas[start:end].copy() for mob, attr, start, end in views}
+
+    def get(self, mob, attr):
+        return self.records.get((id(mob), attr), None)
+
+
+class RestoreStyle(MobjectsAnimation):
+    """Interpolates the colours of one or more mobjects back to their snapshots, in a single vectorised step."""
+
+    def __init__(self, *snapshots: StyleSnapshot, **kwargs):
+        self.snapshots = snapshots
+        self._views: List[Tuple[Mobject, str, int, int]] = []
+        self._start_rgbas = self._end_rgbas = np.zeros((0, 4))
+        super().__init__([snapshot.mobject for snapshot in snapshots], **kwargs)
+
+    def create_starting_mobject(self):
+        return self.mobject
+
+    def begin(self):
+        self._views = []
+        start_rows, end_rows = [], []
+        offset = 0
+        for snapshot in self.snapshots:
+            views, rgbas = _gather_rgbas(snapshot.mobject)
+            for mob, attr, start, end in views:
+                recorded = snapshot.get(mob, attr)
+                if recorded is None:
+                    continue  # added to the family after the snapshot was taken
+                current = rgbas[start:end]
+                if len(recorded) != len(current):
+                    # the gradient changed length in between, fall back to snapping the colour at the end
+                    setattr(mob, attr, recorded.copy())
+                    continue
+                self._views.append((mob, attr, offset, offset + len(current)))
+                start_rows.append(current.copy())
+                end_rows.append(recorded)
+                offset += len(current)
+        self._start_rgbas = np.concatenate(start_rows) if start_rows else np.zeros((0, 4))
+        self._end_rgbas = np.concatenate(end_rows) if end_rows else np.zeros((0, 4))
+        super().begin()
+
+    def interpolate_mobject(self, alpha):
+        rgbas = interpolate(self._start_rgbas, self._end_rgbas, self.rate_func(alpha))
+        for mob, attr, start, end in self._views:
+            getattr(mob, attr)[:] = rgbas[start:end]
+
+
+class _LiftDimOverlay(GroupOpacity):
+    """Fades the dim overlay out, then puts the highlighted objects back at their own z-index."""
+
+    def __init__(self, overlay, raised_z_indices, **kwargs):
+        self.raised_z_indices = raised_z_indices
+        super().__init__(overlay, fade_out=True, **kwargs)
+
+    def clean_up_from_scene(self, scene):
+        super().clean_up_from_scene(scene)
+        for mob, z_index in self.raised_z_indices:
+            mob.z_index = z_index
+
+
+class DetailSwitch(MobjectsAnimation):
+    """
+    Cross-fades parts of mobjects in and out, given as (container, outgoing, incoming) swaps, optionally easing stroke
+    widths to new values at the same time. Outgoing parts are taken out of their container at the end, so a level of
+    detail that is not shown costs nothing to render.
+    """
+
+    def __init__(self, swaps, restrokes=(), **kwargs):
+        self.swaps = list(swaps)
+        self.restrokes = list(restrokes)
+        self._outgoing_views: List[Tuple[Mobject, str, int, int]] = []
+        self._incoming_views: List[Tuple[Mobject, str, int, int]] = []
+        self._outgoing_alphas = self._incoming_alphas = np.zeros(0)
+        self._start_widths = self._end_widths = np.zeros(0)
+        containers = dict.fromkeys([container for container, _, _ in self.swaps] + [mob for mob, _ in self.restrokes])
+        super().__init__(containers, **kwargs)
+
+    def create_starting_mobject(self):
+        return self.mobject
+
+    def begin(self):
+        for container, _, incoming in self.swaps:
+            container.add(*incoming)
+        self._outgoing_views, outgoing = _gather_rgbas(Group(*(part for _, parts, _ in self.swaps for part in parts)))
+        self._incoming_views, incoming = _gather_rgbas(Group(*(part for _, _, parts in self.swaps for part in parts)))
+        self._outgoing_alphas, self._incoming_alphas = outgoing[:, 3], incoming[:, 3]
+        self._start_widths = np.array([mob.get_stroke_width() for mob, _ in self.restrokes], dtype=float)
+        self._end_widths = np.array([width for _, width in self.restrokes], dtype=float)
+        super().begin()
+
+    def interpolate_mobject(self, alpha):
+        alpha = self.rate_func(alpha)
+        for views, alphas, factor in ((self._outgoing_views, self._outgoing_alphas, 1 - alpha),
+                                      (self._incoming_views, self._incoming_alphas, alpha)):
+            for mob, attr, start, end in views:
+                getattr(mob, attr)[:, 3] = alphas[start:end] * factor
+        for (mob, _), width in zip(self.restrokes, interpolate(self._start_widths, self._end_widths, alpha)):
+            mob.set_stroke(width=width, family=False)
+
+    def clean_up_from_scene(self, scene):
+        super().clean_up_from_scene(scene)
+        for container, outgoing, _ in self.swaps:
+            container.remove(*outgoing)
+        # hand the parts back at their own opacity, ready for the next switch
+        for mob, attr, start, end in self._outgoing_views:
+            getattr(mob, attr)[:, 3] = self._outgoing_alphas[start:end]
+
+
+def on_screen_size(length, frame_width=None):
+    """The size of a length in scene units, in pixels, when the camera frame is frame_width wide."""
+    frame_width = config.frame_width if frame_width is None else frame_width
+    return length * config.pixel_width / frame_width
+
+
+def detail_switch(swaps, restrokes=()):
+    if len(swaps) == 0 and len(restrokes) == 0:
+        return []
+    return [DetailSwitch(swaps, restrokes)]
+
+
+def group_opacity(mobjects, **kwargs):
+    mobjects = list(mobjects)
+    if len(mobjects) == 0:
+        return ()
+    return (GroupOpacity(*mobjects, **kwargs),)
+
+
+def group_animations(make_animation, mobjects, group=False, lag_ratio=0.):
+    if not group:
+        return (make_animation(mob) for mob in mobjects)
+    animations = [make_animation(mob) for mob in mobjects]
+    if len(animations) == 0:
+        return ()
+    return (AnimationGroup(*animations, lag_ratio=lag_ratio),)
 
 
 class NodeBase:
@@ -14,11 +272,216 @@ class NodeBase:
         raise NotImplementedError
 
 
+def _line_curves(start, end):
+    return np.array([start, start + (end - start) / 3, start + (end - start) * 2 / 3, end])
+
+
+def _tip_curves(tip, direction, length, width):
+    base = tip - direction * length
+    normal = np.array([-direction[1], direction[0], 0.]) * width / 2
+    corners = [tip, base + normal, base - normal, tip]
+    return np.concatenate([_line_curves(a, b) for a, b in zip(corners[:-1], corners[1:])])
+
+
+class EdgeBucket(VGroup):
+    """The edges of an EdgeBatch that currently share one style: one stroke-only path for the shafts, one filled path
+    for the tips."""
+
+    def __init__(self, color=BLUE, stroke_width=4, **kwargs):
+        super().__init__(**kwargs)
+        self.keys: List[Tuple[str, str]] = []
+        self.lines = VMobject().set_stroke(color=color, width=stroke_width).set_fill(color=color, opacity=0)
+        self.tips = VMobject().set_stroke(color=color, width=0).set_fill(color=color, opacity=1)
+        self.add(self.lines, self.tips)
+
+
+class EdgeBatch(VGroup):
+    """
+    Many edges of one style packed into a handful of VMobjects instead of one Arrow per edge.
+
+    Edges are addressed by key. Animating or restyling a subset first moves it into a bucket of its own, so touching
+    k edges costs one mobject rather than k. Buckets left with the same style can be merged back with consolidate,
+    which consolidate_edge_batches does for every batch on screen.
+    """
+
+    # every batch created, not their copies, for consolidate_edge_batches
+    instances = weakref.WeakSet()
+
+    def __init__(self, style=SOLID, bidirectional=False, color=BLUE, stroke_width=4, tip_width=.25, dash_length=.25,
+                 **kwargs):
+        super().__init__(**kwargs)
+        if style not in (SOLID, DASHED):
+            raise Exception(f"Invalid style {style}")
+        self.style = style
+        self.bidirectional = bidirectional
+        self.stroke_width = stroke_width
+        self.tip_width = tip_width
+        self.tipless = False
+        self.dash_length = dash_length
+        self.edge_geometry: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        self.bucket_map: Dict[Tuple[str, str], EdgeBucket] = {}
+        self.add(EdgeBucket(color=color, stroke_width=stroke_width))
+        EdgeBatch.instances.add(self)
+
+    def _make_geometry(self, from_pos, to_pos, buff):
+        from_pos, to_pos = np.array(from_pos, dtype=float), np.array(to_pos, dtype=float)
+        length = np.linalg.norm(to_pos - from_pos)
+        if length <= 2 * buff:
+            return np.zeros((0, 3)), np.zeros((0, 3))
+        direction = (to_pos - from_pos) / length
+        start, end = from_pos + direction * buff, to_pos - direction * buff
+        tips = [_tip_curves(end, direction, self.tip_width, self.tip_width)]
+        shaft_end = end - direction * self.tip_width
+        if self.bidirectional:
+            tips.append(_tip_curves(start, -direction, self.tip_width, self.tip_width))
+            start = start + direction * self.tip_width
+        if self.style == DASHED:
+            shaft_length = np.linalg.norm(shaft_end - start)
+            dash_starts = np.arange(0, shaft_length, 2 * self.dash_length)
+            lines = [_line_curves(start + direction * d, start + direction * min(d + self.dash_length, shaft_length))
+                     for d in dash_starts]
+        else:
+            lines = [_line_curves(start, shaft_end)]
+        return np.concatenate(lines), np.concatenate(tips)
+
+    def _refresh(self, bucket):
+        geometry = [self.edge_geometry[key] for key in bucket.keys]
+        bucket.lines.set_points(np.concatenate([lines for lines, _ in geometry]) if geometry else np.zeros((0, 3)))
+        bucket.tips.set_points(np.concatenate([tips for _, tips in geometry]) if geometry else np.zeros((0, 3)))
+
+    def _resolve(self, key):
+        if key in self.edge_geometry:
+            return key
+        f, t = key
+        if (t, f) in self.edge_geometry:
+            return t, f
+        raise Exception(f"Could not find edge {key}")
+
+    def get_keys(self):
+        return list(self.edge_geometry.keys())
+
+    def add_edges(self, *edges, buff=.5):
+        """Add (key, from_pos, to_pos) edges to the first bucket."""
+        bucket = self.submobjects[0]
+        for key, from_pos, to_pos in edges:
+            self.edge_geometry[key] = self._make_geometry(from_pos, to_pos, buff)
+            self.bucket_map[key] = bucket
+            bucket.keys.append(key)
+        self._refresh(bucket)
+        return self
+
+    def remove_edges(self, *keys):
+        touched = {}
+        for key in keys:
+            key = self._resolve(key)
+            bucket = self.bucket_map.pop(key)
+            bucket.keys.remove(key)
+            del self.edge_geometry[key]
+            touched[id(bucket)] = bucket
+        for bucket in touched.values():
+            self._refresh(bucket)
+        return self
+
+    def isolate(self, *keys):
+        """Move the given edges into buckets of their own (one per current style) and return those buckets."""
+        grouped: Dict[int, Tuple[EdgeBucket, List[Tuple[str, str]]]] = {}
+        for key in dict.fromkeys(self._resolve(key) for key in keys):
+            bucket = self.bucket_map[key]
+            grouped.setdefault(id(bucket), (bucket, []))[1].append(key)
+        isolated = VGroup()
+        for bucket, bucket_keys in grouped.values():
+            if len(bucket_keys) == len(bucket.keys):
+                isolated.add(bucket)
+                continue
+            moved = set(bucket_keys)
+            new_bucket = EdgeBucket()
+            new_bucket.lines.match_style(bucket.lines)
+            new_bucket.tips.match_style(bucket.tips)
+            if self.tipless:
+                new_bucket.remove(new_bucket.tips)
+            new_bucket.keys = bucket_keys
+            bucket.keys = [key for key in bucket.keys if key not in moved]
+            for key in bucket_keys:
+                self.bucket_map[key] = new_bucket
+            self._refresh(bucket)
+            self._refresh(new_bucket)
+            self.add(new_bucket)
+            isolated.add(new_bucket)
+        return isolated
+
+    def set_edge_style(self, *keys, color=None, opacity=None):
+        edges = self.isolate(*keys)
+        if color is not None:
+            edges.set_color(color)
+        if opacity is not None:
+            edges.set_opacity(opacity)
+        return edges
+
+    def set_tipless(self, tipless, thin_width=1):
+        """Swaps for a DetailSwitch that drops the tips and thins the lines of every edge, or brings them back."""
+        if tipless == self.tipless:
+            return [], []
+        self.tipless = tipless
+        buckets = list(self.submobjects)
+        if tipless:
+            return [(bucket, [bucket.tips], []) for bucket in buckets], [(bucket.lines, thin_width) for bucket in buckets]
+        return [(bucket, [], [bucket.tips]) for bucket in buckets], [(bucket.lines, self.stroke_width) for bucket in buckets]
+
+    def consolidate(self, displayed=None):
+        """
+        Merge buckets that ended up with the same style and return the buckets emptied. Only call this while the whole
+        batch is in the scene, or give the ids of the mobjects displayed to merge only the buckets among them,
+        otherwise edges moved into a bucket that is not displayed disappear.
+        """
+        merged: Dict[Tuple, EdgeBucket] = {}
+        emptied = []
+        for bucket in list(self.submobjects):
+            if displayed is not None and id(bucket) not in displayed:
+                continue
+            signature = (bucket.lines.get_stroke_color().to_hex(), bucket.lines.get_stroke_opacity(),
+                         bucket.lines.get_stroke_width(), bucket.tips.get_fill_opacity())
+            target = merged.setdefault(signature, bucket)
+            if target is bucket:
+                continue
+            target.keys.extend(bucket.keys)
+            for key in bucket.keys:
+                self.bucket_map[key] = target
+            bucket.keys = []
+            self._refresh(target)
+            self._refresh(bucket)
+            if len(self.submobjects) > 1:
+                self.remove(bucket)
+                emptied.append(bucket)
+        return emptied
+
+
+def consolidate_edge_batches(scene):
+    """
+    Merge the buckets of every EdgeBatch on screen that ended up with the same style, so isolating subsets of edges to
+    animate them does not split the batches further and further over a long scene. Call it between plays.
+    """
+    displayed = {id(mob) for mob in scene.get_mobject_family_members()}
+    for edge_batch in list(EdgeBatch.instances):
+        if len(edge_batch.submobjects) < 2 or not any(id(bucket) in displayed for bucket in edge_batch.submobjects):
+            continue
+        emptied = {id(bucket) for bucket in edge_batch.consolidate(displayed=displayed)}
+        if len(emptied) != 0:
+            # buckets the scene holds on their own, after a removal split their batch, without restructuring
+            scene.mobjects = [mob for mob in scene.mobjects if id(mob) not in emptied]
+
+
 class EdgeManager:
     def __init__(self, *nodes_and_graphs):
         self.edge_map: Dict[Tuple[str, str], Any] = {}
+        self.edge_batch_map: Dict[Tuple[str, str], EdgeBatch] = {}
         self.edge_highlight_state_map: Dict[Tuple[str, str], Any] = {}
-        self.node_highlight_state_map: Dict[str, Any] = {}
+        self.node_highlight_state_map: Dict[int, StyleSnapshot] = {}
+        self.dim_overlay = None
+        self.dim_overlay_z_index = 100
+        self.dim_overlay_raised_z_indices: List[Tuple[Mobject, float]] = []
+        # tipless edges: the tips taken out, the stroke widths of their lines and the tip size
+        self.edge_detail_state: Dict[int, Tuple[List[Mobject], List[float], float]] = {}
+        self.tip_below = 6
         self.nodes = []
         queue = list(nodes_and_graphs)
         while len(queue) != 0:
@@ -49,14 +512,18 @@ class EdgeManager:
         return arrow
 
     @staticmethod
-    def create_arrow(from_obj, to_obj, connect_bot_to_top=False, connect_top_to_bot=False, pos_buff=.5,
-                     style=SOLID, bidirectional=False, color=BLUE, stroke_width=4, tip_width=.25, buff=.5):
+    def get_arrow_endpoints(from_obj, to_obj, connect_bot_to_top=False, connect_top_to_bot=False, pos_buff=.5):
         if connect_bot_to_top:
-            from_pos, to_pos = from_obj.get_bottom() + DOWN * pos_buff, to_obj.get_top() + UP * pos_buff
+            return from_obj.get_bottom() + DOWN * pos_buff, to_obj.get_top() + UP * pos_buff
         elif connect_top_to_bot:
-            from_pos, to_pos = from_obj.get_top() + UP * pos_buff, to_obj.get_bottom() + DOWN * pos_buff
-        else:
-            from_pos, to_pos = from_obj.get_center(), to_obj.get_center()
+            return from_obj.get_top() + UP * pos_buff, to_obj.get_bottom() + DOWN * pos_buff
+        return from_obj.get_center(), to_obj.get_center()
+
+    @staticmethod
+    def create_arrow(from_obj, to_obj, connect_bot_to_top=False, connect_top_to_bot=False, pos_buff=.5,
+                     style=SOLID, bidirectional=False, color=BLUE, stroke_width=4, tip_width=.25, buff=.5):
+        from_pos, to_pos = EdgeManager.get_arrow_endpoints(from_obj, to_obj, connect_bot_to_top=connect_bot_to_top,
+                                                           connect_top_to_bot=connect_top_to_bot, pos_buff=pos_buff)
         return EdgeManager.create_arrow_from_points(
             from_pos, to_pos, connect_bot_to_top=connect_bot_to_top, connect_top_to_bot=connect_top_to_bot,
             pos_buff=pos_buff, style=style, bidirectional=bidirectional, color=color, stroke_width=stroke_width,
@@ -83,18 +550,44 @@ class EdgeManager:
             return result
         return self.edge_map[(t, f)]
 
-    def add_edges(self, *keys, **arrow_kwargs):
+    def _find_edge_batch(self, key):
+        f, t = key
+        result = self.edge_batch_map.get((f, t), None)
+        if result is not None:
+            return result
+        return self.edge_batch_map.get((t, f), None)
+
+    def add_edges(self, *keys, batch=False, **arrow_kwargs):
         if len(keys) == 0:
             return []
+        if batch:
+            return [self.add_edge_batch(*keys, **arrow_kwargs)]
         arrows = [self.create_arrow(self._find_obj(from_obj_name), self._find_obj(to_obj_name), **arrow_kwargs)
                   for (from_obj_name, to_obj_name) in keys]
         for (f, t), arrow in zip(keys, arrows):
             self.edge_map[(f, t)] = arrow
         return arrows
 
+    def add_edge_batch(self, *keys, connect_bot_to_top=False, connect_top_to_bot=False, pos_buff=.5, buff=.5,
+                       **style_kwargs):
+        edge_batch = EdgeBatch(**style_kwargs)
+        edge_batch.add_edges(*[((f, t), *self.get_arrow_endpoints(self._find_obj(f), self._find_obj(t),
+                                                                  connect_bot_to_top=connect_bot_to_top,
+                                                                  connect_top_to_bot=connect_top_to_bot,
+                                                                  pos_buff=pos_buff))
+                               for (f, t) in keys], buff=buff)
+        for key in keys:
+            self.edge_batch_map[key] = edge_batch
+        return edge_batch
+
     def remove_edges(self, *keys):
         for (f, t) in keys:
-            del self.edge_map[(f, t)]
+            edge_batch = self._find_edge_batch((f, t))
+            if edge_batch is not None:
+                edge_batch.remove_edges((f, t))
+                del self.edge_batch_map[(f, t) if (f, t) in self.edge_batch_map else (t, f)]
+            else:
+                del self.edge_map[(f, t) if (f, t) in self.edge_map else (t, f)]
 
     def get_objects(self, *names, all=False, inverse=False):
         if all:
@@ -112,110 +605,253 @@ class EdgeManager:
                     if not any(obj.get_node(n) is not None for n in names))
         return (self._find_obj_with_index(name) for name in names)
 
-    def get_edges(self, *keys, all=False, inverse=False):
-        if all:
-            return self.edge_map.values()
-        if inverse:
+    def get_edge_keys(self, *keys, all=False, inverse=False):
+        """The keys of the requested edges as they are stored, looked up without touching any EdgeBatch."""
+        if all or inverse:
             key_sets = set(keys)
-            key_sets.union(set((t, f) for f, t in keys))  # reverse edges
-            return (value for key, value in self.edge_map.items() if key not in key_sets)
-        return (self._find_edge(key) for key in keys)
+            return [key for key in (*self.edge_map, *self.edge_batch_map) if all or key not in key_sets]
+        return [key if key in self.edge_map or key in self.edge_batch_map else (key[1], key[0]) for key in keys]
 
-    def get_edges_with_keys(self, *keys, all=False, inverse=False):
+    def get_edge_groups(self, *keys, all=False, inverse=False):
+        """
+        The requested edges as (keys, mobject) pairs, to animate or restyle. Plain edges come one per arrow, edges
+        held in an EdgeBatch come as a single mobject per batch, a subset of a batch moved into buckets of its own.
+        """
         if all:
-            return self.edge_map.items()
+            groups = [([key], arrow) for key, arrow in self.edge_map.items()]
+            batches = {id(edge_batch): edge_batch for edge_batch in self.edge_batch_map.values()}
+            groups.extend((edge_batch.get_keys(), edge_batch) for edge_batch in batches.values())
+            return groups
         if inverse:
             key_sets = set(keys)
-            key_sets.union(set((t, f) for f, t in keys))
-            return ((key, value) for key, value in self.edge_map.items() if key not in key_sets)
-        return ((key, self._find_edge(key)) for key in keys)
+            keys = [key for key in (*self.edge_map, *self.edge_batch_map) if key not in key_sets]
+        groups = []
+        batched: Dict[int, Tuple[EdgeBatch, List[Tuple[str, str]]]] = {}
+        for key in keys:
+            edge_batch = self._find_edge_batch(key)
+            if edge_batch is None:
+                groups.append(([key], self._find_edge(key)))
+            else:
+                batched.setdefault(id(edge_batch), (edge_batch, []))[1].append(key)
+        groups.extend((batch_keys, edge_batch.isolate(*batch_keys)) for edge_batch, batch_keys in batched.values())
+        return groups
 
-    def create_edges(self, *keys, **kwargs):
-        return (Create(arrow) for arrow in self.get_edges(*keys, **kwargs))
+    def get_edges(self, *keys, all=False, inverse=False):
+        return [edge for _, edge in self.get_edge_groups(*keys, all=all, inverse=inverse)]
 
-    def grow_edges(self, *keys, **kwargs):
-        return (GrowArrow(arrow) for arrow in self.get_edges(*keys, **kwargs))
+    def get_edges_with_keys(self, *keys, all=False, inverse=False):
+        return ((key, edge) for edge_keys, edge in self.get_edge_groups(*keys, all=all, inverse=inverse)
+                for key in edge_keys)
 
-    def fadeIn_edges(self, *keys, **kwargs):
+    def create_edges(self, *keys, group=False, lag_ratio=0., **kwargs):
+        return group_animations(Create, self.get_edges(*keys, **kwargs), group=group, lag_ratio=lag_ratio)
+
+    def grow_edges(self, *keys, group=False, lag_ratio=0., **kwargs):
+        return group_animations(GrowArrow, self.get_edges(*keys, **kwargs), group=group, lag_ratio=lag_ratio)
+
+    def fadeIn_edges(self, *keys, group=False, **kwargs):
+        if group:
+            return group_opacity(self.get_edges(*keys, **kwargs), fade_in=True)
         return (FadeIn(arrow) for arrow in self.get_edges(*keys, **kwargs))
 
-    def fadeOut_edges(self, *keys, **kwargs):
+    def fadeOut_edges(self, *keys, group=False, **kwargs):
+        if group:
+            return group_opacity(self.get_edges(*keys, **kwargs), fade_out=True)
         return (FadeOut(arrow) for arrow in self.get_edges(*keys, **kwargs))
 
-    def passing_edges(self, *keys, time_width=.5, **kwargs):
-        return (ShowPassingFlash(arrow, time_width=time_width) for arrow in self.get_edges(*keys, **kwargs))
+    def passing_edges(self, *keys, time_width=.5, group=False, lag_ratio=0., **kwargs):
+        return group_animations(lambda arrow: ShowPassingFlash(arrow, time_width=time_width),
+                                self.get_edges(*keys, **kwargs), group=group, lag_ratio=lag_ratio)
 
-    def flash_edges(self, *keys, **kwargs):
-        return (Flash(arrow) for arrow in self.get_edges(*keys, **kwargs))
+    def flash_edges(self, *keys, group=False, lag_ratio=0., **kwargs):
+        return group_animations(Flash, self.get_edges(*keys, **kwargs), group=group, lag_ratio=lag_ratio)
 
-    def indicate_edges(self, *keys, **kwargs):
-        return (Indicate(arrow) for arrow in self.get_edges(*keys, **kwargs))
+    def indicate_edges(self, *keys, group=False, lag_ratio=0., **kwargs):
+        return group_animations(Indicate, self.get_edges(*keys, **kwargs), group=group, lag_ratio=lag_ratio)
 
-    def wave_edges(self, *keys, **kwargs):
-        return (ApplyWave(arrow, amplitude=0.5) for arrow in self.get_edges(*keys, **kwargs))
+    def wave_edges(self, *keys, group=False, lag_ratio=0., **kwargs):
+        return group_animations(lambda arrow: ApplyWave(arrow, amplitude=0.5),
+                                self.get_edges(*keys, **kwargs), group=group, lag_ratio=lag_ratio)
 
-    def fadeIn_nodes(self, *names, **kwargs):
+    def fadeIn_nodes(self, *names, group=False, **kwargs):
+        if group:
+            return group_opacity(self.get_objects(*names, **kwargs), fade_in=True)
         return (FadeIn(obj) for obj in self.get_objects(*names, **kwargs))
 
-    def fadeOut_nodes(self, *names, **kwargs):
+    def fadeOut_nodes(self, *names, group=False, **kwargs):
+        if group:
+            return group_opacity(self.get_objects(*names, **kwargs), fade_out=True)
         return (FadeOut(obj) for obj in self.get_objects(*names, **kwargs))
 
-    def circumscribe_nodes(self, *names, time_width=.5, **kwargs):
-        return (Circumscribe(obj, time_width=time_width) for obj in self.get_objects(*names, **kwargs))
+    def circumscribe_nodes(self, *names, time_width=.5, group=False, lag_ratio=0., **kwargs):
+        return group_animations(lambda obj: Circumscribe(obj, time_width=time_width),
+                                self.get_objects(*names, **kwargs), group=group, lag_ratio=lag_ratio)
 
-    def highlight_edges(self, *keys):
-        animations = []
-        for k, arrow in self.get_edges_with_keys(*keys, inverse=True):
-            self.edge_highlight_state_map[k] = 1
-            animations.append(arrow.animate.set_opacity(.1))
-        return animations
+    def _get_edges_and_batches(self, *keys, all=False):
+        if all:
+            keys = [*self.edge_map, *self.edge_batch_map]
+        edges = {}
+        for key in keys:
+            edge = self._find_edge_batch(key)
+            if edge is None:
+                edge = self._find_edge(key)
+            edges[id(edge)] = edge
+        return list(edges.values())
 
-    def add_highlight_edges(self, *keys):
-        animations = []
-        for k, arrow in self.get_edges_with_keys(*keys):
-            assert k in self.edge_highlight_state_map
-            org_opa = self.edge_highlight_state_map[k]
-            del self.edge_highlight_state_map[k]
-            animations.append(arrow.animate.set_opacity(org_opa))
-        return animations
+    def _tip_size(self, edge):
+        if isinstance(edge, EdgeBatch):
+            return edge.tip_width
+        if id(edge) in self.edge_detail_state:
+            # the tips are out of the edge, get_tips would not find them
+            return self.edge_detail_state[id(edge)][2]
+        return max((max(tip.width, tip.height) for tip in edge.get_tips()), default=0)
+
+    def _edge_swaps(self, edge, tipless, thin_width):
+        if isinstance(edge, EdgeBatch):
+            return edge.set_tipless(tipless, thin_width=thin_width)
+        if tipless == (id(edge) in self.edge_detail_state):
+            return [], []
+        if tipless:
+            tips = list(edge.get_tips())
+            tip_members = {id(mob) for tip in tips for mob in tip.get_family()}
+            lines = [mob for mob in edge.family_members_with_points() if id(mob) not in tip_members]
+            self.edge_detail_state[id(edge)] = (tips, [line.get_stroke_width() for line in lines],
+                                                self._tip_size(edge))
+            return [(edge, tips, [])], [(line, thin_width) for line in lines]
+        tips, widths, _ = self.edge_detail_state.pop(id(edge))
+        lines = edge.family_members_with_points()
+        return [(edge, [], tips)], list(zip(lines, widths))
+
+    def set_edges_level_of_detail(self, level, *keys, all=False, thin_width=1):
+        """
+        Switch edges between full arrows (LOD_FULL) and thin lines without tips (any other level). Edges held in an
+        EdgeBatch always switch together with the rest of their batch.
+        """
+        swaps, restrokes = [], []
+        for edge in self._get_edges_and_batches(*keys, all=all):
+            edge_swaps, edge_restrokes = self._edge_swaps(edge, level != LOD_FULL, thin_width)
+            swaps.extend(edge_swaps)
+            restrokes.extend(edge_restrokes)
+        return detail_switch(swaps, restrokes)
 
-    def undo_highlight_edges(self, *keys):
+    def update_level_of_detail(self, frame_width=None, thin_width=1):
+        """
+        Pick the level of detail of every node graph and edge for a camera frame that is frame_width wide, and return
+        the animations switching to it. Play them together with the zoom so the detail changes while it happens.
+        """
         animations = []
-        for k, arrow in self.get_edges_with_keys(*keys, inverse=True):
-            org_opa = self.edge_highlight_state_map[k]
-            del self.edge_highlight_state_map[k]
-            animations.append(arrow.animate.set_opacity(org_opa))
-        return animations
+        for node in self.nodes:
+            if isinstance(node, NodeGraph):
+                animations.extend(node.update_level_of_detail(frame_width))
+        swaps, restrokes = [], []
+        for edge in self._get_edges_and_batches(all=True):
+            tipless = on_screen_size(self._tip_size(edge), frame_width) < self.tip_below
+            edge_swaps, edge_restrokes = self._edge_swaps(edge, tipless, thin_width)
+            swaps.extend(edge_swaps)
+            restrokes.extend(edge_restrokes)
+        return animations + detail_switch(swaps, restrokes)
+
+    def highlight_edges(self, *keys, group=False):
+        dimmed = []
+        for edge_keys, edge in self.get_edge_groups(*keys, inverse=True):
+            for k in edge_keys:
+                self.edge_highlight_state_map[k] = 1
+            dimmed.append(edge)
+        if group:
+            return list(group_opacity(dimmed, opacity=.1))
+        return [edge.animate.set_opacity(.1) for edge in dimmed]
+
+    def add_highlight_edges(self, *keys, group=False):
+        return self._restore_highlight_edges(self.get_edge_groups(*keys), group=group, check=True)
+
+    def undo_highlight_edges(self, *keys, group=False):
+        return self._restore_highlight_edges(self.get_edge_groups(*keys, inverse=True), group=group)
+
+    def _restore_highlight_edges(self, edge_groups, group=False, check=False):
+        by_opacity: Dict[float, List] = {}
+        for edge_keys, edge in edge_groups:
+            if check:
+                assert all(k in self.edge_highlight_state_map for k in edge_keys)
+            org_opa = self.edge_highlight_state_map[edge_keys[0]]
+            for k in edge_keys:
+                del self.edge_highlight_state_map[k]
+            by_opacity.setdefault(org_opa, []).append(edge)
+        if group:
+            return [anim for org_opa, edges in by_opacity.items() for anim in group_opacity(edges, opacity=org_opa)]
+        return [edge.animate.set_opacity(org_opa) for org_opa, edges in by_opacity.items() for edge in edges]
 
     def cleanup_highlight_edges(self, *keys):
-        for k, arrow in self.get_edges_with_keys(*keys, inverse=True):
+        for k in self.get_edge_keys(*keys, inverse=True):
             del self.edge_highlight_state_map[k]
 
-    def highlight_nodes(self, *names):
-        animations = []
+    def highlight_nodes(self, *names, group=False, overlay=False):
+        """
+        Dim every node but the given ones. The default mode dims each of the other nodes, overlay=True instead fades in
+        one frame-sized translucent rectangle and raises the given nodes above it, which costs the same no matter how
+        large the graph is, and dims edges and captions as well.
+        """
+        if overlay:
+            return self._highlight_with_overlay(*names)
+        dimmed = []
         for k, obj in self.get_objects_with_index(*names, inverse=True):
-            self.node_highlight_state_map[k] = obj.copy()
-            animations.append(obj.animate.set_opacity(.1))
-        return animations
+            self.node_highlight_state_map[k] = StyleSnapshot(obj)
+            dimmed.append(obj)
+        if group:
+            return list(group_opacity(dimmed, opacity=.1))
+        return [obj.animate.set_opacity(.1) for obj in dimmed]
 
-    def add_highlight_nodes(self, *names):
-        animations = []
+    def _highlight_with_overlay(self, *names):
+        self.dim_overlay = (FullScreenRectangle(stroke_width=0, fill_color=BLACK, fill_opacity=.9)
+                            .set_z_index(self.dim_overlay_z_index))
+        self._raise_above_overlay(*names)
+        return [FadeIn(self.dim_overlay)]
+
+    def _raise_above_overlay(self, *names):
+        raised = []
+        for k, obj in self.get_objects_with_index(*names):
+            self.dim_overlay_raised_z_indices.extend((mob, mob.z_index) for mob in obj.get_family())
+            obj.set_z_index(self.dim_overlay_z_index + 1)
+            raised.append(obj)
+        return raised
+
+    def add_highlight_nodes(self, *names, group=False):
+        if self.dim_overlay is not None:
+            return list(group_opacity(self._raise_above_overlay(*names), fade_in=True))
+        snapshots = []
         for k, obj in self.get_objects_with_index(*names):
             assert k in self.node_highlight_state_map
-            org_obj = self.node_highlight_state_map[k]
-            del self.node_highlight_state_map[k]
-            animations.append(Transform(obj, org_obj))
-        return animations
+            snapshots.append(self.node_highlight_state_map.pop(k))
+        return self._restore_styles(snapshots, group=group)
 
-    def undo_highlight_nodes(self, *names):
-        animations = []
-        for k, obj in self.get_objects_with_index(*names, inverse=True):
-            org_obj = self.node_highlight_state_map[k]
-            del self.node_highlight_state_map[k]
-            animations.append(Transform(obj, org_obj))
-        return animations
+    def undo_highlight_nodes(self, *names, group=False):
+        if self.dim_overlay is not None:
+            animation = _LiftDimOverlay(self.dim_overlay, self.dim_overlay_raised_z_indices)
+            self.dim_overlay, self.dim_overlay_raised_z_indices = None, []
+            return [animation]
+        snapshots = [self.node_highlight_state_map.pop(k)
+                     for k, obj in self.get_objects_with_index(*names, inverse=True)]
+        return self._restore_styles(snapshots, group=group)
+
+    @staticmethod
+    def _restore_styles(snapshots, group=False):
+        if len(snapshots) == 0:
+            return []
+        if group:
+            return [RestoreStyle(*snapshots)]
+        return [RestoreStyle(snapshot) for snapshot in snapshots]
 
-    def cleanup_highlight_nodes(self, *names):
+    def cleanup_highlight_nodes(self, *names, scene=None):
+        """
+        Forget the highlight of nodes that are gone from the scene. With the overlay, the raised objects get their own
+        z-index back and the overlay is taken out of the scene at once, like at the end of undo_highlight_nodes.
+        """
+        if self.dim_overlay is not None:
+            for mob, z_index in self.dim_overlay_raised_z_indices:
+                mob.z_index = z_index
+            if scene is not None:
+                scene.remove(self.dim_overlay)
+            self.dim_overlay, self.dim_overlay_raised_z_indices = None, []
+            return
         for k, obj in self.get_objects_with_index(*names, inverse=True):
             del self.node_highlight_state_map[k]
 
@@ -234,11 +870,24 @@ class LabelNode(VGroup, NodeBase):
             return None
 
 
+_default_layout_cache = None
+
+
+def default_layout_cache():
+    global _default_layout_cache
+    if _default_layout_cache is None:
+        _default_layout_cache = LayoutCache(Path(config.media_dir) / "layout_cache.json")
+    return _default_layout_cache
+
+
 class NodeGraph(VGroup, NodeBase):
     def __init__(self, name, title, node_params: List[Dict], box_size: Tuple[float, float],
-                 title_padding=1.3, box_padding=.5, bot_padding=.5, **kwargs):
+                 title_padding=1.3, box_padding=.5, bot_padding=.5, dot_below=16, density_below=6, seed=LAYOUT_SEED,
+                 layout_cache: LayoutCache = None, **kwargs):
         super().__init__(**kwargs)
         self.name = name
+        self.seed = seed
+        self.layout_cache = default_layout_cache() if layout_cache is None else layout_cache
         self.box_width, self.box_height = box_size
         self.box_padding = box_padding
         self.title_padding = title_padding
@@ -249,36 +898,115 @@ class NodeGraph(VGroup, NodeBase):
         self.title = title.copy().next_to(self.box.get_top(),
                                           DOWN * (title_padding / 2),
                                           aligned_edge=UP)
-        node_locations = self._generate_uniform_locations()
+        node_locations = self._get_uniform_locations()
         self.nodes = [self.make_graph_nodes(**param).move_to(self.box.get_corner(UL) + RIGHT * loc_x + DOWN * loc_y)
                       for param, (loc_x, loc_y) in zip(node_params, node_locations)]
         self.node_names = [param["rep_name"] for param in self.node_params]
-        self.node_map = {param["rep_name"]: idx + 2 for idx, param in enumerate(self.node_params)}
+        self.node_map = {param["rep_name"]: idx for idx, param in enumerate(self.node_params)}
         self.add(self.title, self.box, *self.nodes)
+        # level of detail, node sizes are measured at construction and scaled along with the box
+        self.dot_below = dot_below
+        self.density_below = density_below
+        self.level_of_detail = LOD_FULL
+        self.node_level_of_detail = LOD_FULL
+        self.node_diameter = max((node.width for node in self.nodes), default=0)
+        self.node_spacing = self.box_width
+        if len(self.nodes) > 1:
+            centers = np.array([node.get_center() for node in self.nodes])
+            distances = np.linalg.norm(centers[:, None] - centers[None, :], axis=-1)
+            np.fill_diagonal(distances, np.inf)
+            self.node_spacing = distances.min()
+        self._full_parts = [list(node.submobjects) for node in self.nodes]
+        self._dot_parts: Dict[int, List[Mobject]] = {}
+        self._density_glyph = None
+        self._dense_members: List[Mobject] = []
 
     def get_node(self, name):
         if name == self.name:
             return self
         idx = self.node_map.get(name, None)
         if idx is not None:
-            return self[idx]
+            return self.nodes[idx]
         return None
 
+    def get_level_of_detail(self, frame_width=None):
+        scale = self.box.width / self.box_width
+        if len(self.nodes) > 1 and on_screen_size(self.node_spacing * scale, frame_width) < self.density_below:
+            return LOD_DENSITY
+        if on_screen_size(self.node_diameter * scale, frame_width) < self.dot_below:
+            return LOD_DOT
+        return LOD_FULL
+
+    def update_level_of_detail(self, frame_width=None):
+        return self.set_level_of_detail(self.get_level_of_detail(frame_width))
+
+    def _get_dot_parts(self, idx):
+        if idx not in self._dot_parts:
+            circle = self._full_parts[idx][0]
+            self._dot_parts[idx] = [Dot(radius=circle.width / 4, color=circle.get_stroke_color())]
+        return self._dot_parts[idx]
+
+    def _get_density_glyph(self):
+        scale = self.box.width / self.box_width
+        if self._density_glyph is None:
+            radius = min(self.box_width, self.box_height) / 4
+            disc = Circle(radius=radius).set_stroke(color=WHITE, width=2).set_fill(
+                color=GREY, opacity=min(.2 + len(self.nodes) / 50, .8))
+            count = Text(str(len(self.nodes))).scale_to_fit_height(radius * .6)
+            self._density_glyph = VGroup(disc, count)
+        glyph = self._density_glyph
+        glyph.scale_to_fit_width(min(self.box_width, self.box_height) / 2 * scale)
+        return glyph.move_to(self.box.get_center() + DOWN * self.title_padding * scale / 2)
+
+    def _node_swaps(self, level):
+        if level == self.node_level_of_detail:
+            return []
+        self.node_level_of_detail = level
+        swaps = []
+        for idx, node in enumerate(self.nodes):
+            incoming = self._full_parts[idx] if level == LOD_FULL else self._get_dot_parts(idx)
+            Group(*incoming).move_to(node.get_center())
+            swaps.append((node, list(node.submobjects), incoming))
+        return swaps
+
+    def set_level_of_detail(self, level):
+        """
+        Switch to LOD_FULL (circles with their Tex names), LOD_DOT (plain dots) or LOD_DENSITY (one glyph with the
+        number of nodes in place of all of them), returning the cross-fade as a list of animations.
+        """
+        if level == self.level_of_detail:
+            return []
+        if level == LOD_DENSITY:
+            self._dense_members = [mob for mob in self.submobjects if mob is not self.title and mob is not self.box]
+            swaps = [(self, self._dense_members, [self._get_density_glyph()])]
+        elif self.level_of_detail == LOD_DENSITY:
+            # the nodes are hidden behind the glyph, so they can change detail without an animation
+            for node, outgoing, incoming in self._node_swaps(level):
+                node.remove(*outgoing)
+                node.add(*incoming)
+            swaps = [(self, [self._density_glyph], self._dense_members)]
+        else:
+            swaps = self._node_swaps(level)
+        self.level_of_detail = level
+        return detail_switch(swaps)
+
     def fadeOut_box(self):
         return (FadeOut(self.box, self.title),)
 
     def fadeIn_box(self):
         return (FadeIn(self.box, self.title),)
 
-    def fadeOut_nodes(self, *names, all=False):
-        if all:
-            return (FadeOut(node) for node in self.nodes)
-        return (FadeOut(self.get_node(name)) for name in names)
+    def fadeOut_nodes(self, *names, all=False, group=False):
+        nodes = self.nodes if all else [self.get_node(name) for name in names]
+        if group:
+            return group_opacity(nodes, fade_out=True)
+        return (FadeOut(node) for node in nodes)
 
-    def fadeIn_nodes(self, *names, all=False):
-        if all:
-            return (FadeIn(node) for node in self.nodes)
-        return (FadeIn(self.get_node(name)) for name in names)
+    def fadeIn_nodes(self, *names, all=False, group=False):
+        nodes = self.nodes if all else [self.get_node(name) for name in names]
+        if group:
+            return group_opacity(nodes, fade_in=True)
+        return (FadeIn(node) for node in nodes)
 
     def fully_connect_nodes(self, edge_manger: EdgeManager):
         keys = [(self.node_names[i], self.node_names[j])
@@ -286,6 +1014,17 @@ class NodeGraph(VGroup, NodeBase):
         arrows = edge_manger.add_edges(*keys, bidirectional=True, stroke_width=2, buff=0, tip_width=.125)
         self.add(*arrows)
 
+    def _get_uniform_locations(self):
+        """The node locations from the layout cache, generated and stored on the first run with these parameters."""
+        nodes = [(param["rep_name"], param.get("radius", .3)) for param in self.node_params]
+        key = layout_key("uniform", self.name, nodes, self.box_width, self.box_height, self.box_padding,
+                         self.title_padding, self.bot_padding, self.seed)
+        locations = self.layout_cache.get(key)
+        if locations is None:
+            locations = self._generate_uniform_locations()
+            self.layout_cache.put(key, locations)
+        return [tuple(loc) for loc in locations]
+
     def _generate_uniform_locations(self):
         """
         Generate a list of unique (x, y) locations ensuring no overlap and a minimum distance between points,
@@ -304,13 +1043,14 @@ class NodeGraph(VGroup, NodeBase):
         radius_range = (radius / 4 * 3, radius / 4 * 6)
         min_distance = max(param.get("radius", .3) * 3 for param in self.node_params)
 
+        rng = random.Random(layout_seed(self.name, self.seed))
         attempts = 0
         max_attempts = num_points * 100
 
         locations = []
         while len(locations) < num_points and attempts < max_attempts:
-            curr_angle = len(locations) * angle_per_item + random.uniform(*angle_delta_range)
-            curr_radius = random.uniform(*radius_range)
+            curr_angle = len(locations) * angle_per_item + rng.uniform(*angle_delta_range)
+            curr_radius = rng.uniform(*radius_range)
             x = center[0] + curr_radius * math.cos(curr_angle)
             y = center[1] + curr_radius * math.sin(curr_angle)
 
@@ -323,11 +1063,121 @@ class NodeGraph(VGroup, NodeBase):
         if len(locations) < num_points:
             raise Exception("Warning: Could not generate the required number of points with given constraints.")
 
-        random.shuffle(locations)
+        rng.shuffle(locations)
         return locations
 
     @staticmethod
     def make_graph_nodes(name, radius=.5, font_size=56, **kwargs):
         c = Circle(radius=radius).set_stroke(color=WHITE, width=2).set_fill(opacity=0)
-        t = Tex(name, font_size=font_size).move_to(c.get_center())
+        t = make_tex(name, font_size=font_size).move_to(c.get_center())
         return VGroup(c, t)
+
+
+def get_graph_layout(*nodes_and_graphs):
+    """The centre of every node and node graph, and of the nodes inside each graph, keyed by name."""
+    layout = {}
+    for node in EdgeManager(*nodes_and_graphs).nodes:
+        layout[node.name] = node.get_center()
+        if isinstance(node, NodeGraph):
+            layout.update((name, obj.get_center()) for name, obj in zip(node.node_names, node.nodes))
+    return layout
+
+
+def apply_graph_layout(layout, *nodes_and_graphs):
+    """Move nodes and node graphs to the centres recorded by get_graph_layout. Names missing from it stay put."""
+    for node in EdgeManager(*nodes_and_graphs).nodes:
+        if node.name in layout:
+            node.move_to(layout[node.name])
+        if isinstance(node, NodeGraph):
+            for name, obj in zip(node.node_names, node.nodes):
+                if name in layout:
+                    obj.move_to(layout[name])
+
+
+class AggregatedGraph(VGroup, NodeBase):
+    """
+    A graph too large to show node by node, drawn as the items of a ClusterView: clusters as super-nodes, and one edge
+    per pair of items labelled with the number of edges it stands for. make_item(item) builds the mobject of an item,
+    and is only ever called for items that are shown.
+    """
+
+    def __init__(self, name, view, make_item, cell_size: Tuple[float, float] = (8, 4), edge_color=ORANGE,
+                 stroke_width=6, tip_width=.4, font_size=40, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.view = view
+        self.make_item = make_item
+        self.cell_width, self.cell_height = cell_size
+        self.edge_color = edge_color
+        self.stroke_width = stroke_width
+        self.tip_width = tip_width
+        self.font_size = font_size
+        self.item_objects: Dict[Any, Mobject] = {}
+        self.item_cells: Dict[Any, Tuple[np.ndarray, float, float]] = {}
+        self.edge_objects: Dict[Tuple[Any, Any], VGroup] = {}
+        self.edge_counts: Dict[Tuple[Any, Any], int] = {}
+        self._place_items(view.items, ORIGIN, self.cell_width, self.cell_height)
+        self.add(*self.item_objects.values())
+        self._update_edges()
+        self.add(*self.edge_objects.values())
+
+    @staticmethod
+    def _item_name(item):
+        return getattr(item, "name", item)
+
+    def get_node(self, name):
+        if name == self.name:
+            return self
+        return self.item_objects.get(name, None)
+
+    def _place_items(self, items, center, width, height):
+        """Build the mobjects of the items, fitted into a grid of cells filling a width x height area at center."""
+        cols = math.ceil(math.sqrt(len(items) * width / height))
+        rows = math.ceil(len(items) / cols)
+        cell_width, cell_height = width / cols, height / rows
+        top_left = center + LEFT * (width - cell_width) / 2 + UP * (height - cell_height) / 2
+        placed = []
+        for idx, item in enumerate(items):
+            obj = self.make_item(item)
+            if obj.width > cell_width * .9 or obj.height > cell_height * .9:
+                obj.scale(min(cell_width * .9 / obj.width, cell_height * .9 / obj.height))
+            cell_center = top_left + RIGHT * cell_width * (idx % cols) + DOWN * cell_height * (idx // cols)
+            obj.move_to(cell_center)
+            self.item_objects[self._item_name(item)] = obj
+            self.item_cells[self._item_name(item)] = (cell_center, cell_width, cell_height)
+            placed.append(obj)
+        return placed
+
+    def _make_edge(self, key, count):
+        f, t = key
+        arrow = Arrow(self.item_objects[f], self.item_objects[t], buff=.1, color=self.edge_color,
+                      stroke_width=self.stroke_width, tip_length=self.tip_width, max_tip_length_to_length_ratio=100)
+        if count == 1:
+            return VGroup(arrow)
+        multiplicity = (Text(f"x{count}", font_size=self.font_size, color=self.edge_color)
+                        .next_to(arrow.get_center(), UP + RIGHT, buff=.1))
+        return VGroup(arrow, multiplicity)
+
+    def _update_edges(self):
+        """Bring the edges in line with the view, returning the ones that went away and the ones that are new."""
+        counts = self.view.item_edges()
+        removed = [self.edge_objects.pop(key) for key, count in self.edge_counts.items() if counts.get(key) != count]
+        added = []
+        for key, count in counts.items():
+            if key not in self.edge_objects:
+                self.edge_objects[key] = self._make_edge(key, count)
+                added.append(self.edge_objects[key])
+        self.edge_counts = counts
+        return removed, added
+
+    def drill_down(self, name):
+        """Expand one cluster in place: its children grow out of it, and the edges around it split accordingly."""
+        cluster = self.item_objects.pop(name)
+        children = self._place_items(self.view.expand(name), *self.item_cells.pop(name))
+        removed_edges, added_edges = self._update_edges()
+        self.remove(cluster, *removed_edges)
+        self.add(*children, *added_edges)
+        return [FadeOut(cluster, scale=1.5),
+                *(FadeOut(edge) for edge in removed_edges),
+                *(FadeIn(child, target_position=cluster, scale=.25) for child in children),
+                *(GrowFromCenter(edge) for edge in added_edges)]
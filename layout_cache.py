@@ -0,0 +1,49 @@
+# Layouts computed once and kept on disk, shared by later runs and by parallel render workers.
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+
+LAYOUT_SEED = 1028
+
+
+def layout_seed(name, seed=LAYOUT_SEED):
+    """The seed of one graph's own RNG, so its layout does not depend on what was laid out before it."""
+    return zlib.crc32(f"{seed}:{name}".encode("utf-8"))
+
+
+def layout_key(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class LayoutCache:
+    """
+    A JSON file of layouts by key. Writes merge with what other processes stored in the meantime and replace the
+    file atomically, so workers can share one cache.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.layouts: Optional[Dict] = None
+
+    def _read(self):
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, key):
+        if self.layouts is None:
+            self.layouts = self._read()
+        return self.layouts.get(key)
+
+    def put(self, key, layout):
+        self.layouts = {**self._read(), **(self.layouts or {}), key: layout}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.layouts, f)
+        os.replace(tmp, self.path)
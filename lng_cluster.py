@@ -0,0 +1,131 @@
+# Clustering of label navigating graphs that are too large to show one label set at a time.
+from collections import Counter, defaultdict, deque
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+
+class Cluster:
+    """
+    A group of label sets shown as one super-node. A cluster with children expands into them, a cluster without
+    expands into its member label sets.
+    """
+
+    def __init__(self, name, key, members, children=()):
+        self.name = name
+        self.key = key
+        self.members = list(members)
+        self.children = list(children)
+
+    def expand(self):
+        return list(self.children) if len(self.children) != 0 else list(self.members)
+
+    def __len__(self):
+        return len(self.members)
+
+    def __repr__(self):
+        return f"Cluster({self.name!r}, {len(self.members)} label sets)"
+
+
+def item_name(item):
+    return item.name if isinstance(item, Cluster) else item
+
+
+def item_members(item):
+    return item.members if isinstance(item, Cluster) else [item]
+
+
+def cluster_by_prefix(label_sets: Dict[Hashable, Sequence], max_size=16, _prefix=()) -> List:
+    """
+    Group label sets by the labels they start with once sorted. Groups of more than max_size sets are split again on
+    the next label, so drilling into a cluster never shows more than max_size items unless the sets themselves do.
+    """
+    groups: Dict[Tuple, List[Hashable]] = defaultdict(list)
+    depth = len(_prefix) + 1
+    items = []
+    for name, labels in label_sets.items():
+        ordered = tuple(sorted(labels))
+        if len(ordered) < depth:
+            items.append(name)  # the set is the prefix itself
+        else:
+            groups[ordered[:depth]].append(name)
+    for prefix, names in groups.items():
+        if len(names) == 1:
+            items.append(names[0])
+            continue
+        children = []
+        if len(names) > max_size:
+            children = cluster_by_prefix({name: label_sets[name] for name in names}, max_size=max_size,
+                                         _prefix=prefix)
+            if len(children) == 1 and isinstance(children[0], Cluster):
+                # every set shares the next label as well, skip the level that would only hold one cluster
+                items.append(children[0])
+                continue
+        items.append(Cluster("prefix:" + "/".join(map(str, prefix)), prefix, names, children))
+    return items
+
+
+def cluster_by_containment(label_sets: Dict[Hashable, Sequence], edges: Iterable[Tuple], max_size=16) -> List:
+    """
+    Group label sets by the subtree below them in a spanning forest of the LNG. Edges point from subsets to supersets,
+    so every cluster is a label set together with supersets reachable from it. Subtrees of more than max_size sets
+    expand into their root and the clusters of its children.
+    """
+    successors: Dict[Hashable, List[Hashable]] = defaultdict(list)
+    has_subset = set()
+    for f, t in edges:
+        successors[f].append(t)
+        has_subset.add(t)
+    roots = [name for name in label_sets if name not in has_subset]
+    tree_children: Dict[Hashable, List[Hashable]] = defaultdict(list)
+    visited = set(roots)
+    order = []
+    queue = deque(roots)
+    while len(queue) != 0:
+        name = queue.popleft()
+        order.append(name)
+        for successor in successors[name]:
+            if successor not in visited:
+                visited.add(successor)
+                tree_children[name].append(successor)
+                queue.append(successor)
+    subtree: Dict[Hashable, List[Hashable]] = {}
+    for name in reversed(order):
+        subtree[name] = [name, *(member for child in tree_children[name] for member in subtree[child])]
+
+    def build(name):
+        members = subtree[name]
+        if len(members) == 1:
+            return name
+        children = [name, *(build(child) for child in tree_children[name])] if len(members) > max_size else []
+        return Cluster(f"subtree:{name}", (name,), members, children)
+
+    return [build(root) for root in roots]
+
+
+class ClusterView:
+    """The items of a clustered LNG that are currently shown, and the edges between them with their multiplicity."""
+
+    def __init__(self, items, edges: Iterable[Tuple]):
+        self.items = list(items)
+        self.edges = list(edges)
+
+    def get_item(self, name):
+        for item in self.items:
+            if item_name(item) == name:
+                return item
+        raise Exception(f"Could not find {name}")
+
+    def item_edges(self) -> Dict[Tuple, int]:
+        """Edges between visible items, each counting the LNG edges it stands for. Edges inside one item are hidden."""
+        owner = {member: item_name(item) for item in self.items for member in item_members(item)}
+        counts = Counter((owner[f], owner[t]) for f, t in self.edges if f in owner and t in owner)
+        return {key: count for key, count in counts.items() if key[0] != key[1]}
+
+    def expand(self, name):
+        """Replace a cluster with what it expands into, returning the new items."""
+        item = self.get_item(name)
+        if not isinstance(item, Cluster):
+            raise Exception(f"{name} is a single label set and can not be expanded")
+        idx = self.items.index(item)
+        expanded = item.expand()
+        self.items[idx:idx + 1] = expanded
+        return expanded
@@ -0,0 +1,59 @@
+# The example dataset shown throughout the deck. This module must not import Manim, tooling that only needs the data
+# or the graph algorithms should not pay for loading the renderer.
+
+LABELS = [("venue", "SIGMOD"),
+          ("year", "2024"),
+          ("subject", "graph"),
+          ("year", "2025"),
+          ("subject", "DBMS"),
+          ("with code", "yes"),
+          ("venue", "VLDB"),
+          ("subject", "DG")]
+
+# label ids and document ids are 1-based, matching the v_{n} / f{n} names shown on the slides
+LABEL_SETS_INFO = [
+    {"labels": [1, 2, 3], "documents": [1, 21, 22], "entry": 1},
+    {"labels": [1, 4, 5], "documents": [2, 11, 12], "entry": 11},
+    {"labels": [1, 4, 5, 6], "documents": [3, 17, 18], "entry": 3},
+    {"labels": [7, 2, 8], "documents": [4, 16], "entry": 16},
+    {"labels": [1], "documents": [5, 6, 7], "entry": 5},
+    {"labels": [1, 3], "documents": [13, 14, 15], "entry": 14},
+    {"labels": [2], "documents": [8, 9, 10], "entry": 8},
+    {"labels": [1, 4, 3, 6], "documents": [19, 20], "entry": 19},
+]
+
+LNG_EDGE_INFOS = [(5, 2), (5, 6), (7, 4), (7, 1), (2, 3), (6, 8), (6, 1)]
+
+UNG_CROSS_GROUP_EDGE_INFOS = [(5, 2), (5, 13), (7, 11), (6, 11),
+                              (2, 18), (12, 3), (11, 3),
+                              (14, 19), (13, 20), (15, 19), (15, 22),
+                              (9, 22), (10, 4), (8, 4)]
+
+UNG_INNER_GRAPH_EDGE_INFOS = [(7, 6), (6, 7), (6, 5), (5, 7),
+                              (12, 2), (11, 12), (11, 2),
+                              (13, 14), (14, 13), (14, 15), (15, 14),
+                              (18, 17), (18, 3), (3, 18), (3, 17),
+                              (19, 20), (20, 19),
+                              (8, 9), (8, 10),
+                              (16, 4),
+                              (22, 21), (21, 22), (22, 1), (1, 22), (21, 1), (1, 21)]
+
+
+def filter_edges(edges, f=None, t=None, inverse=False):
+    if not inverse:
+        if f is None and t is None:
+            return edges
+        elif f is None:
+            t_set = set(t)
+            return (e for e in edges if e[1] in t_set)
+        elif t is None:
+            f_set = set(f)
+            return (e for e in edges if e[0] in f_set)
+        else:
+            t_set = set(t)
+            f_set = set(f)
+            return (e for e in edges if e[0] in f_set and e[1] in t_set)
+    else:
+        materialized_edges = list(edges)
+        filtered_edges = set(*filter_edges(materialized_edges, f=f, t=t, inverse=False))
+        return [e for e in materialized_edges if e not in filtered_edges]
@@ -0,0 +1,122 @@
+# Statistics of a label navigating graph (LNG), for query planning and for sizing label sets on screen.
+from collections import Counter, defaultdict, deque
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from lng_data import LABEL_SETS_INFO, LNG_EDGE_INFOS
+
+
+class LNGStatistics:
+    """
+    Vector counts of every label set, the cumulative count over each label set and all of its supersets, and how
+    many vectors carry each label.
+
+    Sets of label sets are bitmasks, one bit per label set in the order of label_sets. The supersets of a label set are
+    what it reaches in the LNG, whose edges point from subsets to minimum supersets, so the cumulative counts come
+    from one pass in reverse topological order OR-ing the masks of the successors. The vectors matching any filter are
+    the ones in the label sets whose bit is set in every mask of the filter's labels, see estimate.
+    """
+
+    def __init__(self, label_sets: Dict[Hashable, Sequence], counts: Dict[Hashable, int], edges: Iterable[Tuple]):
+        self.names = list(label_sets)
+        self.position = {name: i for i, name in enumerate(self.names)}
+        self.label_sets = {name: frozenset(labels) for name, labels in label_sets.items()}
+        self.counts = np.array([counts.get(name, 0) for name in self.names], dtype=np.int64)
+        self.total = int(self.counts.sum())
+
+        self.label_masks: Dict[Hashable, int] = defaultdict(int)
+        label_frequency = Counter()
+        for i, name in enumerate(self.names):
+            for label in self.label_sets[name]:
+                self.label_masks[label] |= 1 << i
+                label_frequency[label] += int(self.counts[i])
+        self.label_frequency = dict(label_frequency)
+
+        self.reach_masks = self._reach_masks(edges)
+        self.cumulative_counts = {name: self.count(self.reach_masks[i]) for i, name in enumerate(self.names)}
+        self._estimates: Dict[frozenset, int] = {}
+
+    def _reach_masks(self, edges) -> List[int]:
+        successors: Dict[int, List[int]] = defaultdict(list)
+        in_degree = [0] * len(self.names)
+        for f, t in edges:
+            successors[self.position[f]].append(self.position[t])
+            in_degree[self.position[t]] += 1
+        order = []
+        queue = deque(i for i, degree in enumerate(in_degree) if degree == 0)
+        while len(queue) != 0:
+            i = queue.popleft()
+            order.append(i)
+            for j in successors[i]:
+                in_degree[j] -= 1
+                if in_degree[j] == 0:
+                    queue.append(j)
+        if len(order) != len(self.names):
+            raise Exception("The LNG has a cycle, its edges must point from subsets to supersets")
+        masks = [0] * len(self.names)
+        for i in reversed(order):
+            mask = 1 << i
+            for j in successors[i]:
+                mask |= masks[j]
+            masks[i] = mask
+        return masks
+
+    def count(self, mask: int) -> int:
+        """The number of vectors in the label sets of a mask."""
+        if mask == 0:
+            return 0
+        packed = np.frombuffer(mask.to_bytes((len(self.names) + 7) // 8, "little"), dtype=np.uint8)
+        bits = np.unpackbits(packed, bitorder="little")[:len(self.names)]
+        return int(self.counts @ bits)
+
+    def superset_mask(self, query_labels) -> int:
+        query_labels = frozenset(query_labels)
+        mask = (1 << len(self.names)) - 1
+        for label in query_labels:
+            mask &= self.label_masks.get(label, 0)
+        return mask
+
+    def estimate(self, query_labels) -> int:
+        """The number of vectors matching a filter on query_labels, which need not be a label set of the LNG."""
+        key = frozenset(query_labels)
+        estimate = self._estimates.get(key)
+        if estimate is None:
+            estimate = self._estimates[key] = self.count(self.superset_mask(key))
+        return estimate
+
+    def groups(self, query_labels) -> int:
+        """The number of label sets matching a filter on query_labels."""
+        return self.superset_mask(query_labels).bit_count()
+
+    def selectivity(self, query_labels) -> float:
+        return self.estimate(query_labels) / self.total if self.total != 0 else 0.
+
+
+def example_statistics():
+    """The statistics of the deck's example LNG, label sets named by their 1-based id like on the slides."""
+    return LNGStatistics({ls_id: info["labels"] for ls_id, info in enumerate(LABEL_SETS_INFO, start=1)},
+                         {ls_id: len(info["documents"]) for ls_id, info in enumerate(LABEL_SETS_INFO, start=1)},
+                         LNG_EDGE_INFOS)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Print the statistics of the example LNG and time the estimator.")
+    parser.add_argument("--labels", type=int, nargs="*", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=10000)
+    args = parser.parse_args()
+    statistics = example_statistics()
+    print(f"{'label set':>9} {'labels':<16} {'vectors':>8} {'cumulative':>11}")
+    for name, count in zip(statistics.names, statistics.counts):
+        print(f"{name:>9} {str(sorted(statistics.label_sets[name])):<16} {count:>8} "
+              f"{statistics.cumulative_counts[name]:>11}")
+    print(f"label frequency: {dict(sorted(statistics.label_frequency.items()))}")
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        statistics._estimates.clear()
+        statistics.estimate(args.labels)
+    elapsed = (time.perf_counter() - start) / args.repeat
+    print(f"filter {args.labels}: {statistics.estimate(args.labels)} vectors, {elapsed * 1e6:.1f} us per estimate")
@@ -1,20 +1,45 @@
 from __future__ import annotations
 
+import argparse
+import functools
+
 from manim import *
+from manim.renderer.cairo_renderer import CairoRenderer
 from manim_slides.slide import Slide
 
 config.frame_width = 30 * 1.5
 config.frame_height = 15 * 1.5
 
-from graph_util import LabelNode, NodeGraph, EdgeManager, SOLID, DASHED
+from graph_util import LabelNode, NodeGraph, EdgeManager, AggregatedGraph, SOLID, DASHED, consolidate_edge_batches
+from lng_cluster import Cluster, ClusterView, cluster_by_containment, cluster_by_prefix
+from lng_data import (LABELS, LABEL_SETS_INFO, LNG_EDGE_INFOS, UNG_CROSS_GROUP_EDGE_INFOS,
+                      UNG_INNER_GRAPH_EDGE_INFOS, filter_edges)
+from render_cache import CullingCamera, CullingMixin, DraftMixin, StaticLayerMixin, StaticLayerRenderer
+from render_profile import MemoryProfiler, PlayProfiler, PlayProfilerMixin
+from slide_export import StreamingExportMixin
+from tex_cache import find_tex_literals, make_tex, precompile_tex, set_draft
+from trace_player import (MetricsOverlay, SubgraphTraceView, TracePlayer, UNGTraceView, layered_positions,
+                          project_positions, trace_vector_ids)
+from ung_search import SearchTrace, example_index, example_query_vector
+
+
+# decks with more label sets than this show the LNG as clusters (see make_aggregated_lng) unless told otherwise
+AGGREGATE_LNG_ABOVE = 16
 
 
 def TransformTo(from_obj, to_obj):
     return TransformFromCopy(from_obj, to_obj), FadeOut(from_obj)
 
 
-document_icon = SVGMobject("document-add-svgrepo-com.svg", fill_color=WHITE, fill_opacity=1)
-embedding_icon = SVGMobject("graph-infographic-data-matrix-element-svgrepo-com.svg", fill_color=WHITE, fill_opacity=1)
+# svg templates are parsed on first use only, callers copy the cached template before modifying it
+@functools.cache
+def document_icon():
+    return SVGMobject("document-add-svgrepo-com.svg", fill_color=WHITE, fill_opacity=1)
+
+
+@functools.cache
+def embedding_icon():
+    return SVGMobject("graph-infographic-data-matrix-element-svgrepo-com.svg", fill_color=WHITE, fill_opacity=1)
 
 
 def make_brace_with_label(obj, text, use_tex=False, font_size=48, text_buff=0., **brace_kwargs):
@@ -33,7 +58,7 @@ def make_multiline_text(*texts, use_tex=True, font_size=72., buff: list | float
     last_line = None
     for i, text in enumerate(texts):
         if use_tex:
-            t = Tex(text, font_size=font_size)
+            t = make_tex(text, font_size=font_size)
         else:
             t = Text(text, font_size=font_size)
         if last_line is not None:
@@ -64,6 +89,17 @@ def make_label_set_rep(label_set, font_size=60, gap_left=.25, gap_right=.25, gap
     return VGroup(*reps)
 
 
+def make_cluster_rep(shared_label_reps, size, font_size=60, buff=.3):
+    if len(shared_label_reps) != 0:
+        shared = make_label_set_rep(shared_label_reps, font_size=font_size)
+    else:
+        shared = Text("{ }", font_size=font_size)
+    count = Text(f"{size} label sets", font_size=font_size * .75)
+    content = VGroup(shared, count).arrange(DOWN, buff=buff)
+    box = SurroundingRectangle(content, buff=buff, corner_radius=.25).set_stroke(color=WHITE, width=4)
+    return VGroup(box, content)
+
+
 def make_legend(*arrow_configs, font_size=54, buff=.25, arrow_length=2.):
     legend = VGroup()
     for arrow_config in arrow_configs:
@@ -105,75 +141,35 @@ def make_document_rep(attribute_dict, icon_template=None, show_text=False, paddi
     return VGroup(paper, icon, attribute).move_to(ORIGIN)
 
 
-def filter_edges(edges, f=None, t=None, inverse=False):
-    if not inverse:
-        if f is None and t is None:
-            return edges
-        elif f is None:
-            t_set = set(t)
-            return (e for e in edges if e[1] in t_set)
-        elif t is None:
-            f_set = set(f)
-            return (e for e in edges if e[0] in f_set)
-        else:
-            t_set = set(t)
-            f_set = set(f)
-            return (e for e in edges if e[0] in f_set and e[1] in t_set)
-    else:
-        materialized_edges = list(edges)
-        filtered_edges = set(*filter_edges(materialized_edges, f=f, t=t, inverse=False))
-        return [e for e in materialized_edges if e not in filtered_edges]
-
-
-class LNGDemonstration(Slide):
-    def __init__(self, *args, **kwargs):
+class LNGDemonstration(PlayProfilerMixin, StreamingExportMixin, DraftMixin, CullingMixin, StaticLayerMixin, Slide):
+    def __init__(self, *args, static_layer_cache=False, cull=True, draft=False, profile=None, memory_profile=None,
+                 auto_cleanup=False, stream_export=True, aggregate_lng=None, **kwargs):
+        if static_layer_cache or cull:
+            renderer_class = StaticLayerRenderer if static_layer_cache else CairoRenderer
+            kwargs["renderer"] = renderer_class(camera_class=CullingCamera if cull else None)
         super().__init__(*args, **kwargs)
+        self.draft = draft
+        set_draft(draft)
+        self.stream_export = stream_export
+        if profile is not None:
+            self.profiler = PlayProfiler(output_dir=profile)
+        if memory_profile is not None or auto_cleanup:
+            self.memory_profiler = MemoryProfiler(output_dir=memory_profile, auto_cleanup=auto_cleanup)
         self.attribute_key_color_map = {"venue": RED, "year": BLUE, "subject": GREEN, "with code": ORANGE}
-        self.labels = [("venue", "SIGMOD"),
-                       ("year", "2024"),
-                       ("subject", "graph"),
-                       ("year", "2025"),
-                       ("subject", "DBMS"),
-                       ("with code", "yes"),
-                       ("venue", "VLDB"),
-                       ("subject", "DG")]
+        self.labels = LABELS
         self.label_short_name = ["with_code" if k == "with code" else v for k, v, in self.labels]
         self.label_rep = [
             make_label_rep(short_name, self.attribute_key_color_map[k])
             for (k, v), short_name in zip(self.labels, self.label_short_name)
         ]
-        self.label_sets_info = [
-            {"labels": [1, 2, 3], "documents": [1, 21, 22], "entry": 1},
-            {"labels": [1, 4, 5], "documents": [2, 11, 12], "entry": 11},
-            {"labels": [1, 4, 5, 6], "documents": [3, 17, 18], "entry": 3},
-            {"labels": [7, 2, 8], "documents": [4, 16], "entry": 16},
-            {"labels": [1], "documents": [5, 6, 7], "entry": 5},
-            {"labels": [1, 3], "documents": [13, 14, 15], "entry": 14},
-            {"labels": [2], "documents": [8, 9, 10], "entry": 8},
-            {"labels": [1, 4, 3, 6], "documents": [19, 20], "entry": 19},
-        ]
-        self.lng_edge_infos = [(5, 2), (5, 6), (7, 4), (7, 1), (2, 3), (6, 8), (6, 1)]
-        self.ung_cross_group_edge_infos = [(5, 2), (5, 13), (7, 11), (6, 11),
-                                           (2, 18), (12, 3), (11, 3),
-                                           (14, 19), (13, 20), (15, 19), (15, 22),
-                                           (9, 22), (10, 4), (8, 4)]
-        self.ung_inner_graph_edge_infos = [(7, 6), (6, 7), (6, 5), (5, 7),
-                                           (12, 2), (11, 12), (11, 2),
-                                           (13, 14), (14, 13), (14, 15), (15, 14),
-                                           (18, 17), (18, 3), (3, 18), (3, 17),
-                                           (19, 20), (20, 19),
-                                           (8, 9), (8, 10),
-                                           (16, 4),
-                                           (22, 21), (21, 22), (22, 1), (1, 22), (21, 1), (1, 21)]
-        self.label_set_reps = [
-            make_label_set_rep([self.label_rep[l_id - 1] for l_id in dic["labels"]])
-            for ls_id, dic in enumerate(self.label_sets_info)
-        ]
+        self.label_sets_info = LABEL_SETS_INFO
+        self.lng_edge_infos = LNG_EDGE_INFOS
+        self.ung_cross_group_edge_infos = UNG_CROSS_GROUP_EDGE_INFOS
+        self.ung_inner_graph_edge_infos = UNG_INNER_GRAPH_EDGE_INFOS
         self.label_sets = {
             ls_id + 1: {"id": ls_id + 1,
                         "labels": [self.labels[l_id - 1] for l_id in dic["labels"]],
                         "label_reps": [self.label_rep[l_id - 1] for l_id in dic["labels"]],
-                        "label_set_rep": label_set_rep,
                         "rep_name": f"f{ls_id + 1}",
                         "full_name": "{" + ",\n".join(
                             ["{}={}".format(*self.labels[i - 1]) for i in dic["labels"]]) + "}",
@@ -181,7 +177,7 @@ class LNGDemonstration(Slide):
                             [self.label_short_name[l_id - 1] for l_id in dic["labels"]]) + "}",
                         "nodes": [],
                         "entry_vector": dic["entry"]}
-            for ls_id, (dic, label_set_rep) in enumerate(zip(self.label_sets_info, self.label_set_reps))
+            for ls_id, dic in enumerate(self.label_sets_info)
         }
         self.documents = {
             d_id: {"id": d_id,
@@ -200,6 +196,7 @@ class LNGDemonstration(Slide):
             self.label_sets[ls_id]["nodes"] = [self.documents[d_id] for d_id in dic["documents"]]
         self.lng_edges = [(self.label_sets[f]["rep_name"], self.label_sets[t]["rep_name"])
                           for f, t in self.lng_edge_infos]
+        self.aggregate_lng = len(self.label_sets) > AGGREGATE_LNG_ABOVE if aggregate_lng is None else aggregate_lng
         self.ung_cross_group_edges = [(self.documents[f]["rep_name"], self.documents[t]["rep_name"])
                                       for f, t in self.ung_cross_group_edge_infos]
         self.ung_inner_graph_edges = [(self.documents[f]["rep_name"], self.documents[t]["rep_name"])
@@ -219,12 +216,54 @@ class LNGDemonstration(Slide):
              "arrow_param": {"connect_bot_to_top": True, "pos_buff": .25, "buff": 0, "stroke_width": 8, "tip_width": .5,
                              "color": ORANGE}},
         ]
+        self.example_index = example_index()
+        self.example_query = {"query_vector_tex": r"$v_{q}$",
+                              "query_filter_texts": ["venue = SIGMOD", "year = 2025"],
+                              "query_labels": [1, 4],
+                              "query_vector": example_query_vector(self.example_index, 3)}
+        self.trace_vectors = None  # vectors of the index a --trace was recorded on, to lay out its subgraph
         self.title = None
         self.cross_group_edges_description_line_1_flag = False
         self.cross_group_edges_description_line_2_flag = False
 
+    def play(self, *args, **kwargs):
+        super().play(*args, **kwargs)
+        # merge back the edges isolated to animate them, so the batches do not split further every slide
+        consolidate_edge_batches(self)
+
+    @functools.cache
+    def label_set_rep(self, ls_id):
+        return make_label_set_rep([self.label_rep[l_id - 1] for l_id in self.label_sets_info[ls_id - 1]["labels"]])
+
+    def tex_strings(self):
+        # literal titles and captions, plus the labels generated for every vector node
+        return [*find_tex_literals(__file__),
+                *(document["name"] for document in self.documents.values()),
+                self.example_query["query_vector_tex"]]
+
+    def make_aggregated_lng(self, by_prefix=False, max_size=16, **kwargs):
+        """
+        The LNG with label sets grouped into clusters, for decks with far more label sets than fit on a slide. Label
+        set and cluster reps are only built for the items that are shown, drill into a cluster with drill_down.
+        """
+        label_sets = {self.label_sets[ls_id]["rep_name"]: dic["labels"]
+                      for ls_id, dic in enumerate(self.label_sets_info, start=1)}
+        if by_prefix:
+            items = cluster_by_prefix(label_sets, max_size=max_size)
+        else:
+            items = cluster_by_containment(label_sets, self.lng_edges, max_size=max_size)
+
+        def make_item(item):
+            if isinstance(item, Cluster):
+                # every set of a subtree contains its root, so the root's labels are the ones the cluster shares
+                shared = item.key if by_prefix else label_sets[item.key[0]]
+                return make_cluster_rep([self.label_rep[l_id - 1] for l_id in shared], len(item))
+            return LabelNode(make_label_set_rep([self.label_rep[l_id - 1] for l_id in label_sets[item]]), name=item)
+
+        return AggregatedGraph("aggregated_lng", ClusterView(items, self.lng_edges), make_item, **kwargs)
+
     def _set_title(self, new_text):
-        new_title = Tex(new_text, font_size=115).to_edge(UP)
+        new_title = make_tex(new_text, font_size=115).to_edge(UP)
         if self.title is None:
             self.title = new_title
             return FadeIn(self.title)
@@ -252,7 +291,7 @@ class LNGDemonstration(Slide):
         self.next_slide(notes="Say we have an dataset, where each entry contains some unstructured data and a set of "
                               "associated structured attributes.\n\n"
                               "Here, we are seeing conference papers as examples.")
-        example_document = make_document_rep(self.documents[1], icon_template=document_icon, show_text=True)
+        example_document = make_document_rep(self.documents[1], icon_template=document_icon(), show_text=True)
         print(example_document.width)
         self.play(FadeIn(example_document))
         self.next_slide(notes="We can generate an embedding vector for the unstructured data and do efficient NN "
@@ -393,7 +432,7 @@ class LNGDemonstration(Slide):
         self.next_slide(notes="Here are all the unique label sets in our dataset.")
 
         # group documents by label set
-        label_set_rep_list = [rep.copy() for rep in self.label_set_reps]
+        label_set_rep_list = [self.label_set_rep(ls_id).copy() for ls_id in self.label_sets]
         label_set_rep = VGroup(*label_set_rep_list)
         label_set_rep.arrange(DOWN, buff=1)
         self.play(FadeIn(label_set_rep))
@@ -439,7 +478,7 @@ class LNGDemonstration(Slide):
         self.next_slide(notes="More specifically, these three label sets...\n\n"
                               "Does anyone notices anything related to those sets?\n\n"
                               "Let's zoom in on those.")
-        superset_label_sets_rep = VGroup(*[self.label_set_reps[idx - 1].copy() for idx in highlight_target])
+        superset_label_sets_rep = VGroup(*[self.label_set_rep(idx).copy() for idx in highlight_target])
         superset_label_sets_rep.arrange(UP, buff=4)
         superset_label_sets_rep.move_to(ORIGIN)
         self.play(FadeOut(*highlight_rect), Transform(label_set_rep, superset_label_sets_rep))
@@ -487,6 +526,8 @@ class LNGDemonstration(Slide):
         }
 
     def section_2(self, cleanup_animations=None, label_set_rep=None):
+        if self.aggregate_lng:
+            return self.aggregated_section_2(cleanup_animations, label_set_rep)
         # Label Navigating Graph
         self.next_slide(notes="Given that, let's now define Label Navigating Graph, which is also the paper's core "
                               "intuition. Here are all the label sets.")
@@ -495,7 +536,7 @@ class LNGDemonstration(Slide):
         label_navigating_graph_rep = VGroup()
         for layer_idx, label_set_l in enumerate(label_set_layers):
             layer_label_sets = [
-                LabelNode(self.label_set_reps[label_set_idx - 1], name=self.label_sets[label_set_idx]["rep_name"])
+                LabelNode(self.label_set_rep(label_set_idx), name=self.label_sets[label_set_idx]["rep_name"])
                 for label_set_idx in label_set_l]
             last_set = None
             gap_index = 0
@@ -618,16 +659,24 @@ class LNGDemonstration(Slide):
             "lng_edges": lng_edges,
         }
 
-    def section_3(self, cleanup_animations=None, label_navigating_graph_rep=None, lng_edges=None):
-        # clean up
-        self.next_slide(notes="Next, let see how shall we incorporate the vectors into this graph.")
-        if cleanup_animations is not None:
-            self.play(*cleanup_animations)
-        self.play(self._set_title("Label Navigating Graph"))
+    def aggregated_section_2(self, cleanup_animations=None, label_set_rep=None):
+        """section_2 for too many label sets to lay out one by one: the clustered LNG, opening its largest cluster."""
+        self.next_slide(notes="Given that, let's now define Label Navigating Graph, which is also the paper's core "
+                              "intuition. There are too many label sets to show one by one, so label sets sharing "
+                              "labels are grouped together.")
+        aggregated_lng = self.make_aggregated_lng(cell_size=(config.frame_width * .8, config.frame_height * .7))
+        aggregated_lng.move_to(DOWN * 1.5)
+        animations = [*cleanup_animations] if cleanup_animations is not None else []
+        if label_set_rep is not None:
+            animations.append(FadeOut(label_set_rep))
+        self.play(self._set_title("Label Navigating Graph"), *animations, FadeIn(aggregated_lng))
+        clusters = [item for item in aggregated_lng.view.items if isinstance(item, Cluster)]
+        if len(clusters) != 0:
+            self.next_slide(notes="Every cluster opens up in place into the label sets and clusters it holds.")
+            self.play(*aggregated_lng.drill_down(max(clusters, key=len).name))
+        return {"cleanup_animations": (FadeOut(aggregated_lng),)}
 
-        # Unified Navigating Graph
-        self.next_slide(notes="Recall that each label set correspond to a unique set of vectors.\n\n"
-                              "Here are the vectors.")
+    def make_unified_navigating_graph_rep(self):
         label_set_layers = [[5, 7], [2, 6, 4], [3, 8, 1]]
         label_set_gap_list = [[4], [3, 7], [2, 2]]
         graph_hg = 5
@@ -640,7 +689,7 @@ class LNGDemonstration(Slide):
             for label_set_idx, param in zip(label_set_l, graph_param[layer_idx]):
                 label_set_info = self.label_sets[label_set_idx]
                 graph = NodeGraph(label_set_info["rep_name"],
-                                  label_set_info["label_set_rep"],
+                                  self.label_set_rep(label_set_idx),
                                   label_set_info["nodes"],
                                   box_padding=1, bot_padding=1,
                                   **param)
@@ -656,16 +705,34 @@ class LNGDemonstration(Slide):
             unified_navigating_graph_rep.add(layer_label_set_rep)
         unified_navigating_graph_rep.arrange(DOWN, buff=1.5)
         unified_navigating_graph_rep.move_to(ORIGIN).shift(DOWN * 1)
+        return unified_navigating_graph_rep
+
+    def add_unified_navigating_graph_edges(self, unified_navigating_graph_rep):
+        unified_navigating_graph_edges = EdgeManager(unified_navigating_graph_rep)
+        unified_navigating_graph_edges.add_edges(*self.ung_inner_graph_edges, color=BLUE)
+        unified_navigating_graph_edges.add_edges(*self.ung_cross_group_edges, style=DASHED, color=ORANGE,
+                                                 stroke_width=6)
+        return unified_navigating_graph_edges
+
+    def section_3(self, cleanup_animations=None, label_navigating_graph_rep=None, lng_edges=None):
+        # clean up
+        self.next_slide(notes="Next, let see how shall we incorporate the vectors into this graph.")
+        if cleanup_animations is not None:
+            self.play(*cleanup_animations)
+        self.play(self._set_title("Label Navigating Graph"))
+
+        # Unified Navigating Graph
+        self.next_slide(notes="Recall that each label set correspond to a unique set of vectors.\n\n"
+                              "Here are the vectors.")
+        unified_navigating_graph_rep = self.make_unified_navigating_graph_rep()
         animations = []
         if label_navigating_graph_rep is not None and lng_edges is not None:
             # add pairwise transformation from LNG nodes to UNG nodes
             temp_edge_manager = EdgeManager(unified_navigating_graph_rep)
-            for layer_idx, label_set_l in enumerate(label_set_layers):
-                for label_set_idx, param in zip(label_set_l, graph_param[layer_idx]):
-                    label_set_info = self.label_sets[label_set_idx]
-                    lng_node = [*lng_edges.get_objects(label_set_info["rep_name"])][0]
-                    ung_node = [*temp_edge_manager.get_objects(label_set_info["rep_name"])][0]
-                    animations.append(Transform(lng_node, ung_node))
+            for label_set_info in self.label_sets.values():
+                lng_node = [*lng_edges.get_objects(label_set_info["rep_name"])][0]
+                ung_node = [*temp_edge_manager.get_objects(label_set_info["rep_name"])][0]
+                animations.append(Transform(lng_node, ung_node))
         else:
             animations.append(FadeIn(unified_navigating_graph_rep))
             label_navigating_graph_rep = unified_navigating_graph_rep
@@ -829,7 +896,7 @@ class LNGDemonstration(Slide):
                   "completeness.\n\n"
                   "And the paper also mentioned that completeness can typically be archived for Delta smaller than k.\n\n"
                   "Completeness is proven more rigorously in the paper.")
-        completeness_text = Tex(
+        completeness_text = make_tex(
             r"Completeness: at least $\delta+1$ vectors matching the filter are reachable",
             font_size=72 * 1.25)
         completeness_text.to_edge(DOWN)
@@ -846,13 +913,10 @@ class LNGDemonstration(Slide):
                   FadeOut(cross_group_edges_description),
                   Transform(legend, new_legend))
         unified_navigating_graph_rep = old_unified_navigating_graph_rep
-        unified_navigating_graph_edges = EdgeManager(unified_navigating_graph_rep)
-        unified_navigating_graph_edges.add_edges(*self.ung_inner_graph_edges, color=BLUE)
-        unified_navigating_graph_edges.add_edges(*self.ung_cross_group_edges, style=DASHED, color=ORANGE,
-                                                 stroke_width=6)
+        unified_navigating_graph_edges = self.add_unified_navigating_graph_edges(unified_navigating_graph_rep)
         self.play(FadeIn(unified_navigating_graph_rep))
-        self.play(unified_navigating_graph_edges.fadeIn_edges(*self.ung_inner_graph_edges))
-        self.play(unified_navigating_graph_edges.fadeIn_edges(*self.ung_cross_group_edges))
+        self.play(*unified_navigating_graph_edges.fadeIn_edges(*self.ung_inner_graph_edges, group=True))
+        self.play(*unified_navigating_graph_edges.fadeIn_edges(*self.ung_cross_group_edges, group=True))
 
         return {
             "legend": legend,
@@ -915,14 +979,22 @@ class LNGDemonstration(Slide):
         # self.play(*ung_inner_graph_edges.fadeIn_edges(all=True))
         # self.next_slide()
 
-    def query_example(self, query_vector_tex, query_filter_texts, query_labels, entry_label_sets,
-                      legend, unified_navigating_graph_rep, unified_navigating_graph_edges: EdgeManager):
+    def query_example(self, query_vector_tex, query_filter_texts, query_labels, query_vector,
+                      legend, unified_navigating_graph_rep, unified_navigating_graph_edges: EdgeManager,
+                      trace: SearchTrace = None, k=2, beam_width=4):
+        if trace is None:
+            trace = SearchTrace()
+            self.example_index.search(query_vector, query_labels, k=k, beam_width=beam_width, trace=trace)
+        if not self._trace_in_deck(trace):
+            return self.subgraph_query_example(trace, legend, unified_navigating_graph_rep,
+                                               unified_navigating_graph_edges)
+        entry_label_sets = trace.first("entry_sets")["sets"]
         anim = []
         self.next_slide(notes="Next, let's look at how to perform query.")
         if legend is not None and unified_navigating_graph_rep is not None and unified_navigating_graph_edges is not None:
             anim.append(FadeOut(legend))
             anim.append(FadeOut(unified_navigating_graph_rep))
-            anim.extend(unified_navigating_graph_edges.fadeOut_edges(all=True))
+            anim.extend(unified_navigating_graph_edges.fadeOut_edges(all=True, group=True))
         self.play(self._set_title("Unified Navigating Graph: Query"),
                   *anim)
 
@@ -933,7 +1005,7 @@ class LNGDemonstration(Slide):
         query_filter_rep = make_label_set_rep([Text(text, font_size=font_size) for text in query_filter_texts])
         query_label_set_rep = make_label_set_rep([self.label_rep[l_id - 1] for l_id in query_labels])
         entry_label_sets_rep = make_label_set_rep(
-            [self.label_sets[l_id]["label_set_rep"] for l_id in entry_label_sets])
+            [self.label_set_rep(l_id) for l_id in entry_label_sets])
         raw_query_rep = VGroup(
             Text("SELECT * FROM vdbms", font_size=font_size),
             VGroup(Text("WHERE vec", font_size=font_size),
@@ -1153,7 +1225,7 @@ class LNGDemonstration(Slide):
         self.next_slide(notes="Here are the entry sets.")
         unified_navigating_graph_objects = EdgeManager(unified_navigating_graph_rep)
         entry_nodes = [self.label_sets[l_id]["rep_name"] for l_id in entry_label_sets]
-        entry_vectors = [self.documents[self.label_sets[l_id]["entry_vector"]]["rep_name"] for l_id in entry_label_sets]
+        entry_vectors = [self.documents[d_id]["rep_name"] for d_id in trace.first("entry_vectors")["vectors"]]
         entry_nodes_text = Text("Entry Sets", font_size=font_size).shift(UP * 4, LEFT * 2)
         entry_nodes_text_arrows = []
         for i, entry_node in enumerate(entry_nodes):
@@ -1180,79 +1252,110 @@ class LNGDemonstration(Slide):
                   FadeOut(entry_vector_text_rep))
         # BFS traversal
         self.play(*unified_navigating_graph_edges.undo_highlight_nodes(*entry_nodes))
-        self.play(*unified_navigating_graph_objects.fadeOut_nodes(all=True))
-        all_edges = self.ung_cross_group_edges + self.ung_inner_graph_edges
-        bfs_queue = [(vec, None) for vec in entry_vectors]
-        visited_edges = set()
-        visited_nodes = set()
-        visited_vectors = set()
-        while len(bfs_queue) != 0:
-            print(bfs_queue)
-            next_bfs_queue = []
-            new_edges = set()
-            new_nodes = set()
-            new_vectors = set()
-            for vec, inEdge in bfs_queue:
-                if vec in visited_vectors or vec in new_vectors:
-                    continue
-                # add vec
-                new_vectors.add(vec)
-                # add nodes
-                node = self.document_to_label_set[vec]
-                if node not in visited_nodes:
-                    new_nodes.add(node)
-                # add edges
-                if inEdge is not None and inEdge not in visited_edges:
-                    new_edges.add(inEdge)
-                # add unexplored edges to the queue
-                edges = filter_edges(all_edges, f=[vec])
-                for _, t in edges:
-                    next_bfs_queue.append((t, (vec, t)))
-            anim = []
-            all_nodes = new_nodes.union(visited_nodes)
-            for node_name in all_nodes:
-                node_object = [*unified_navigating_graph_objects.get_objects(node_name)][0]
-                if node_name in new_nodes:
-                    anim.extend([*node_object.fadeIn_box()])
-                new_vectors_for_node = [vec for vec in new_vectors if self.document_to_label_set[vec] == node_name]
-                anim.extend([*node_object.fadeIn_nodes(*new_vectors_for_node)])
-            anim.extend([*unified_navigating_graph_edges.fadeIn_edges(*new_edges)])
-            if len(anim) != 0:
-                self.next_slide("Then we traverse...")
-                self.play(*anim)
-            visited_edges.update(new_edges)
-            visited_nodes.update(new_nodes)
-            visited_vectors.update(new_vectors)
-            bfs_queue = next_bfs_queue
+        metrics_overlay = MetricsOverlay().to_corner(DR)
+        self.play(*unified_navigating_graph_objects.fadeOut_nodes(all=True, group=True), FadeIn(metrics_overlay))
+        player = TracePlayer(self, UNGTraceView(unified_navigating_graph_objects, unified_navigating_graph_edges,
+                                                name_of=lambda d_id: self.documents[d_id]["rep_name"],
+                                                group_of=self.document_to_label_set.get),
+                             overlay=metrics_overlay)
+        player.play(trace)
 
         # clean up
         self.next_slide(notes="")
         self.play(self._set_title("Unified Navigating Graph"),
-                  FadeOut(new_query_workflow_rep, query_workflow_rep_line_2),
-                  *unified_navigating_graph_objects.fadeOut_nodes(*visited_vectors),
-                  *unified_navigating_graph_objects.fadeOut_nodes(*visited_nodes),
-                  *unified_navigating_graph_edges.fadeOut_edges(*visited_edges))
-        self.play(*unified_navigating_graph_objects.fadeIn_nodes(all=True))
-        self.play(*unified_navigating_graph_edges.fadeIn_edges(*self.ung_inner_graph_edges))
-        self.play(*unified_navigating_graph_edges.fadeIn_edges(*self.ung_cross_group_edges))
+                  FadeOut(new_query_workflow_rep, query_workflow_rep_line_2, metrics_overlay),
+                  *player.cleanup())
+        player.reset()
+        self.play(*unified_navigating_graph_objects.fadeIn_nodes(all=True, group=True))
+        self.play(*unified_navigating_graph_edges.fadeIn_edges(*self.ung_inner_graph_edges, group=True))
+        self.play(*unified_navigating_graph_edges.fadeIn_edges(*self.ung_cross_group_edges, group=True))
+
+    def _trace_in_deck(self, trace: SearchTrace):
+        """Whether every label set and vector of a trace is one of the deck's, so it can be played on the deck's UNG."""
+        entry_sets = trace.first("entry_sets")
+        return (entry_sets is not None and all(ls_id in self.label_sets for ls_id in entry_sets["sets"]) and
+                all(d_id in self.documents for d_id in trace_vector_ids(trace)))
+
+    def subgraph_query_example(self, trace: SearchTrace, legend, unified_navigating_graph_rep,
+                               unified_navigating_graph_edges: EdgeManager):
+        """A trace recorded on another index, played on the subgraph it visited instead of on the deck's UNG."""
+        anim = []
+        self.next_slide(notes="Next, let's look at how to perform query, here on a larger index.")
+        shown = legend is not None and unified_navigating_graph_rep is not None
+        if shown and unified_navigating_graph_edges is not None:
+            anim.append(FadeOut(legend))
+            anim.append(FadeOut(unified_navigating_graph_rep))
+            anim.extend(unified_navigating_graph_edges.fadeOut_edges(all=True, group=True))
+        query = trace.first("query")
+        title = "Unified Navigating Graph: Query"
+        if query is not None:
+            title += f" on labels {query['labels']}"
+        self.play(self._set_title(title), *anim)
+
+        width, height, center = config.frame_width * .65, config.frame_height * .7, LEFT * config.frame_width * .1
+        if self.trace_vectors is not None:
+            ids = trace_vector_ids(trace)
+            positions = project_positions(ids, self.trace_vectors[ids], width, height, center=center)
+        else:
+            positions = layered_positions(trace, width, height, center=center)
+        metrics_overlay = MetricsOverlay().to_corner(DR)
+        self.play(FadeIn(metrics_overlay))
+        player = TracePlayer(self, SubgraphTraceView(positions), overlay=metrics_overlay)
+        player.play(trace)
+
+        self.next_slide(notes="")
+        self.play(self._set_title("Unified Navigating Graph"), FadeOut(metrics_overlay), *player.cleanup())
+        player.reset()
+        if shown and unified_navigating_graph_edges is not None:
+            self.play(FadeIn(legend), FadeIn(unified_navigating_graph_rep),
+                      *unified_navigating_graph_edges.fadeIn_edges(all=True, group=True))
 
     def construct(self):
+        precompile_tex(self.tex_strings())
         # param = {}
         param = self.section_1()
         param = self.section_2(**param)
         param = self.section_3(**param)
         self.query_example(
-            r"$v_{q}$",
-            ["venue = SIGMOD", "year = 2025"],
-            [1, 4],
-            [2, 8],
-            param.get("legend", None),
-            param.get("unified_navigating_graph_rep", None),
-            param.get("unified_navigating_graph_edges", None),
+            **self.example_query,
+            legend=param.get("legend", None),
+            unified_navigating_graph_rep=param.get("unified_navigating_graph_rep", None),
+            unified_navigating_graph_edges=param.get("unified_navigating_graph_edges", None),
         )
 
 
 if __name__ == "__main__":
-    with tempconfig({"quality": "medium_quality"}):
-        scene = LNGDemonstration()
+    parser = argparse.ArgumentParser(description="Render the LNG presentation.")
+    parser.add_argument("--static-layer-cache", action="store_true",
+                        help="rasterise non-animated mobjects once per play instead of every frame")
+    parser.add_argument("--no-cull", action="store_true",
+                        help="rasterise fully transparent and off-frame mobjects instead of skipping them")
+    parser.add_argument("--trace", default=None,
+                        help="play a recorded search trace (see ung_search.py) instead of searching the example, "
+                             "on the subgraph it visited when it was recorded on another index")
+    parser.add_argument("--trace-vectors", default=None, metavar="NPY",
+                        help="the vectors of the index a --trace was recorded on, to lay its subgraph out by their "
+                             "principal components instead of by hops")
+    parser.add_argument("--profile", default=None, metavar="DIR",
+                        help="time every play and write a report and a folded flamegraph stack dump to DIR")
+    parser.add_argument("--memory-profile", default=None, metavar="DIR",
+                        help="snapshot the scene at every slide break and write the memory report to DIR")
+    parser.add_argument("--auto-cleanup", action="store_true",
+                        help="remove fully transparent or offscreen mobjects from the scene at every slide break")
+    parser.add_argument("--draft", action="store_true",
+                        help="fast low quality preview: Text proxies for Tex, drawing animations snapped to their end")
+    parser.add_argument("--aggregate-lng", action="store_true", default=None,
+                        help="show the LNG as clusters of label sets, the default above "
+                             f"{AGGREGATE_LNG_ABOVE} label sets")
+    parser.add_argument("--no-stream-export", action="store_true",
+                        help="concatenate and reverse every slide after render instead of as each slide ends")
+    args = parser.parse_args()
+    with tempconfig({"quality": "low_quality" if args.draft else "medium_quality"}):
+        scene = LNGDemonstration(static_layer_cache=args.static_layer_cache, cull=not args.no_cull, draft=args.draft,
+                                 profile=args.profile, memory_profile=args.memory_profile, auto_cleanup=args.auto_cleanup,
+                                 stream_export=not args.no_stream_export, aggregate_lng=args.aggregate_lng)
+        if args.trace is not None:
+            scene.example_query["trace"] = SearchTrace.read(args.trace)
+        if args.trace_vectors is not None:
+            scene.trace_vectors = np.load(args.trace_vectors, mmap_mode="r")
         scene.render()
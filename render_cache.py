@@ -0,0 +1,317 @@
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from manim import Scene, config
+from manim.animation.animation import Wait
+from manim.animation.composition import AnimationGroup
+from manim.animation.creation import DrawBorderThenFill, ShowPartial
+from manim.animation.indication import Circumscribe
+from manim.animation.transform import Transform
+from manim.camera.camera import Camera
+from manim.mobject.types.vectorized_mobject import VMobject
+from manim.renderer.cairo_renderer import CairoRenderer
+from manim.utils.family import extract_mobject_family_members
+from manim.utils.iterables import list_difference_update, remove_list_redundancies
+
+# animations that only ever draw inside the bounding box of their mobject (and target, for transforms)
+IN_PLACE_ANIMATIONS = (ShowPartial, DrawBorderThenFill)
+FINGERPRINT_ARRAYS = ("points", "fill_rgbas", "stroke_rgbas", "background_stroke_rgbas", "pixel_array")
+FINGERPRINT_VALUES = ("z_index", "stroke_width", "background_stroke_width", "sheen_factor")
+# (colours, width) pairs that decide whether a VMobject draws anything, a missing width means it always counts
+PAINT_ATTRS = (("fill_rgbas", None), ("stroke_rgbas", "stroke_width"),
+               ("background_stroke_rgbas", "background_stroke_width"))
+
+
+def _bounding_box(points, margin=0.):
+    if len(points) == 0:
+        return None
+    return points[:, :2].min(axis=0) - margin, points[:, :2].max(axis=0) + margin
+
+
+class _FrameRegion:
+    """A coarse occupancy grid over the frame, marking where moving mobjects can be drawn during one play."""
+
+    def __init__(self, cols=64, rows=32):
+        self.cols, self.rows = cols, rows
+        self.x_range = (-config.frame_x_radius, config.frame_x_radius)
+        self.y_range = (-config.frame_y_radius, config.frame_y_radius)
+        self.cells = np.zeros((rows, cols), dtype=bool)
+
+    def _span(self, box) -> Optional[Tuple[slice, slice]]:
+        (x_min, y_min), (x_max, y_max) = box
+        if x_max < self.x_range[0] or x_min > self.x_range[1] or y_max < self.y_range[0] or y_min > self.y_range[1]:
+            return None  # off frame, can never cover anything visible
+        width, height = self.x_range[1] - self.x_range[0], self.y_range[1] - self.y_range[0]
+        c0 = min(max(int((x_min - self.x_range[0]) / width * self.cols), 0), self.cols - 1)
+        c1 = min(max(int((x_max - self.x_range[0]) / width * self.cols), 0), self.cols - 1)
+        r0 = min(max(int((y_min - self.y_range[0]) / height * self.rows), 0), self.rows - 1)
+        r1 = min(max(int((y_max - self.y_range[0]) / height * self.rows), 0), self.rows - 1)
+        return slice(r0, r1 + 1), slice(c0, c1 + 1)
+
+    def mark(self, box):
+        span = self._span(box)
+        if span is not None:
+            self.cells[span] = True
+
+    def overlaps(self, box):
+        span = self._span(box)
+        return span is not None and bool(self.cells[span].any())
+
+
+class StaticLayerRenderer(CairoRenderer):
+    """
+    Keeps the rasterised static layer of the previous play around, and reuses it as long as the static mobjects are
+    the same objects in the same state.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._static_layer_key = None
+        self._static_layer_image = None
+
+    @staticmethod
+    def static_layer_key(static_mobjects):
+        key = []
+        for mob in static_mobjects:
+            arrays = (getattr(mob, name, None) for name in FINGERPRINT_ARRAYS)
+            key.append((id(mob),
+                        *(zlib.crc32(np.ascontiguousarray(arr)) for arr in arrays if isinstance(arr, np.ndarray)),
+                        *(getattr(mob, name, None) for name in FINGERPRINT_VALUES)))
+        return tuple(key)
+
+    def save_static_frame_data(self, scene, static_mobjects):
+        key = self.static_layer_key(static_mobjects)
+        if self._static_layer_image is not None and key == self._static_layer_key:
+            self.static_image = self._static_layer_image
+            return self.static_image
+        image = super().save_static_frame_data(scene, static_mobjects)
+        self._static_layer_key, self._static_layer_image = key, image
+        return image
+
+
+class StaticLayerMixin(Scene):
+    """
+    Splits every play into the mobjects that actually change and the ones that can be baked into the background.
+
+    Manim treats everything drawn after the first animated mobject as moving, so fading one edge of a large graph
+    re-rasterises the whole graph every frame. With a StaticLayerRenderer, only the animated families are redrawn,
+    plus the static mobjects drawn on top of the area they can touch, which keeps the layering intact.
+    """
+
+    def get_moving_mobjects(self, *animations):
+        if not isinstance(self.renderer, StaticLayerRenderer):
+            return super().get_moving_mobjects(*animations)
+        reach, frame_wide_ids = self._get_animation_reach(animations)
+        moving_ids = {id(mob) for root, _ in reach.values() for mob in root.get_family()}
+        region = _FrameRegion()
+        for _, mobs in reach.values():
+            for mob in mobs:
+                box = _bounding_box(mob.get_all_points(), margin=.25)
+                if box is not None:
+                    region.mark(box)
+        moving: List = []
+        seen_moving = False
+        for mob in self.get_mobject_family_members():
+            if id(mob) in moving_ids:
+                moving.append(mob)
+                seen_moving = True
+                if id(mob) in frame_wide_ids:
+                    # its reach is unknown, fall back to redrawing everything drawn after it
+                    region.cells[:] = True
+            elif seen_moving and len(mob.points) > 0:
+                box = _bounding_box(mob.points, margin=.25)
+                if box is not None and region.overlaps(box):
+                    moving.append(mob)
+        return moving
+
+    def _get_animation_reach(self, animations):
+        """Map every animated mobject to the mobjects whose extent bounds where it can be drawn during the play."""
+        reach: Dict = {}
+        frame_wide_ids = set()
+        queue = list(animations)
+        while len(queue) != 0:
+            animation = queue.pop()
+            if hasattr(animation, "animations"):
+                queue.extend(animation.animations)
+            mob = getattr(animation, "mobject", None)
+            if mob is None:
+                continue
+            if getattr(animation, "in_place", False):
+                # only colours change, or parts swap within each member, so every member bounds its own reach
+                reach[id(mob)] = (mob, list(animation.members))
+                continue
+            _, mobs = reach.setdefault(id(mob), (mob, [mob]))
+            if isinstance(animation, Transform):
+                mobs.extend(m for m in (animation.target_mobject, animation.starting_mobject) if m is not None)
+            elif not isinstance(animation, IN_PLACE_ANIMATIONS) and not hasattr(animation, "animations"):
+                frame_wide_ids.add(id(mob))
+        for mob in self.get_mobject_family_members():
+            if len(mob.updaters) > 0:
+                reach.setdefault(id(mob), (mob, [mob]))
+                frame_wide_ids.add(id(mob))
+        for mob in self.foreground_mobjects:
+            reach.setdefault(id(mob), (mob, [mob]))
+        return reach, frame_wide_ids
+
+
+class CullingCamera(Camera):
+    """
+    Leaves out of every capture the mobjects that would draw nothing: VMobjects whose fill and strokes are all fully
+    transparent, and mobjects whose points lie outside the frame.
+
+    During a play, a top-level mobject with nothing animated in its family is culled once, its visible family members
+    kept until the play ends, so frames do not walk the static subtrees again. In the other subtrees, the verdict on a
+    mobject outside the animated families is kept as well, animated mobjects are checked every frame. Cached verdicts
+    hold on to their mobject, so an id is never reused while it is cached, and are dropped when the scene removes it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._dynamic_ids = None  # None outside of a play, when nothing is cached
+        self._visible: Dict[int, Tuple[object, bool]] = {}
+        # top-level mobjects without animated members: the mobject, its family members with points, the visible ones
+        self._static_subtrees: Dict[int, Tuple[object, List, List]] = {}
+        self._dynamic_roots = set()
+        self.culled = 0
+
+    def begin_play(self, dynamic_mobjects):
+        self._dynamic_ids = {id(mob) for mob in dynamic_mobjects}
+        self._forget_all()
+
+    def end_play(self):
+        self._dynamic_ids = None
+        self._forget_all()
+
+    def _forget_all(self):
+        self._visible.clear()
+        self._static_subtrees.clear()
+        self._dynamic_roots.clear()
+
+    def forget(self, *mobjects):
+        """Drop the cached verdicts on mobjects and their families, once they leave the scene."""
+        for mob in mobjects:
+            for member in mob.get_family():
+                self._visible.pop(id(member), None)
+                self._static_subtrees.pop(id(member), None)
+                self._dynamic_roots.discard(id(member))
+
+    def get_mobjects_to_display(self, mobjects, include_submobjects=True, excluded_mobjects=None):
+        if self._dynamic_ids is None or not include_submobjects:
+            mobjects = super().get_mobjects_to_display(mobjects, include_submobjects=include_submobjects,
+                                                       excluded_mobjects=excluded_mobjects)
+            visible = [mob for mob in mobjects if self.is_visible(mob)]
+            self.culled += len(mobjects) - len(visible)
+            return visible
+        members = []
+        for mob in mobjects:
+            subtree = self._static_subtrees.get(id(mob))
+            if subtree is None and id(mob) not in self._dynamic_roots:
+                if any(id(member) in self._dynamic_ids for member in mob.get_family()):
+                    self._dynamic_roots.add(id(mob))
+                else:
+                    family = mob.family_members_with_points()
+                    subtree = self._static_subtrees[id(mob)] = (mob, family, [m for m in family
+                                                                             if self._check_visible(m)])
+            if subtree is not None:
+                _, family, visible = subtree
+                self.culled += len(family) - len(visible)
+                members.extend(visible)
+                continue
+            family = mob.family_members_with_points()
+            visible = [member for member in family if self.is_visible(member)]
+            self.culled += len(family) - len(visible)
+            members.extend(visible)
+        # what Camera.get_mobjects_to_display does with the family members, on the visible ones only
+        members = remove_list_redundancies(members)
+        if self.use_z_index:
+            members = sorted(members, key=lambda m: m.z_index)
+        if excluded_mobjects:
+            members = list_difference_update(members, extract_mobject_family_members(excluded_mobjects))
+        return members
+
+    def is_visible(self, mob):
+        key = id(mob)
+        if self._dynamic_ids is None or key in self._dynamic_ids:
+            return self._check_visible(mob)
+        cached = self._visible.get(key)
+        if cached is None or cached[0] is not mob:
+            cached = self._visible[key] = (mob, self._check_visible(mob))
+        return cached[1]
+
+    def _check_visible(self, mob):
+        if isinstance(mob, VMobject):
+            for rgbas, width in PAINT_ATTRS:
+                rgbas = getattr(mob, rgbas)
+                if (width is None or getattr(mob, width) > 0) and len(rgbas) != 0 and rgbas[:, 3].max() > 0:
+                    break
+            else:
+                return False
+        # strokes are drawn centred on the points, so give the box a margin for the widest of them
+        margin = max(getattr(mob, "stroke_width", 0), getattr(mob, "background_stroke_width", 0)) / 100
+        (x_min, y_min), (x_max, y_max) = _bounding_box(mob.points, margin=margin)
+        x0, y0 = self.frame_center[0] - self.frame_width / 2, self.frame_center[1] - self.frame_height / 2
+        x1, y1 = x0 + self.frame_width, y0 + self.frame_height
+        return not (x_max < x0 or x_min > x1 or y_max < y0 or y_min > y1)
+
+
+class CullingMixin(Scene):
+    """Tells a CullingCamera which mobjects can change during each play, see CullingCamera."""
+
+    def begin_animations(self):
+        super().begin_animations()
+        camera = self.renderer.camera
+        if isinstance(camera, CullingCamera):
+            dynamic = [mob for animation in self.animations if animation.mobject is not None
+                       for mob in animation.mobject.get_family()]
+            dynamic.extend(mob for mob in self.get_mobject_family_members() if len(mob.updaters) > 0)
+            camera.begin_play(dynamic)
+
+    def play(self, *args, **kwargs):
+        try:
+            super().play(*args, **kwargs)
+        finally:
+            if isinstance(self.renderer.camera, CullingCamera):
+                self.renderer.camera.end_play()
+
+    def remove(self, *mobjects):
+        if isinstance(self.renderer.camera, CullingCamera):
+            self.renderer.camera.forget(*mobjects)
+        return super().remove(*mobjects)
+
+
+class DraftMixin(Scene):
+    """
+    In draft mode, drawing animations (DrawBorderThenFill, and Write through it) jump to their end state, and
+    Circumscribe, which leaves nothing behind, is dropped. A play left without animations still takes one frame so
+    the slide keeps its animation.
+    """
+
+    draft = False
+
+    def play(self, *args, **kwargs):
+        if not self.draft:
+            return super().play(*args, **kwargs)
+        animations = []
+        for animation in args:
+            if self._snappable(animation):
+                self._snap(animation)
+            else:
+                animations.append(animation)
+        if len(animations) == 0:
+            return super().play(Wait(run_time=1 / config.frame_rate))
+        return super().play(*animations, **kwargs)
+
+    @classmethod
+    def _snappable(cls, animation):
+        if isinstance(animation, (DrawBorderThenFill, Circumscribe)):
+            return True
+        return (isinstance(animation, AnimationGroup) and len(animation.animations) != 0 and
+                all(cls._snappable(a) for a in animation.animations))
+
+    def _snap(self, animation):
+        if isinstance(animation, DrawBorderThenFill):
+            self.add(animation.mobject)
+        elif not isinstance(animation, Circumscribe):
+            for a in animation.animations:
+                self._snap(a)
@@ -0,0 +1,214 @@
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import manim
+import manim_slides
+from manim import Scene, config
+
+from render_cache import PAINT_ATTRS
+
+# frames from these files are the machinery between the deck and the renderer, not part of the deck
+_LIBRARY_DIRS = tuple(os.path.dirname(module.__file__) + os.sep for module in (manim, manim_slides))
+
+
+def _is_transparent(mobject):
+    """Whether no member of the family would put a pixel on screen. Mobjects without rgbas (images) always count."""
+    for mob in mobject.get_family():
+        if len(mob.points) == 0:
+            continue
+        if not hasattr(mob, "fill_rgbas"):
+            return False
+        for rgbas, width in PAINT_ATTRS:
+            rgbas = getattr(mob, rgbas)
+            if (width is None or getattr(mob, width) > 0) and len(rgbas) != 0 and rgbas[:, 3].max() > 0:
+                return False
+    return True
+
+
+def _is_offscreen(mobject):
+    points = mobject.get_all_points()
+    if len(points) == 0:
+        return False
+    (x_min, y_min), (x_max, y_max) = points[:, :2].min(axis=0), points[:, :2].max(axis=0)
+    return (x_max < -config.frame_x_radius or x_min > config.frame_x_radius or
+            y_max < -config.frame_y_radius or y_min > config.frame_y_radius)
+
+
+class PlayProfiler:
+    """
+    Per play measurements of a scene: wall time, frames rendered, mobject and submobject counts, the bytes held by
+    point arrays, and where in the deck the play was made, as the chain of deck methods from construct down.
+    """
+
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir
+        self.records: List[Dict] = []
+        self.slide = 0
+
+    def record(self, kind, stack, wall_time, frames=0, mobjects=0, submobjects=0, point_bytes=0):
+        self.records.append({"index": len(self.records), "kind": kind, "slide": self.slide,
+                             "section": stack[1] if len(stack) > 1 else stack[0] if len(stack) != 0 else "?",
+                             "stack": stack, "wall_time": wall_time, "frames": frames, "mobjects": mobjects,
+                             "submobjects": submobjects, "point_bytes": point_bytes})
+
+    def section_totals(self):
+        totals: Dict[str, Dict] = defaultdict(lambda: {"wall_time": 0., "frames": 0, "plays": 0})
+        for record in self.records:
+            total = totals[record["section"]]
+            total["wall_time"] += record["wall_time"]
+            total["frames"] += record["frames"]
+            total["plays"] += record["kind"] == "play"
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["wall_time"]))
+
+    def report(self, top=None):
+        """The sections by total time, then every play and slide break by wall time, slowest first."""
+        total_time = sum(record["wall_time"] for record in self.records) or 1.
+        lines = [f"{'section':<40} {'time (s)':>10} {'share':>7} {'plays':>6} {'frames':>7}"]
+        for section, total in self.section_totals().items():
+            lines.append(f"{section:<40} {total['wall_time']:>10.3f} {total['wall_time'] / total_time:>7.1%} "
+                         f"{total['plays']:>6} {total['frames']:>7}")
+        lines.append("")
+        lines.append(f"{'#':>5} {'kind':<10} {'slide':>5} {'time (s)':>10} {'frames':>7} {'s/frame':>8} "
+                     f"{'mobjects':>9} {'family':>8} {'points (KiB)':>13}  where")
+        records = sorted(self.records, key=lambda r: -r["wall_time"])
+        for record in records[:top]:
+            per_frame = record["wall_time"] / record["frames"] if record["frames"] != 0 else 0.
+            lines.append(f"{record['index']:>5} {record['kind']:<10} {record['slide']:>5} "
+                         f"{record['wall_time']:>10.3f} {record['frames']:>7} {per_frame:>8.4f} "
+                         f"{record['mobjects']:>9} {record['submobjects']:>8} {record['point_bytes'] / 1024:>13.1f}"
+                         f"  {'.'.join(record['stack'])}")
+        return "\n".join(lines)
+
+    def folded(self):
+        """The records as folded stacks in microseconds, as read by flamegraph.pl, speedscope or inferno."""
+        weights: Dict[str, int] = defaultdict(int)
+        for record in self.records:
+            weights[";".join([*record["stack"], f"{record['kind']}#{record['index']}"])] += \
+                round(record["wall_time"] * 1e6)
+        return [f"{stack} {weight}" for stack, weight in weights.items()]
+
+    def write(self, name, output_dir=None):
+        output_dir = Path(output_dir if output_dir is not None else self.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        (output_dir / f"{name}.profile.txt").write_text(self.report() + "\n", encoding="utf-8")
+        (output_dir / f"{name}.folded").write_text("\n".join(self.folded()) + "\n", encoding="utf-8")
+
+
+class MemoryProfiler:
+    """
+    Snapshots of what the scene holds at every slide boundary: top-level and family mobject counts, points and their
+    bytes, and the top-level mobjects that draw nothing, being fully transparent or entirely outside the frame. Those
+    still cost a family walk, and often a rasterisation pass, on every frame until they are removed, which
+    auto_cleanup does at each boundary.
+    """
+
+    def __init__(self, output_dir=None, auto_cleanup=False):
+        self.output_dir = output_dir
+        self.auto_cleanup = auto_cleanup
+        self.snapshots: List[Dict] = []
+
+    def snapshot(self, scene: Scene, slide, stack):
+        family = scene.get_mobject_family_members()
+        mobjects = len(scene.mobjects)
+        keep = {id(mob) for mob in scene.foreground_mobjects}
+        invisible = []
+        for mob in scene.mobjects:
+            if id(mob) in keep or len(mob.updaters) > 0:
+                continue
+            reason = "transparent" if _is_transparent(mob) else "offscreen" if _is_offscreen(mob) else None
+            if reason is not None:
+                points = sum(len(m.points) for m in mob.get_family())
+                invisible.append((mob, reason, points))
+        if self.auto_cleanup and len(invisible) != 0:
+            scene.remove(*(mob for mob, _, _ in invisible))
+        snapshot = {"slide": slide, "where": ".".join(stack), "mobjects": mobjects, "family": len(family),
+                    "points": sum(len(mob.points) for mob in family),
+                    "point_bytes": sum(mob.points.nbytes for mob in family),
+                    "invisible": [(getattr(mob, "name", None) or type(mob).__name__, reason, points)
+                                  for mob, reason, points in invisible],
+                    "removed": len(invisible) if self.auto_cleanup else 0}
+        self.snapshots.append(snapshot)
+        return snapshot
+
+    def report(self, top=10):
+        lines = [f"{'slide':>5} {'mobjects':>9} {'family':>8} {'growth':>7} {'points':>9} {'KiB':>9} "
+                 f"{'invisible':>10} {'removed':>8}  where"]
+        previous = 0
+        for snapshot in self.snapshots:
+            lines.append(f"{snapshot['slide']:>5} {snapshot['mobjects']:>9} {snapshot['family']:>8} "
+                         f"{snapshot['family'] - previous:>+7} {snapshot['points']:>9} "
+                         f"{snapshot['point_bytes'] / 1024:>9.1f} {len(snapshot['invisible']):>10} "
+                         f"{snapshot['removed']:>8}  {snapshot['where']}")
+            previous = snapshot["family"]
+        if len(self.snapshots) != 0:
+            last = self.snapshots[-1]
+            lines.append("")
+            lines.append(f"largest invisible mobjects at slide {last['slide']}:")
+            for name, reason, points in sorted(last["invisible"], key=lambda i: -i[2])[:top]:
+                lines.append(f"  {name:<40} {reason:<12} {points:>9} points")
+        return "\n".join(lines)
+
+    def write(self, name, output_dir=None):
+        output_dir = Path(output_dir if output_dir is not None else self.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        (output_dir / f"{name}.memory.txt").write_text(self.report() + "\n", encoding="utf-8")
+
+
+class PlayProfilerMixin(Scene):
+    """
+    Times every play and slide break of the scene when a PlayProfiler is set, snapshots the scene at every slide break
+    when a MemoryProfiler is set, and writes their reports after render.
+    """
+
+    profiler: Optional[PlayProfiler] = None
+    memory_profiler: Optional[MemoryProfiler] = None
+    _slide_breaks = 0
+
+    def _deck_stack(self):
+        stack = []
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename != __file__ and not filename.startswith(_LIBRARY_DIRS):
+                stack.append(frame.f_code.co_name)
+            if frame.f_code.co_name == "construct" and frame.f_locals.get("self") is self:
+                break
+            frame = frame.f_back
+        return stack[::-1]
+
+    def play(self, *args, **kwargs):
+        if self.profiler is None:
+            return super().play(*args, **kwargs)
+        stack = self._deck_stack()
+        start_time = getattr(self.renderer, "time", 0.)
+        start = time.perf_counter()
+        super().play(*args, **kwargs)
+        wall_time = time.perf_counter() - start
+        family = self.get_mobject_family_members()
+        self.profiler.record("play", stack, wall_time,
+                             frames=round((getattr(self.renderer, "time", 0.) - start_time) * config.frame_rate),
+                             mobjects=len(self.mobjects), submobjects=len(family),
+                             point_bytes=sum(mob.points.nbytes for mob in family))
+
+    def next_slide(self, *args, **kwargs):
+        if self.profiler is None and self.memory_profiler is None:
+            return super().next_slide(*args, **kwargs)
+        stack = self._deck_stack()
+        if self.memory_profiler is not None:
+            self.memory_profiler.snapshot(self, self._slide_breaks, stack)
+        start = time.perf_counter()
+        super().next_slide(*args, **kwargs)
+        if self.profiler is not None:
+            self.profiler.record("next_slide", stack, time.perf_counter() - start, mobjects=len(self.mobjects))
+            self.profiler.slide += 1
+        self._slide_breaks += 1
+
+    def render(self, *args, **kwargs):
+        super().render(*args, **kwargs)
+        for profiler in (self.profiler, self.memory_profiler):
+            if profiler is not None and profiler.output_dir is not None:
+                profiler.write(type(self).__name__)
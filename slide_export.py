@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from manim import Scene, config, logger
+from manim_slides.utils import concatenate_video_files, merge_basenames, reverse_video_file
+
+
+def _write_atomic(dst: Path, write):
+    """Write through a temporary file next to dst, so an interrupted export never leaves a file that looks complete."""
+    tmp = dst.with_name(f"{dst.stem}.part{dst.suffix}")  # the suffix tells PyAV the container
+    write(tmp)
+    os.replace(tmp, dst)
+
+
+def export_slide(files: List[Path], dst: Path, rev: Path, overwrite=False):
+    """The slide's video and its reversed video, what manim-slides writes for a slide after render."""
+    if overwrite or not dst.exists():
+        _write_atomic(dst, lambda tmp: concatenate_video_files(files, tmp))
+    if overwrite or not rev.exists():
+        _write_atomic(rev, lambda tmp: reverse_video_file(dst, tmp))
+
+
+class StreamingExportMixin(Scene):
+    """
+    Exports every slide as soon as the next_slide call that ends it returns, in background threads while the following
+    slides render, instead of concatenating and reversing every slide after render.
+
+    Slides are written straight to the folder and under the names manim-slides uses, which hash the names of the
+    slide's partial movie files, themselves hashes of the animations. A slide whose animations did not change keeps its
+    name and is not exported again, and the _save_slides of manim-slides finds every file in place and only writes the
+    presentation config. Files of slides that no longer exist are removed afterwards. With caching disabled partial
+    movie files are numbered instead of hashed, so every slide is exported again.
+    """
+
+    stream_export = True
+    export_workers = 1
+    _exporter: Optional[ThreadPoolExecutor] = None
+    _exports: Optional[List] = None
+    _reused = 0
+
+    def _scene_files_folder(self):
+        return self._output_folder / "files" / str(self)
+
+    def _slide_files(self, slide):
+        files = self._partial_movie_files[slide.slides_slice]
+        if len(files) == 0:
+            return None
+        dst = self._scene_files_folder() / merge_basenames(files).name
+        return files, dst, dst.with_name(f"{dst.stem}_reversed{dst.suffix}")
+
+    def _streaming(self):
+        # animations skipped with -n shift the partial movie files against the slides until _save_slides realigns them
+        return self.stream_export and config.write_to_movie and not self._start_at_animation_number
+
+    def _export(self, slides):
+        for slide in slides:
+            slide_files = self._slide_files(slide)
+            if slide_files is None:
+                continue
+            files, dst, rev = slide_files
+            if not config.disable_caching and dst.exists() and rev.exists():
+                self._reused += 1
+                continue
+            if self._exporter is None:
+                self._scene_files_folder().mkdir(parents=True, exist_ok=True)
+                self._exporter = ThreadPoolExecutor(max_workers=self.export_workers,
+                                                    thread_name_prefix="slide-export")
+                self._exports = []
+            self._exports.append(self._exporter.submit(export_slide, files, dst, rev,
+                                                       overwrite=config.disable_caching))
+
+    def next_slide(self, *args, **kwargs):
+        ended = len(self._slides)
+        super().next_slide(*args, **kwargs)
+        if self._streaming():
+            self._export(self._slides[ended:])
+
+    def _save_slides(self, *args, **kwargs):
+        if self._streaming():
+            ended = len(self._slides)
+            self._add_last_slide()
+            self._export(self._slides[ended:])
+        if self._exporter is not None:
+            try:
+                for export in self._exports:
+                    export.result()
+            finally:
+                self._exporter.shutdown()
+                self._exporter = None
+            logger.info(f"Exported {len(self._exports)} slides while rendering, {self._reused} unchanged")
+        super()._save_slides(*args, **kwargs)
+        if self._streaming():
+            self._remove_stale_files()
+
+    def _remove_stale_files(self):
+        kept = set()
+        for slide in self._slides:
+            slide_files = self._slide_files(slide)
+            if slide_files is not None:
+                kept.update(path.name for path in slide_files[1:])
+        suffix = config.movie_file_extension
+        for path in self._scene_files_folder().glob(f"*{suffix}"):
+            if path.name not in kept:
+                path.unlink()
@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def scene_factory():
+    """Builds the scene of the scene fixture, test modules needing another scene override it."""
+    return pytest.importorskip("manim").Scene
+
+
+@pytest.fixture
+def scene(scene_factory):
+    manim = pytest.importorskip("manim")
+    with manim.tempconfig({"write_to_movie": False, "disable_caching": True, "verbosity": "WARNING"}):
+        yield scene_factory()
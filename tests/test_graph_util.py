@@ -0,0 +1,194 @@
+import pytest
+
+manim = pytest.importorskip("manim")
+
+from manim import LEFT, RIGHT, Arrow, Dot, Square, VGroup  # noqa: E402
+
+from graph_util import (DetailSwitch, EdgeManager, GroupOpacity, LabelNode, consolidate_edge_batches,  # noqa: E402
+                        detail_switch)
+
+
+def start(scene, *animations):
+    """Scene.play up to the first frame."""
+    scene.compile_animation_data(*animations)
+    scene.begin_animations()
+
+
+def finish(scene):
+    for animation in scene.animations:
+        animation.finish()
+        animation.clean_up_from_scene(scene)
+
+
+def family_ids(scene):
+    return [id(mob) for mob in scene.get_mobject_family_members()]
+
+
+def make_graph(n=4):
+    squares = [Square().shift(RIGHT * 3 * i) for i in range(n)]
+    return VGroup(*squares), squares
+
+
+def test_grouped_dim_keeps_scene_structure(scene):
+    graph, squares = make_graph()
+    other = Square()
+    scene.add(graph, other)
+    mobjects, family = list(scene.mobjects), family_ids(scene)
+
+    start(scene, GroupOpacity(*squares[:2], opacity=.1))
+    assert scene.mobjects == mobjects
+    assert family_ids(scene) == family
+    assert all(any(mob is square for mob in scene.moving_mobjects) for square in squares[:2])
+    finish(scene)
+
+    assert scene.mobjects == mobjects
+    assert family_ids(scene) == family
+    assert squares[0].get_stroke_opacity() == pytest.approx(.1)
+    assert squares[2].get_stroke_opacity() == pytest.approx(1)
+
+
+def test_grouped_fade_out_removes_members_at_the_end(scene):
+    graph, squares = make_graph()
+    scene.add(graph)
+    fade_out = GroupOpacity(*squares[:2], fade_out=True)
+
+    start(scene, fade_out)
+    fade_out.interpolate(.5)
+    assert {id(square) for square in squares} <= set(family_ids(scene))
+    assert 0 < squares[0].get_stroke_opacity() < 1
+    finish(scene)
+
+    family = set(family_ids(scene))
+    assert id(squares[0]) not in family and id(squares[1]) not in family
+    assert id(squares[2]) in family and id(squares[3]) in family
+    # left as they were, ready to be faded back in
+    assert squares[0].get_stroke_opacity() == pytest.approx(1)
+
+
+def test_grouped_fade_in_adds_only_missing_members(scene):
+    graph, squares = make_graph()
+    scene.add(graph)
+    new = Square()
+
+    start(scene, GroupOpacity(squares[0], new, fade_in=True))
+    finish(scene)
+
+    assert scene.mobjects == [graph, new]
+
+
+def test_detail_switch_keeps_containers_in_scene(scene):
+    containers = [VGroup(Square()) for _ in range(3)]
+    scene.add(VGroup(*containers))
+    mobjects = list(scene.mobjects)
+    swaps = [(container, list(container.submobjects), [Dot()]) for container in containers]
+
+    start(scene, DetailSwitch(swaps))
+    finish(scene)
+
+    assert scene.mobjects == mobjects
+    family = set(family_ids(scene))
+    for container, outgoing, incoming in swaps:
+        assert id(container) in family
+        assert id(incoming[0]) in family and id(outgoing[0]) not in family
+
+
+def test_edge_tips_come_back_at_full_detail(scene):
+    edges = EdgeManager()
+    arrow = Arrow(LEFT, RIGHT)
+    scene.add(arrow)
+    tip_size = edges._tip_size(arrow)
+    width = arrow.get_stroke_width()
+
+    start(scene, *detail_switch(*edges._edge_swaps(arrow, True, thin_width=1)))
+    finish(scene)
+    assert not arrow.has_tip()
+    # the decision to bring the tips back still sees their size
+    assert edges._tip_size(arrow) == pytest.approx(tip_size)
+
+    start(scene, *detail_switch(*edges._edge_swaps(arrow, False, thin_width=1)))
+    finish(scene)
+    assert arrow.has_tip()
+    assert arrow.get_stroke_width() == pytest.approx(width)
+    assert id(arrow) not in edges.edge_detail_state
+
+
+def make_edges(names="abcd"):
+    nodes = [LabelNode(Square(side_length=.5), name).shift(RIGHT * 3 * i) for i, name in enumerate(names)]
+    return EdgeManager(*nodes), nodes
+
+
+def test_edge_key_lookup_leaves_the_batch_alone(scene):
+    edges, _ = make_edges()
+    edge_batch = edges.add_edge_batch(("a", "b"), ("b", "c"), ("c", "d"))
+    edges.edge_highlight_state_map.update({("a", "b"): 1, ("c", "d"): 1})
+
+    assert edges.get_edge_keys(("b", "a"), ("c", "d")) == [("a", "b"), ("c", "d")]
+    edges.cleanup_highlight_edges(("b", "c"))
+    assert edges.edge_highlight_state_map == {}
+    assert len(edge_batch.submobjects) == 1
+
+
+def test_isolated_edges_merge_back_after_play(scene):
+    edges, _ = make_edges()
+    edge_batch = edges.add_edge_batch(("a", "b"), ("b", "c"), ("c", "d"))
+    scene.add(edge_batch)
+
+    start(scene, *edges.highlight_edges(("a", "b")))
+    finish(scene)
+    assert len(edge_batch.submobjects) == 2
+    # still dimmed, nothing to merge
+    consolidate_edge_batches(scene)
+    assert len(edge_batch.submobjects) == 2
+
+    start(scene, *edges.undo_highlight_edges(("a", "b")))
+    finish(scene)
+    consolidate_edge_batches(scene)
+    assert len(edge_batch.submobjects) == 1
+    assert sorted(edge_batch.submobjects[0].keys) == [("a", "b"), ("b", "c"), ("c", "d")]
+
+
+def test_isolated_edges_out_of_the_scene_are_not_merged(scene):
+    edges, _ = make_edges()
+    edge_batch = edges.add_edge_batch(("a", "b"), ("b", "c"), ("c", "d"))
+    scene.add(edge_batch)
+
+    start(scene, *edges.fadeOut_edges(("a", "b")))
+    finish(scene)
+    consolidate_edge_batches(scene)
+    # faded out edges keep their own bucket, merging the others into it would hide them
+    assert len(edge_batch.submobjects) == 2
+    assert {id(bucket) for bucket in edge_batch.submobjects} & set(family_ids(scene)) != set()
+
+
+def test_remove_edges_finds_reversed_keys(scene):
+    edges, _ = make_edges()
+    edge_batch = edges.add_edge_batch(("a", "b"), ("b", "c"), bidirectional=True)
+    edges.add_edges(("c", "d"), bidirectional=True)
+
+    edges.remove_edges(("b", "a"), ("d", "c"))
+    assert edge_batch.get_keys() == [("b", "c")]
+    assert list(edges.edge_batch_map) == [("b", "c")]
+    assert edges.edge_map == {}
+
+
+def test_cleanup_takes_the_dim_overlay_out(scene):
+    edges, nodes = make_edges()
+    scene.add(*nodes)
+    z_indices = [mob.z_index for mob in nodes[0].get_family()]
+
+    start(scene, *edges.highlight_nodes("a", overlay=True))
+    finish(scene)
+    overlay = edges.dim_overlay
+    assert any(mob is overlay for mob in scene.mobjects)
+    assert nodes[0].z_index > overlay.z_index
+
+    edges.cleanup_highlight_nodes(scene=scene)
+    assert not any(mob is overlay for mob in scene.mobjects)
+    assert [mob.z_index for mob in nodes[0].get_family()] == z_indices
+    assert edges.dim_overlay is None and edges.dim_overlay_raised_z_indices == []
+
+    # a later highlight brings one overlay, not a second one on top
+    start(scene, *edges.highlight_nodes("b", overlay=True))
+    finish(scene)
+    assert sum(mob is edges.dim_overlay for mob in scene.mobjects) == 1
+    assert not any(mob is overlay for mob in scene.mobjects)
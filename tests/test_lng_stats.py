@@ -0,0 +1,33 @@
+import numpy as np
+
+from lng_data import LABEL_SETS_INFO
+from lng_stats import example_statistics
+from ung_search import UNGIndex
+
+
+def brute_force_count(label_sets, counts, query_labels):
+    return sum(counts[name] for name, labels in label_sets.items() if set(query_labels) <= set(labels))
+
+
+def test_cumulative_counts_match_brute_force():
+    statistics = example_statistics()
+    label_sets = {ls_id: info["labels"] for ls_id, info in enumerate(LABEL_SETS_INFO, start=1)}
+    counts = {ls_id: len(info["documents"]) for ls_id, info in enumerate(LABEL_SETS_INFO, start=1)}
+    for name, labels in label_sets.items():
+        assert statistics.cumulative_counts[name] == brute_force_count(label_sets, counts, labels)
+
+
+def test_derived_lng_matches_brute_force():
+    rng = np.random.default_rng(0)
+    label_sets = list({tuple(sorted(rng.choice(12, size=rng.integers(1, 5), replace=False).tolist()))
+                       for _ in range(60)})
+    vector_groups = rng.integers(len(label_sets), size=500)
+    index = UNGIndex(rng.normal(size=(500, 4)), vector_groups, label_sets, [[] for _ in range(500)],
+                     [[0] for _ in label_sets])
+    counts = dict(enumerate(np.bincount(vector_groups, minlength=len(label_sets)).tolist()))
+    named = dict(enumerate(label_sets))
+    for group, labels in named.items():
+        assert index.statistics.cumulative_counts[group] == brute_force_count(named, counts, labels)
+    for query in ([], [0], [3, 7], [1, 2, 5], [11, 40]):
+        assert index.statistics.estimate(query) == brute_force_count(named, counts, query)
+        assert index.selectivity(query) == brute_force_count(named, counts, query) / 500
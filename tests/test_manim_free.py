@@ -0,0 +1,17 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+# the data, search and build tooling runs on machines without a renderer
+MANIM_FREE = ["lng_data", "lng_cluster", "lng_stats", "layout_cache", "workload", "distance_kernels", "ung_search",
+              "ung_build"]
+
+
+@pytest.mark.parametrize("module", MANIM_FREE)
+def test_imports_without_manim(module):
+    # a fresh interpreter, with manim blocked before anything can import it
+    code = f"import sys; sys.modules['manim'] = None; import {module}"
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
@@ -0,0 +1,69 @@
+import pytest
+
+manim = pytest.importorskip("manim")
+
+from manim import DOWN, LEFT, ORIGIN, RIGHT, UP, Line, Scene, Square, VGroup  # noqa: E402
+from manim.renderer.cairo_renderer import CairoRenderer  # noqa: E402
+
+from graph_util import GroupOpacity  # noqa: E402
+from render_cache import CullingCamera, CullingMixin, StaticLayerMixin, StaticLayerRenderer  # noqa: E402
+
+
+class StaticLayerScene(StaticLayerMixin, Scene):
+    pass
+
+
+class CullingScene(CullingMixin, Scene):
+    pass
+
+
+@pytest.fixture
+def scene_factory():
+    return lambda: StaticLayerScene(renderer=StaticLayerRenderer())
+
+
+def test_grouped_edge_fade_keeps_the_rest_of_the_graph_static(scene):
+    # vertical edges spread across the frame, the faded ones at both ends
+    edges = [Line(DOWN, UP).shift(LEFT * 6 + RIGHT * 1.5 * i) for i in range(9)]
+    graph = VGroup(*edges)
+    scene.add(graph)
+    faded = [edges[0], edges[-1]]
+
+    scene.compile_animation_data(GroupOpacity(*faded, opacity=.1))
+    scene.begin_animations()
+
+    moving = {id(mob) for mob in scene.moving_mobjects}
+    assert all(id(edge) in moving for edge in faded)
+    assert not any(id(edge) in moving for edge in edges[1:-1])
+    assert {id(mob) for mob in scene.static_mobjects} >= {id(edge) for edge in edges[1:-1]}
+
+
+def test_culling_keeps_static_subtrees_for_the_play():
+    camera = CullingCamera()
+    static = VGroup(Square(), Square().shift(RIGHT * 100))
+    moving = Square()
+    camera.begin_play([moving])
+
+    assert camera.get_mobjects_to_display([static, moving]) == [static[0], moving]
+    # static subtrees are not looked at again until the play ends, animated mobjects are
+    static[1].move_to(ORIGIN)
+    moving.shift(RIGHT * 100)
+    assert camera.get_mobjects_to_display([static, moving]) == [static[0]]
+
+    camera.end_play()
+    assert camera.get_mobjects_to_display([static, moving]) == [static[0], static[1]]
+
+
+def test_culling_forgets_removed_mobjects():
+    scene = CullingScene(renderer=CairoRenderer(camera_class=CullingCamera))
+    camera = scene.renderer.camera
+    group = VGroup(Square())
+    scene.add(group)
+    camera.begin_play([])
+    camera.get_mobjects_to_display([group])
+    camera.is_visible(group[0])
+    assert id(group) in camera._static_subtrees and id(group[0]) in camera._visible
+
+    scene.remove(group)
+    assert id(group) not in camera._static_subtrees
+    assert id(group[0]) not in camera._visible
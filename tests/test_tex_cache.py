@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+manim = pytest.importorskip("manim")
+
+from manim import tempconfig  # noqa: E402
+
+import tex_cache  # noqa: E402
+
+
+@pytest.fixture
+def tex_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tex_cache, "_dimensions", None)
+    with tempconfig({"tex_dir": str(tmp_path)}):
+        yield tmp_path
+
+
+def test_warm_cache_starts_no_pool(tex_dir, monkeypatch):
+    (tex_dir / "0123.svg").write_text("<svg/>", encoding="utf-8")
+    (tex_dir / tex_cache.DIMENSIONS_FILE).write_text(json.dumps({"$a$": [1., 1., "0123.svg"]}), encoding="utf-8")
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("started a pool for cached strings")
+
+    monkeypatch.setattr(tex_cache, "ProcessPoolExecutor", no_pool)
+    tex_cache.precompile_tex(["$a$", "$a$"])
+
+
+def test_missing_svg_or_older_entry_is_compiled_again(tex_dir):
+    dimensions = {"$a$": [1., 1., "gone.svg"], "$b$": [1., 1.]}
+    assert not tex_cache._cached("$a$", dimensions, tex_dir)
+    assert not tex_cache._cached("$b$", dimensions, tex_dir)
+    assert not tex_cache._cached("$c$", dimensions, tex_dir)
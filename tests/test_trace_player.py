@@ -0,0 +1,49 @@
+import pytest
+
+manim = pytest.importorskip("manim")
+
+from trace_player import coalesce_steps, step_cost  # noqa: E402
+
+
+def make_steps(costs, keys=None):
+    """Steps of the given costs, each remembering its index, with its boundary key as the vector it pops."""
+    keys = [None] * len(costs) if keys is None else list(keys)
+    return [{"pop": key, "vectors": list(range(cost - 1)), "edges": [], "index": i}
+            for i, (cost, key) in enumerate(zip(costs, keys))]
+
+
+def test_step_cost_counts_the_step_and_what_it_reveals():
+    assert step_cost({"pop": 1, "vectors": [2, 3], "edges": [(1, 2), (1, 3)]}) == 5
+    assert step_cost({"pop": None, "vectors": [], "edges": []}) == 1
+
+
+@pytest.mark.parametrize("costs, max_batches, keys, slack, expected", [
+    # short traces keep one step per batch
+    ([], 3, None, .5, []),
+    ([1, 1], 3, None, .5, [[0], [1]]),
+    ([1, 1, 1], 3, None, .5, [[0], [1], [2]]),
+    # one batch takes everything
+    ([1] * 5, 1, None, .5, [[0, 1, 2, 3, 4]]),
+    # equal shares
+    ([1] * 6, 3, None, .5, [[0, 1], [2, 3], [4, 5]]),
+    ([2] * 8, 3, None, .5, [[0, 1, 2], [3, 4, 5], [6, 7]]),
+    # an expensive step takes a batch of its own and the others share what is left
+    ([10, 1, 1, 1, 1, 1], 3, None, .5, [[0], [1, 2, 3], [4, 5]]),
+    # a late expensive step leaves fewer batches rather than a starved one
+    ([1, 1, 1, 1, 1, 10], 3, None, .5, [[0, 1, 2, 3, 4], [5]]),
+    # cuts move to where the key changes
+    ([2] * 8, 3, "aabbbccc", .5, [[0, 1], [2, 3, 4], [5, 6, 7]]),
+    # a run that would not fit is started in a new batch once the batch holds slack of its share
+    ([2] * 8, 2, "aabbbbbb", .5, [[0, 1], [2, 3, 4, 5, 6, 7]]),
+    # and not before
+    ([2] * 8, 2, "aabbbbbb", .9, [[0, 1, 2, 3], [4, 5, 6, 7]]),
+    # steps without a key are no boundary
+    ([2] * 6, 3, [None, "a", "a", None, "b", "b"], .5, [[0, 1], [2, 3], [4, 5]]),
+])
+def test_coalesce_steps(costs, max_batches, keys, slack, expected):
+    steps = make_steps(costs, keys)
+    boundaries = None if keys is None else (lambda step: step["pop"])
+    batches = coalesce_steps(steps, max_batches, boundaries=boundaries, slack=slack)
+    assert [[step["index"] for step in batch] for batch in batches] == expected
+    assert len(batches) <= max_batches
+    assert [step for batch in batches for step in batch] == steps
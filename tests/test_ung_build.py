@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from ung_build import UNGBuilder, load_index
+from workload import WorkloadConfig, generate_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    # 10 attributes of 8 values, 80 labels, more than one 64 bit word
+    path = tmp_path_factory.mktemp("dataset")
+    generate_dataset(path, WorkloadConfig(num_vectors=1500, dim=8, num_attributes=10, values_per_attribute=8,
+                                          missing=.6))
+    return path
+
+
+def make_builder(dataset, build_dir):
+    # small chunks and blocks, so every stage has several tasks to checkpoint
+    return UNGBuilder(dataset, build_dir, degree=4, exact_below=64, block_rows=16, cross_sample=8, max_workers=2,
+                      log=lambda line: None)
+
+
+def minimum_supersets(label_sets):
+    sets = [frozenset(labels) for labels in label_sets]
+    edges = set()
+    for group, labels in enumerate(sets):
+        supersets = [other for other, other_labels in enumerate(sets) if labels < other_labels]
+        edges.update((group, s) for s in supersets if not any(sets[o] < sets[s] for o in supersets))
+    return edges
+
+
+def test_lng_over_64_labels_matches_set_inclusion(dataset, tmp_path):
+    builder = make_builder(dataset, tmp_path)
+    builder.group()
+    builder.lng()
+    assert max(max(labels) for labels in builder.label_sets if len(labels) != 0) > 64
+    assert len(builder.lng_edges) != 0
+    assert set(builder.lng_edges) == minimum_supersets(builder.label_sets)
+
+
+def build_outputs(build_dir):
+    info = json.loads((build_dir / "index.json").read_text(encoding="utf-8"))
+    del info["throughput"]
+    arrays = {name: np.load(build_dir / f"{name}.npy").tolist()
+              for name in ("neighbor_offsets", "neighbor_ids", "vector_groups")}
+    return info, arrays
+
+
+def test_resumed_build_matches_an_uninterrupted_one(dataset, tmp_path):
+    make_builder(dataset, tmp_path / "full").build()
+
+    interrupted = tmp_path / "interrupted"
+    make_builder(dataset, interrupted).build()
+    # as if the build had stopped partway through the inner and cross stages
+    checkpoints = sorted((interrupted / "checkpoints").glob("*.npy"))
+    inner = [path for path in checkpoints if path.name.startswith("inner_")]
+    cross = [path for path in checkpoints if path.name.startswith("cross_")]
+    assert len(inner) > 1 and len(cross) > 1
+    for path in [*inner[::2], *cross[1::2]]:
+        path.unlink()
+    for name in ("index.json", "neighbor_offsets.npy", "neighbor_ids.npy", "vector_groups.npy"):
+        (interrupted / name).unlink()
+    make_builder(dataset, interrupted).build()
+
+    assert build_outputs(interrupted) == build_outputs(tmp_path / "full")
+    index = load_index(interrupted)
+    assert len(index) == 1500
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from ung_search import (PLAN_AUTO, PLAN_GRAPH, PLAN_HYBRID, PLAN_SCAN, Adjacency, BoundedBeam, VisitedTable,
+                        example_index, example_query_vector)
+
+
+def fill(beam, *candidates):
+    beam.fill(np.array([d for d, _ in candidates], dtype=float), np.array([p for _, p in candidates]))
+
+
+def contents(beam):
+    return list(zip(beam.distances[:len(beam)].tolist(), beam.positions[:len(beam)].tolist()))
+
+
+def test_beam_fill_keeps_the_closest():
+    beam = BoundedBeam(3)
+    fill(beam, (4., 0), (1., 1), (3., 2), (2., 3), (5., 4))
+    assert contents(beam) == [(1., 1), (2., 3), (3., 2)]
+
+
+def test_beam_insert_past_capacity_drops_the_farthest():
+    beam = BoundedBeam(3)
+    fill(beam, (1., 0), (3., 1))
+    assert beam.worst() == np.inf
+    assert beam.insert(2., 2)
+    assert contents(beam) == [(1., 0), (2., 2), (3., 1)]
+    assert beam.insert(.5, 3)
+    assert contents(beam) == [(.5, 3), (1., 0), (2., 2)]
+    assert not beam.insert(2., 4)
+    assert not beam.insert(9., 5)
+    assert contents(beam) == [(.5, 3), (1., 0), (2., 2)]
+
+
+def test_beam_ties_go_after_equal_distances():
+    beam = BoundedBeam(4)
+    fill(beam, (1., 0), (2., 1))
+    assert beam.insert(1., 2)
+    assert beam.insert(1., 3)
+    assert contents(beam) == [(1., 0), (1., 2), (1., 3), (2., 1)]
+
+
+def test_beam_pops_closest_unexplored_first():
+    beam = BoundedBeam(4)
+    fill(beam, (1., 0), (2., 1), (3., 2))
+    assert beam.positions[beam.pop()] == 0
+    assert beam.positions[beam.pop()] == 1
+    # an insert in front of the cursor is popped next
+    beam.insert(.5, 3)
+    assert beam.positions[beam.pop()] == 3
+    assert beam.positions[beam.pop()] == 2
+    assert beam.pop() is None
+
+
+def test_beam_pop_skips_explored_candidates_shifted_by_an_insert():
+    beam = BoundedBeam(3)
+    fill(beam, (1., 0), (2., 1), (3., 2))
+    assert beam.positions[beam.pop()] == 0
+    beam.insert(1.5, 3)
+    assert contents(beam) == [(1., 0), (1.5, 3), (2., 1)]
+    assert [beam.positions[beam.pop()] for _ in range(2)] == [3, 1]
+    assert beam.pop() is None
+
+
+def test_visited_table_marks_each_position_once_per_query():
+    visited = VisitedTable(6)
+    visited.next_query()
+    assert visited.visit_new(np.array([0, 2, 4])).tolist() == [0, 2, 4]
+    assert visited.visit_new(np.array([4, 1, 2])).tolist() == [1]
+    visited.next_query()
+    assert visited.visit_new(np.array([4, 1, 2])).tolist() == [4, 1, 2]
+
+
+def test_visited_table_wraparound_clears_the_marks():
+    visited = VisitedTable(4)
+    visited.epoch = np.iinfo(np.uint32).max - 2
+    visited.next_query()
+    visited.visit_new(np.array([0, 1]))
+    visited.next_query()
+    assert visited.epoch == 1
+    assert visited.marks.tolist() == [0, 0, 0, 0]
+    assert visited.visit_new(np.array([0, 1, 3])).tolist() == [0, 1, 3]
+    visited.next_query()
+    assert visited.epoch == 2
+    assert visited.visit_new(np.array([0, 1, 3])).tolist() == [0, 1, 3]
+
+
+def test_adjacency_drops_repeats_in_order():
+    adjacency = Adjacency.from_lists([[2, 1, 2], [], [0, 0, 1, 0]])
+    assert [adjacency[i].tolist() for i in range(len(adjacency))] == [[2, 1], [], [0, 1]]
+    assert adjacency.indptr.tolist() == [0, 2, 2, 4]
+
+
+QUERY_LABELS = [[], [1], [2], [1, 3], [1, 4], [2, 7, 8], [1, 4, 5, 6]]
+
+
+def brute_force(index, query, labels, k, positions=None):
+    if positions is None:
+        positions = range(len(index))
+    positions = [p for p in positions if set(labels) <= index.label_sets[index.vector_groups[p]]]
+    distances = ((index.vectors[positions] - np.asarray(query, dtype=np.float32)) ** 2).sum(axis=1)
+    return [index.ids[positions[i]] for i in np.argsort(distances, kind="stable")[:k]]
+
+
+def reachable(index, labels):
+    """The positions a search never dropping a candidate explores: everything reachable from the entry vectors."""
+    seen = {p for group in index.entry_sets(labels) for p in index.group_entries[group]}
+    stack = list(seen)
+    while len(stack) != 0:
+        for neighbor in index.neighbors[stack.pop()].tolist():
+            if neighbor not in seen:
+                seen.add(neighbor)
+                stack.append(neighbor)
+    return sorted(seen)
+
+
+@pytest.mark.parametrize("labels", QUERY_LABELS)
+@pytest.mark.parametrize("strategy", [PLAN_SCAN, PLAN_GRAPH, PLAN_HYBRID, PLAN_AUTO])
+def test_search_matches_brute_force(labels, strategy):
+    index = example_index()
+    for group_id in index.group_ids:
+        query = example_query_vector(index, group_id)
+        result, distances = index.search(query, labels, k=3, beam_width=len(index), strategy=strategy)
+        plan = index.plan(labels, beam_width=len(index), strategy=strategy)
+        positions = None if plan.strategy == PLAN_SCAN else sorted(
+            {*reachable(index, labels), *(p for g in plan.scan_groups for p in index.group_members[g].tolist())})
+        assert result == brute_force(index, query, labels, 3, positions)
+        assert distances == sorted(distances)
@@ -0,0 +1,128 @@
+import ast
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from manim import DEFAULT_FONT_SIZE, Tex, Text, config
+from manim.utils.tex_file_writing import delete_nonsvg_files
+
+# calls whose string literal arguments end up compiled by LaTeX, mapped to the keyword that can opt out of Tex
+TEX_CALLS = {"Tex": None, "make_tex": None, "_set_title": None, "make_multiline_text": "use_tex"}
+# size of every compiled expression at font size 1 and the name of its svg, kept next to the cached svgs so draft
+# proxies match them and a warm cache is known without starting any LaTeX job
+DIMENSIONS_FILE = "tex_dimensions.json"
+
+_draft = False
+_dimensions = None
+
+
+def set_draft(draft):
+    """In draft mode make_tex builds a Pango Text proxy with the size of the Tex it stands for, no LaTeX involved."""
+    global _draft
+    _draft = draft
+
+
+def is_draft():
+    return _draft
+
+
+def _dimensions_path():
+    return config.get_dir("tex_dir") / DIMENSIONS_FILE
+
+
+def load_tex_dimensions() -> Dict[str, List[float]]:
+    global _dimensions
+    if _dimensions is None:
+        path = _dimensions_path()
+        _dimensions = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    return _dimensions
+
+
+def _plain(expression):
+    text = expression.replace("\\\\", "\n")
+    text = re.sub(r"\\([a-zA-Z]+)", r"\1", text)
+    return re.sub(r"[${}_^~\\]", "", text).strip() or "?"
+
+
+def make_tex(expression, font_size=DEFAULT_FONT_SIZE, **kwargs):
+    """
+    Tex(expression), or in draft mode a Text stretched to the size the Tex has in the cache, so the layout stays
+    the same. Expressions that were never compiled get a Text of the same font size.
+    """
+    if not _draft:
+        return Tex(expression, font_size=font_size, **kwargs)
+    proxy = Text(_plain(expression), font_size=font_size)
+    dimensions = load_tex_dimensions().get(expression)
+    if dimensions is not None:
+        width, height = dimensions[:2]
+        proxy.stretch_to_fit_width(width * font_size).stretch_to_fit_height(height * font_size)
+    return proxy
+
+
+def find_tex_literals(path, calls=None) -> List[str]:
+    """
+    Scan a module's source for string literals passed to Tex producing calls, so the pre-pass stays in sync with the
+    slides without keeping a second list of strings around.
+    """
+    calls = TEX_CALLS if calls is None else calls
+    tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    literals = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+        if name not in calls:
+            continue
+        opt_out = calls[name]
+        if opt_out is not None and any(kw.arg == opt_out and isinstance(kw.value, ast.Constant) and not kw.value.value
+                                       for kw in node.keywords):
+            continue
+        literals.extend(arg.value for arg in node.args
+                        if isinstance(arg, ast.Constant) and isinstance(arg.value, str))
+    return literals
+
+
+def _init_worker(tex_dir):
+    # every job writes straight into the shared cache, cleanup of the intermediate files happens once at the end
+    config.tex_dir = tex_dir
+    config.no_latex_cleanup = True
+
+
+def _compile(expression) -> Tuple[str, float, float, str]:
+    # building the mobject goes through manim's own tex -> dvi -> svg path, so the cached file names are exactly
+    # the ones a later Tex(expression) looks up
+    tex = Tex(expression)
+    return expression, tex.width / tex.font_size, tex.height / tex.font_size, tex.file_name.name
+
+
+def _cached(expression, dimensions, tex_dir):
+    # entries written before the svg name was recorded do not count, they are compiled once more
+    entry = dimensions.get(expression)
+    return entry is not None and len(entry) > 2 and (tex_dir / entry[2]).exists()
+
+
+def precompile_tex(expressions: Iterable[str], max_workers=None):
+    """
+    Compile every Tex string the scene needs up front, spread over a pool of LaTeX jobs. The size and svg of every
+    string are recorded, strings whose svg is still in the cache are skipped without starting the pool; in draft
+    mode, strings whose size is known are skipped altogether.
+    """
+    dimensions = load_tex_dimensions()
+    tex_dir = config.get_dir("tex_dir")
+    expressions = sorted(set(expressions))
+    if _draft:
+        expressions = [expression for expression in expressions if expression not in dimensions]
+    else:
+        expressions = [expression for expression in expressions if not _cached(expression, dimensions, tex_dir)]
+    if len(expressions) == 0:
+        return
+    tex_dir.mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(str(tex_dir),)) as pool:
+        for expression, width, height, svg_name in pool.map(_compile, expressions, chunksize=4):
+            dimensions[expression] = [width, height, svg_name]
+    _dimensions_path().write_text(json.dumps(dimensions, indent=0, sort_keys=True), encoding="utf-8")
+    if not config.no_latex_cleanup:
+        delete_nonsvg_files()
@@ -0,0 +1,313 @@
+import math
+from typing import Callable, Dict, List
+
+import numpy as np
+from manim import *
+
+from graph_util import EdgeBatch, EdgeManager, group_opacity
+from ung_search import SearchTrace
+
+
+def trace_steps(trace: SearchTrace) -> List[Dict]:
+    """
+    Split a trace into steps: the scanned vectors and the entry vectors first, then one step per expansion with the
+    vector popped, the edges its pushes went through, and the beam and search counters afterwards.
+    """
+    steps = []
+    for event in trace:
+        kind = event["event"]
+        if kind == "scan":
+            steps.append({"pop": None, "vectors": list(event["vectors"]), "edges": [], "beam": [], "stats": None})
+        elif kind == "entry_vectors":
+            steps.append({"pop": None, "vectors": list(event["vectors"]), "edges": [], "beam": list(event["vectors"]),
+                          "stats": None})
+        elif kind == "pop":
+            steps.append({"pop": event["vector"], "vectors": [], "edges": [], "beam": [], "stats": None})
+        elif kind == "push" and len(steps) != 0:
+            steps[-1]["vectors"].append(event["vector"])
+            steps[-1]["edges"].append(tuple(event["edge"]))
+        elif kind == "beam" and len(steps) != 0:
+            steps[-1]["beam"] = list(event["vectors"])
+        elif kind == "stats" and len(steps) != 0:
+            steps[-1]["stats"] = {field: value for field, value in event.items() if field != "event"}
+    return steps
+
+
+def step_cost(step):
+    """What a step adds to the frame: the vector it explores, and the vectors and edges its pushes reveal."""
+    return 1 + len(step["vectors"]) + len(step["edges"])
+
+
+def coalesce_steps(steps, max_batches, boundaries=None, slack=.5):
+    """
+    Merge consecutive steps into at most max_batches batches of about the same cost, a trace short enough keeps one
+    step per batch. Each batch gets an equal share of the cost left, recomputed after every cut, so a few expensive
+    steps do not starve the batches after them. When boundaries gives a key per step (the group a step explores, say),
+    a run of steps with the same key is kept in one batch where it can be: a batch holding at least slack of its share
+    is closed where the key changes if the next run would not fit in it.
+    """
+    if len(steps) <= max_batches:
+        return [[step] for step in steps]
+    costs = [step_cost(step) for step in steps]
+    keys = [None] * len(steps) if boundaries is None else [boundaries(step) for step in steps]
+    # the cost from every step to the end of its run
+    run_costs = costs[:]
+    for i in range(len(steps) - 2, -1, -1):
+        if keys[i] is not None and keys[i] == keys[i + 1]:
+            run_costs[i] += run_costs[i + 1]
+    remaining = sum(costs)
+    batches, batch, cost = [], [], 0
+    for i, step in enumerate(steps):
+        if len(batch) != 0 and len(batches) < max_batches - 1:
+            share = remaining / (max_batches - len(batches))
+            boundary = keys[i] is not None and keys[i - 1] is not None and keys[i] != keys[i - 1]
+            if cost >= share or (boundary and cost >= share * slack and cost + run_costs[i] > share):
+                batches.append(batch)
+                remaining -= cost
+                batch, cost = [], 0
+        batch.append(step)
+        cost += costs[i]
+    batches.append(batch)
+    return batches
+
+
+def project_positions(ids, vectors, width, height, center=ORIGIN):
+    """Lay out vectors on screen by their two principal components, scaled to fit a width x height area."""
+    vectors = np.asarray(vectors, dtype=float)
+    if len(vectors) == 0:
+        return {}
+    centered = vectors - vectors.mean(axis=0)
+    if centered.shape[1] > 2:
+        _, _, components = np.linalg.svd(centered, full_matrices=False)
+        centered = centered @ components[:2].T
+    elif centered.shape[1] < 2:
+        centered = np.pad(centered, ((0, 0), (0, 2 - centered.shape[1])))
+    extent = np.abs(centered).max(axis=0)
+    extent[extent == 0] = 1
+    scaled = centered / extent * np.array([width / 2, height / 2])
+    return {vector_id: center + np.array([x, y, 0.]) for vector_id, (x, y) in zip(ids, scaled)}
+
+
+def trace_vector_ids(trace: SearchTrace) -> List:
+    """Every vector a trace touches, in the order it first does."""
+    return list(dict.fromkeys(v for step in trace_steps(trace) for v in (
+        *([] if step["pop"] is None else [step["pop"]]), *step["vectors"])))
+
+
+def layered_positions(trace: SearchTrace, width, height, center=ORIGIN):
+    """
+    Lay out the vectors of a trace without knowing the vectors themselves: one row per hop from where the search
+    started, top to bottom, the vectors of a row spread evenly in the order they were reached.
+    """
+    depth = {}
+    for step in trace_steps(trace):
+        hop = 0 if step["pop"] is None else depth.setdefault(step["pop"], 0) + 1
+        for vector in step["vectors"]:
+            depth.setdefault(vector, hop)
+    rows: Dict[int, List] = {}
+    for vector, hop in depth.items():
+        rows.setdefault(hop, []).append(vector)
+    row_height = height / max(len(rows), 1)
+    positions = {}
+    for i, hop in enumerate(sorted(rows)):
+        vectors = rows[hop]
+        y = height / 2 - row_height * (i + .5)
+        for j, vector in enumerate(vectors):
+            positions[vector] = center + np.array([width * ((j + .5) / len(vectors) - .5), y, 0.])
+    return positions
+
+
+class UNGTraceView:
+    """
+    Plays a trace on the deck's unified navigating graph, revealing groups, vectors and edges as they are reached. All
+    the boxes, vectors and edges a batch reveals fade in as one GroupOpacity.
+    """
+
+    def __init__(self, node_objects: EdgeManager, edges: EdgeManager, name_of: Callable, group_of: Callable):
+        self.node_objects = node_objects
+        self.edges = edges
+        self.name_of = name_of
+        self.group_of = group_of
+        self.revealed_vectors = set()
+        self.revealed_groups = set()
+        self.revealed_edges = set()
+        self.explored_vectors = []
+
+    def reveal(self, steps):
+        new_vectors = [self.name_of(v) for step in steps for v in step["vectors"]
+                       if self.name_of(v) not in self.revealed_vectors]
+        new_vectors = list(dict.fromkeys(new_vectors))
+        new_edges = [(self.name_of(f), self.name_of(t)) for step in steps for f, t in step["edges"]]
+        new_edges = [edge for edge in dict.fromkeys(new_edges) if edge not in self.revealed_edges]
+        explored = [self.name_of(step["pop"]) for step in steps if step["pop"] is not None]
+        anim, revealed = [], []
+        for name, obj in zip(explored, self.node_objects.get_objects(*explored)):
+            if name in new_vectors:
+                obj.set_stroke(color=YELLOW)  # fades in already explored, one animation per mobject
+            else:
+                anim.append(obj.animate.set_stroke(color=YELLOW))
+        for vector in new_vectors:
+            group = self.group_of(vector)
+            group_object = [*self.node_objects.get_objects(group)][0]
+            if group not in self.revealed_groups:
+                self.revealed_groups.add(group)
+                revealed.extend((group_object.box, group_object.title))
+            revealed.append(group_object.get_node(vector))
+        revealed.extend(self.edges.get_edges(*new_edges))
+        anim.extend(group_opacity(revealed, fade_in=True))
+        self.revealed_vectors.update(new_vectors)
+        self.revealed_edges.update(new_edges)
+        self.explored_vectors.extend(explored)
+        return anim
+
+    def boundary(self, step):
+        return self.group_of(self.name_of(step["pop"])) if step["pop"] is not None else None
+
+    def cleanup(self):
+        return [*self.node_objects.fadeOut_nodes(*self.revealed_vectors),
+                *self.node_objects.fadeOut_nodes(*self.revealed_groups),
+                *self.edges.fadeOut_edges(*self.revealed_edges)]
+
+    def reset(self):
+        """Give explored vectors their colour back, once they are faded out."""
+        for obj in self.node_objects.get_objects(*self.explored_vectors):
+            obj.set_stroke(color=WHITE)
+
+
+class SubgraphTraceView(VGroup):
+    """
+    Plays a trace without any prebuilt graph: only the vectors and edges the search touched are drawn, at the given
+    positions (see project_positions), so a trace over a huge index costs no more than what it visited. Every batch
+    adds one group of dots and one EdgeBatch.
+    """
+
+    def __init__(self, positions: Dict, dot_radius=.08, color=BLUE, explored_color=YELLOW, stroke_width=2,
+                 tip_width=.12, **kwargs):
+        super().__init__(**kwargs)
+        self.positions = positions
+        self.dot_radius = dot_radius
+        self.color = color
+        self.explored_color = explored_color
+        self.stroke_width = stroke_width
+        self.tip_width = tip_width
+        self.dots: Dict = {}
+        self.revealed_edges = set()
+
+    def reveal(self, steps):
+        new_vectors = list(dict.fromkeys(v for step in steps for v in step["vectors"] if v not in self.dots))
+        new_edges = [edge for edge in dict.fromkeys(e for step in steps for e in step["edges"])
+                     if edge not in self.revealed_edges]
+        anim = []
+        if len(new_edges) != 0:
+            edge_batch = EdgeBatch(color=self.color, stroke_width=self.stroke_width, tip_width=self.tip_width)
+            edge_batch.add_edges(*[((f, t), self.positions[f], self.positions[t]) for f, t in new_edges],
+                                 buff=self.dot_radius)
+            self.revealed_edges.update(new_edges)
+            self.add(edge_batch)
+            anim.extend(group_opacity([edge_batch], fade_in=True))
+        explored = {step["pop"] for step in steps if step["pop"] is not None}
+        if len(new_vectors) != 0:
+            dots = VGroup(*[Dot(self.positions[v], radius=self.dot_radius,
+                                color=self.explored_color if v in explored else self.color) for v in new_vectors])
+            self.dots.update(zip(new_vectors, dots))
+            self.add(dots)
+            anim.extend(group_opacity([dots], fade_in=True))
+        anim.extend(self.dots[v].animate.set_color(self.explored_color)
+                    for v in explored if v in self.dots and v not in new_vectors)
+        return anim
+
+    def boundary(self, step):
+        return None
+
+    def cleanup(self):
+        # the batches were faded in one by one, so they are in the scene on their own rather than through this group
+        return list(group_opacity(self.submobjects, fade_out=True))
+
+    def reset(self):
+        pass
+
+
+class MetricsOverlay(VGroup):
+    """
+    On-screen search counters. The captions are built once, a step only changes the values of the numbers, which
+    redraws a few digits instead of whole lines of text. The first row shows the strategy the planner chose.
+    """
+
+    METRICS = [("distance_computations", "Distance computations", 0),
+               ("visited_vectors", "Visited vectors", 0),
+               ("visited_groups", "Visited groups", 0),
+               ("cross_group_hops", "Cross-group hops", 0),
+               ("beam_size", "Beam size", 0),
+               ("kth_distance", "k-th best distance", 3)]
+
+    def __init__(self, font_size=48, buff=.25, **kwargs):
+        super().__init__(**kwargs)
+        self.font_size = font_size
+        self.numbers: Dict[str, DecimalNumber] = {}
+        self.plan = Text("-", font_size=font_size)
+        rows = [VGroup(Text("Plan", font_size=font_size), self.plan).arrange(RIGHT, buff=buff * 2)]
+        for field, caption, decimals in self.METRICS:
+            number = DecimalNumber(0, num_decimal_places=decimals, font_size=font_size)
+            self.numbers[field] = number
+            rows.append(VGroup(Text(caption, font_size=font_size), number).arrange(RIGHT, buff=buff * 2))
+        self.rows = VGroup(*rows).arrange(DOWN, buff=buff, aligned_edge=LEFT)
+        self.box = SurroundingRectangle(self.rows, buff=buff, color=WHITE, stroke_width=4)
+        self.add(self.rows, self.box)
+
+    def set_values(self, stats):
+        """Animations moving every counter that changed to its value in stats."""
+        if stats is None:
+            return []
+        return [ChangeDecimalToValue(number, stats[field]) for field, number in self.numbers.items()
+                if stats.get(field) is not None and stats[field] != number.get_value()]
+
+    def set_plan(self, plan):
+        """An animation writing the strategy of a "plan" event and its estimated cost in place of the current one."""
+        if plan is None:
+            return []
+        cost = plan["costs"].get(plan["strategy"])
+        caption = plan["strategy"] if cost is None else f"{plan['strategy']}, est. {cost * 1e6:.0f} µs"
+        if len(plan["scan_sets"]) != 0 and plan["strategy"] != "scan":
+            caption += f", scans {len(plan['scan_sets'])} sets"
+        text = Text(caption, font_size=self.font_size).move_to(self.plan, aligned_edge=LEFT)
+        return [Transform(self.plan, text)]
+
+
+class TracePlayer:
+    """
+    Turns a search trace into slides, coalescing consecutive steps (see coalesce_steps) so the walk takes at most
+    max_slides slides, cut preferably where it moves to another group. With a time_budget, the walk also takes at most
+    time_budget seconds: fewer slides when each would play shorter than min_run_time, and every slide the same share.
+    """
+
+    def __init__(self, scene, view, max_slides=8, notes="Then we traverse...", overlay: MetricsOverlay = None,
+                 time_budget=None, min_run_time=.5):
+        self.scene = scene
+        self.view = view
+        self.max_slides = max_slides
+        self.notes = notes
+        self.overlay = overlay
+        self.time_budget = time_budget
+        self.min_run_time = min_run_time
+
+    def play(self, trace: SearchTrace):
+        max_slides = self.max_slides
+        if self.time_budget is not None:
+            max_slides = max(1, min(max_slides, math.floor(self.time_budget / self.min_run_time)))
+        batches = coalesce_steps(trace_steps(trace), max_slides, boundaries=self.view.boundary)
+        play_kwargs = {} if self.time_budget is None else {"run_time": self.time_budget / max(1, len(batches))}
+        for i, steps in enumerate(batches):
+            anim = self.view.reveal(steps)
+            if self.overlay is not None and i == 0:
+                anim.extend(self.overlay.set_plan(trace.first("plan")))
+            if self.overlay is not None:
+                anim.extend(self.overlay.set_values(next((s["stats"] for s in reversed(steps) if s["stats"]), None)))
+            if len(anim) != 0:
+                self.scene.next_slide(notes=self.notes)
+                self.scene.play(*anim, **play_kwargs)
+
+    def cleanup(self):
+        return self.view.cleanup()
+
+    def reset(self):
+        self.view.reset()
@@ -0,0 +1,282 @@
+# Parallel construction of a unified navigating graph (UNG) over a dataset written by workload.py.
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from ung_search import Adjacency, UNGIndex
+from workload import Dataset
+
+_dataset = None
+
+
+def _init_worker(dataset_path):
+    global _dataset
+    _dataset = Dataset(dataset_path)
+
+
+def _save(path, array):
+    # write then rename, an interrupted build never leaves a checkpoint half written
+    tmp = path.with_name(path.name + ".tmp.npy")
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def _read(positions):
+    """The vectors at positions, read from the memory map in increasing order and returned in the given order."""
+    order = np.argsort(positions, kind="stable")
+    vectors = np.empty((len(positions), _dataset.vectors.shape[1]), dtype=np.float32)
+    vectors[order] = _dataset.vectors[positions[order]]
+    return vectors
+
+
+def _nearest(queries, candidates, count, exclude=None):
+    """The count nearest candidates of every query by squared L2, as indices into candidates, -1 padded."""
+    distances = ((queries ** 2).sum(axis=1)[:, None] - 2 * queries @ candidates.T +
+                 (candidates ** 2).sum(axis=1)[None, :])
+    if exclude is not None:
+        distances[np.arange(len(queries)), exclude] = np.inf
+    count = min(count, candidates.shape[0] - (exclude is not None))
+    if count <= 0:
+        return np.full((len(queries), 0), -1, dtype=np.int64)
+    nearest = np.argpartition(distances, count - 1, axis=1)[:, :count]
+    order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1)
+    return np.take_along_axis(nearest, order, axis=1)
+
+
+def _inner_task(task):
+    """k nearest neighbours of a block of rows of one chunk of a group, within the chunk."""
+    path, chunk, start, end, degree = task
+    vectors = _read(chunk)
+    rows = np.arange(start, end)
+    nearest = _nearest(vectors[start:end], vectors, degree, exclude=rows)
+    neighbors = np.full((end - start, degree), -1, dtype=np.int64)
+    neighbors[:, :nearest.shape[1]] = chunk[nearest]
+    _save(Path(path), neighbors)
+    return end - start
+
+
+def _cross_task(task):
+    """For sampled vectors of a group, an edge to the nearest vector of each of its minimum supersets."""
+    path, sources, targets = task
+    source_vectors = _read(sources)
+    edges = []
+    for superset in targets:
+        nearest = _nearest(source_vectors, _read(superset), 1)[:, 0]
+        edges.append(np.stack([sources, superset[nearest]], axis=1))
+    _save(Path(path), np.concatenate(edges) if len(edges) != 0 else np.empty((0, 2), dtype=np.int64))
+    return len(sources) * len(targets)
+
+
+class UNGBuilder:
+    """
+    Builds a UNG in stages, each spread over a pool of processes:
+
+    - groups: vectors grouped by label set
+    - inner: a k nearest neighbour graph inside every group. Groups are split into chunks of at most exact_below
+      vectors, ordered along a random projection so a chunk holds nearby vectors, with consecutive chunks linked, and
+      chunks into blocks of block_rows rows. Blocks are queued largest first (LPT) and idle workers take the next one,
+      so a handful of huge groups do not leave the other workers waiting
+    - lng: the minimum supersets of every label set
+    - cross: for up to cross_sample vectors of every group, an edge to the nearest vector of each minimum superset,
+      found among at most exact_below vectors of it
+
+    Every finished task is checkpointed under build_dir, an interrupted build picks up where it stopped.
+    """
+
+    def __init__(self, dataset_path, build_dir, degree=16, exact_below=8192, block_rows=2048, cross_sample=64,
+                 max_workers=None, seed=0, log=print):
+        # absolute, the index is loaded from wherever its directory is
+        self.dataset_path = str(Path(dataset_path).resolve())
+        self.dataset = Dataset(dataset_path)
+        self.build_dir = Path(build_dir)
+        self.checkpoint_dir = self.build_dir / "checkpoints"
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        params = {"dataset": self.dataset_path, "degree": degree, "exact_below": exact_below,
+                  "block_rows": block_rows, "cross_sample": cross_sample, "seed": seed}
+        params_path = self.build_dir / "params.json"
+        if params_path.exists() and json.loads(params_path.read_text(encoding="utf-8")) != params:
+            raise Exception(f"{build_dir} holds checkpoints of a build with other parameters, use another directory")
+        params_path.write_text(json.dumps(params), encoding="utf-8")
+        self.degree = degree
+        self.exact_below = exact_below
+        self.block_rows = block_rows
+        self.cross_sample = cross_sample
+        self.max_workers = max_workers
+        self.rng = np.random.default_rng(seed)
+        self.log = log
+        self.throughput: Dict[str, Dict] = {}
+
+    def _record(self, stage, vectors, elapsed):
+        self.throughput[stage] = {"vectors": vectors, "seconds": elapsed,
+                                  "vectors_per_second": vectors / elapsed if elapsed > 0 else math.inf}
+
+    def _run_stage(self, name, tasks: List[Tuple], fn, costs: List[int], sizes: List[int]):
+        """
+        Run the tasks whose checkpoint is missing, largest cost first, and record the throughput of the stage over the
+        vectors of the tasks that ran.
+        """
+        start = time.perf_counter()
+        pending = sorted((i for i, task in enumerate(tasks) if not Path(task[0]).exists()), key=lambda i: -costs[i])
+        self.log(f"{name}: {len(tasks) - len(pending)} of {len(tasks)} tasks already checkpointed")
+        if len(pending) != 0:
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(self.dataset_path,)) as pool:
+                futures = [pool.submit(fn, tasks[i]) for i in pending]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    future.result()
+                    if done % max(1, len(futures) // 20) == 0 or done == len(futures):
+                        elapsed = time.perf_counter() - start
+                        self.log(f"{name}: {done}/{len(futures)} tasks, {elapsed:.1f}s")
+        self._record(name, sum(sizes[i] for i in pending), time.perf_counter() - start)
+
+    def group(self):
+        start = time.perf_counter()
+        groups = self.dataset.label_set_groups()
+        self.label_sets = sorted(groups)
+        self.members = [np.asarray(groups[labels], dtype=np.int64) for labels in self.label_sets]
+        self._record("groups", len(self.dataset), time.perf_counter() - start)
+        self.log(f"groups: {len(self.label_sets)} label sets over {len(self.dataset)} vectors")
+
+    def _chunks(self, group):
+        members = self.members[group]
+        if len(members) <= self.exact_below:
+            return [members]
+        direction = np.random.default_rng(group).normal(size=self.dataset.vectors.shape[1])
+        order = np.argsort(np.asarray(self.dataset.vectors[members]) @ direction, kind="stable")
+        return np.array_split(members[order], math.ceil(len(members) / self.exact_below))
+
+    def inner(self):
+        self.chunks = [self._chunks(group) for group in range(len(self.members))]
+        tasks, costs, sizes = [], [], []
+        for group, chunks in enumerate(self.chunks):
+            for c, chunk in enumerate(chunks):
+                for start in range(0, len(chunk), self.block_rows):
+                    end = min(start + self.block_rows, len(chunk))
+                    tasks.append((str(self.checkpoint_dir / f"inner_{group}_{c}_{start}.npy"), chunk, start, end,
+                                  self.degree))
+                    costs.append((end - start) * len(chunk))
+                    sizes.append(end - start)
+        self._run_stage("inner", tasks, _inner_task, costs, sizes)
+        self.inner_tasks = tasks
+
+    def lng(self):
+        """
+        Minimum supersets from label bitsets, as many 64 bit words per label set as the largest label needs, the
+        supersets of each group compared pairwise at once.
+        """
+        start = time.perf_counter()
+        words = max((max(labels) for labels in self.label_sets if len(labels) != 0), default=0) // 64 + 1
+        masks = np.zeros((len(self.label_sets), words), dtype=np.uint64)
+        for group, labels in enumerate(self.label_sets):
+            for label in labels:
+                masks[group, label // 64] |= np.uint64(1) << np.uint64(label % 64)
+        self.lng_edges: List[Tuple[int, int]] = []
+        for group, mask in enumerate(masks):
+            supersets = np.flatnonzero(((masks & mask) == mask).all(axis=1) & (masks != mask).any(axis=1))
+            if len(supersets) == 0:
+                continue
+            sub = masks[supersets]
+            # a superset is minimum when no other superset of the group lies inside it
+            inside = (((sub[None, :] & sub[:, None]) == sub[:, None]).all(axis=2) &
+                      (sub[None, :] != sub[:, None]).any(axis=2))
+            self.lng_edges.extend((group, int(s)) for s in supersets[~inside.any(axis=0)])
+        self._record("lng", len(self.dataset), time.perf_counter() - start)
+        self.log(f"lng: {len(self.lng_edges)} edges between {len(self.label_sets)} label sets")
+
+    def cross(self):
+        targets: Dict[int, List[int]] = {}
+        for f, t in self.lng_edges:
+            targets.setdefault(f, []).append(t)
+        tasks, costs, sizes = [], [], []
+        for group, supersets in sorted(targets.items()):
+            members = self.members[group]
+            sources = members if len(members) <= self.cross_sample else self.rng.choice(
+                members, size=self.cross_sample, replace=False)
+            sampled = [self.members[t] if len(self.members[t]) <= self.exact_below else self.rng.choice(
+                self.members[t], size=self.exact_below, replace=False) for t in supersets]
+            tasks.append((str(self.checkpoint_dir / f"cross_{group}.npy"), sources, sampled))
+            costs.append(len(sources) * sum(len(s) for s in sampled))
+            sizes.append(len(members))
+        self._run_stage("cross", tasks, _cross_task, costs, sizes)
+        self.cross_tasks = tasks
+
+    def assemble(self) -> UNGIndex:
+        """Merge the checkpoints into neighbour lists and write the index files."""
+        n = len(self.dataset)
+        vector_groups = np.empty(n, dtype=np.int64)
+        for group, members in enumerate(self.members):
+            vector_groups[members] = group
+        neighbors: List[List[int]] = [[] for _ in range(n)]
+        for path, chunk, start, end, _ in self.inner_tasks:
+            for row, block in zip(chunk[start:end].tolist(), np.load(path).tolist()):
+                neighbors[row].extend(v for v in block if v >= 0)
+        for chunks in self.chunks:
+            for a, b in zip(chunks[:-1], chunks[1:]):
+                neighbors[int(a[0])].append(int(b[0]))
+                neighbors[int(b[0])].append(int(a[0]))
+        for path, _, _ in self.cross_tasks:
+            for f, t in np.load(path).tolist():
+                neighbors[f].append(t)
+        group_entries = []
+        for members in self.members:
+            vectors = np.asarray(self.dataset.vectors[members], dtype=np.float32)
+            group_entries.append([int(members[np.argmin(((vectors - vectors.mean(axis=0)) ** 2).sum(axis=1))])])
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(n_) for n_ in neighbors])
+        np.save(self.build_dir / "neighbor_offsets.npy", offsets)
+        np.save(self.build_dir / "neighbor_ids.npy", np.array([v for n_ in neighbors for v in n_], dtype=np.int64))
+        np.save(self.build_dir / "vector_groups.npy", vector_groups)
+        (self.build_dir / "index.json").write_text(json.dumps({
+            "dataset": self.dataset_path, "label_sets": [list(labels) for labels in self.label_sets],
+            "group_entries": group_entries, "lng_edges": self.lng_edges, "throughput": self.throughput}),
+            encoding="utf-8")
+        return UNGIndex(self.dataset.vectors, vector_groups, self.label_sets, neighbors, group_entries,
+                        lng_edges=self.lng_edges)
+
+    def build(self) -> UNGIndex:
+        self.group()
+        self.inner()
+        self.lng()
+        self.cross()
+        index = self.assemble()
+        self.log(self.report())
+        return index
+
+    def report(self):
+        lines = [f"{'stage':<8}{'vectors':>12}{'seconds':>10}{'vectors/s':>14}"]
+        for stage, row in self.throughput.items():
+            lines.append(f"{stage:<8}{row['vectors']:>12}{row['seconds']:>10.2f}{row['vectors_per_second']:>14.0f}")
+        return "\n".join(lines)
+
+
+def load_index(build_dir) -> UNGIndex:
+    """The index written by UNGBuilder.assemble, over the memory mapped dataset it was built from."""
+    build_dir = Path(build_dir)
+    info = json.loads((build_dir / "index.json").read_text(encoding="utf-8"))
+    neighbors = Adjacency(np.load(build_dir / "neighbor_offsets.npy"), np.load(build_dir / "neighbor_ids.npy"))
+    return UNGIndex(Dataset(info["dataset"]).vectors, np.load(build_dir / "vector_groups.npy"), info["label_sets"],
+                    neighbors, info["group_entries"], lng_edges=info.get("lng_edges"))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a UNG over a dataset written by workload.py.")
+    parser.add_argument("dataset", type=Path)
+    parser.add_argument("build_dir", type=Path)
+    parser.add_argument("--degree", type=int, default=16)
+    parser.add_argument("--exact-below", type=int, default=8192, help="largest chunk searched exhaustively")
+    parser.add_argument("--block-rows", type=int, default=2048)
+    parser.add_argument("--cross-sample", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    UNGBuilder(args.dataset, args.build_dir, degree=args.degree, exact_below=args.exact_below,
+               block_rows=args.block_rows, cross_sample=args.cross_sample, max_workers=args.workers,
+               log=lambda line: print(line, file=sys.stderr)).build()
@@ -0,0 +1,505 @@
+# Filtered search over a unified navigating graph (UNG), run and traced without the renderer.
+import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from distance_kernels import METRIC_L2, VectorStore
+from lng_data import LABEL_SETS_INFO, LNG_EDGE_INFOS, UNG_CROSS_GROUP_EDGE_INFOS, UNG_INNER_GRAPH_EDGE_INFOS
+from lng_stats import LNGStatistics
+
+EXAMPLE_SEED = 2233
+
+PLAN_AUTO = "auto"
+PLAN_SCAN = "scan"
+PLAN_GRAPH = "graph"
+PLAN_HYBRID = "hybrid"
+
+
+class SearchTrace:
+    """
+    A recorded search, as a list of events stored one JSON object per line:
+
+    - query: the query labels, k and beam width
+    - plan: the strategy the search runs with, the groups it scans and the estimated cost of every strategy
+    - entry_sets: the label sets the search starts from
+    - scan: the vectors of the scanned groups, all compared with the query before the beam is seeded
+    - entry_vectors: the vectors the beam is seeded with, with their distances
+    - pop: the closest unexplored vector in the beam is expanded
+    - push: a neighbour made it into the beam, with the edge it was reached through
+    - beam: the beam after an expansion, closest first
+    - stats: the SearchStats counters after the entry vectors and after every expansion
+    - result: the k nearest vectors found
+    """
+
+    def __init__(self, events: Optional[Iterable[Dict]] = None):
+        self.events: List[Dict] = list(events) if events is not None else []
+
+    def record(self, event, **fields):
+        self.events.append({"event": event, **fields})
+
+    def first(self, event):
+        for e in self.events:
+            if e["event"] == event:
+                return e
+        return None
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for event in self.events:
+                f.write(json.dumps(event))
+                f.write("\n")
+
+    @classmethod
+    def read(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+
+class SearchStats:
+    """The counters a search keeps while it runs."""
+
+    FIELDS = ("distance_computations", "visited_vectors", "visited_groups", "cross_group_hops", "beam_size",
+              "kth_distance")
+
+    def __init__(self):
+        self.distance_computations = 0
+        self.visited_vectors = 0
+        self.cross_group_hops = 0
+        self.beam_size = 0
+        self.kth_distance = None  # until the beam holds k candidates
+        self._groups = set()
+
+    @property
+    def visited_groups(self):
+        return len(self._groups)
+
+    def visit(self, group):
+        self.visited_vectors += 1
+        self.distance_computations += 1
+        self._groups.add(group)
+
+    def visit_many(self, groups):
+        self.visited_vectors += len(groups)
+        self.distance_computations += len(groups)
+        self._groups.update(np.unique(groups).tolist())
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class VisitedTable:
+    """
+    The vectors a search has visited, as one epoch number per vector: a vector is visited when its number is the
+    current epoch. Starting the next query only bumps the epoch, the table is cleared once every 2^32 queries.
+    """
+
+    def __init__(self, size):
+        self.marks = np.zeros(size, dtype=np.uint32)
+        self.epoch = 0
+
+    def next_query(self):
+        self.epoch += 1
+        if self.epoch == np.iinfo(np.uint32).max:
+            self.marks[:] = 0
+            self.epoch = 1
+
+    def visit_new(self, positions):
+        """Mark positions visited and return those that were not, positions must not repeat."""
+        fresh = positions[self.marks[positions] != self.epoch]
+        self.marks[fresh] = self.epoch
+        return fresh
+
+
+class BoundedBeam:
+    """
+    The beam of a search: at most capacity candidates in arrays allocated once, sorted by distance, each flagged once
+    explored. cursor is the first unexplored candidate, only inserts in front of it move it back.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.distances = np.empty(capacity, dtype=np.float64)
+        self.positions = np.empty(capacity, dtype=np.int64)
+        self.explored = np.empty(capacity, dtype=bool)
+        self.size = 0
+        self.cursor = 0
+
+    def __len__(self):
+        return self.size
+
+    def fill(self, distances, positions):
+        """Reset the beam to the closest capacity of the given candidates."""
+        order = np.argsort(distances, kind="stable")[:self.capacity]
+        self.size = len(order)
+        self.distances[:self.size] = distances[order]
+        self.positions[:self.size] = positions[order]
+        self.explored[:self.size] = False
+        self.cursor = 0
+
+    def worst(self):
+        return self.distances[self.size - 1] if self.size == self.capacity else math.inf
+
+    def insert(self, distance, position):
+        """Insert a candidate unless the beam is full of closer ones, dropping the farthest when full."""
+        if distance >= self.worst():
+            return False
+        idx = int(np.searchsorted(self.distances[:self.size], distance, side="right"))
+        end = min(self.size, self.capacity - 1)
+        self.distances[idx + 1:end + 1] = self.distances[idx:end]
+        self.positions[idx + 1:end + 1] = self.positions[idx:end]
+        self.explored[idx + 1:end + 1] = self.explored[idx:end]
+        self.distances[idx], self.positions[idx], self.explored[idx] = distance, position, False
+        self.size = end + 1
+        self.cursor = min(self.cursor, idx)
+        return True
+
+    def pop(self):
+        """Flag the closest unexplored candidate explored and return its index, or None when all are explored."""
+        while self.cursor < self.size and self.explored[self.cursor]:
+            self.cursor += 1
+        if self.cursor == self.size:
+            return None
+        self.explored[self.cursor] = True
+        return self.cursor
+
+    def kth_distance(self, k):
+        return float(self.distances[k - 1]) if self.size >= k else None
+
+
+class CostModel:
+    """
+    Estimated cost, in seconds, of answering a filtered query over n qualifying vectors by scanning them all or by
+    searching the graph. A graph search is taken to visit about expansion * beam_width * log2(n + 1) vectors, and
+    every group it crosses into costs group_overhead on top. The defaults come from benchmarks/bench_planner.py, which
+    refits them on the machine at hand.
+    """
+
+    FIELDS = ("scan_fixed", "scan_per_vector", "graph_fixed", "visit_per_vector", "group_overhead", "expansion")
+
+    def __init__(self, scan_fixed=5e-6, scan_per_vector=1.5e-6, graph_fixed=4e-5, visit_per_vector=3.5e-6,
+                 group_overhead=5e-6, expansion=.4):
+        self.scan_fixed = scan_fixed
+        self.scan_per_vector = scan_per_vector
+        self.graph_fixed = graph_fixed
+        self.visit_per_vector = visit_per_vector
+        self.group_overhead = group_overhead
+        self.expansion = expansion
+
+    def scan_cost(self, n):
+        return self.scan_fixed + self.scan_per_vector * n if n != 0 else 0.
+
+    def graph_visits(self, n, beam_width):
+        return min(n, self.expansion * beam_width * math.log2(n + 1))
+
+    def graph_cost(self, n, groups, beam_width):
+        """The cost of a graph search over n vectors in the given number of groups."""
+        if n == 0:
+            return 0.
+        return (self.graph_fixed + self.group_overhead * groups +
+                self.visit_per_vector * self.graph_visits(n, beam_width))
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    @classmethod
+    def read(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+class QueryPlan:
+    """How one query is answered: the groups scanned outright, and whether the graph is searched from there."""
+
+    def __init__(self, strategy, scan_groups, costs):
+        self.strategy = strategy
+        self.scan_groups = list(scan_groups)
+        self.costs = costs
+
+    @property
+    def uses_graph(self):
+        return self.strategy != PLAN_SCAN
+
+
+class Adjacency:
+    """
+    Out-neighbour lists in compressed sparse row form: the neighbours of vector i are indices[indptr[i]:indptr[i + 1]],
+    without repeats, so a batch of fresh neighbours holds every vector once, and in the order first given.
+    """
+
+    def __init__(self, indptr, indices):
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        if len(indices) != 0:
+            _, first = np.unique(np.stack([rows, indices], axis=1), axis=0, return_index=True)
+            first.sort()
+            rows, indices = rows[first], indices[first]
+        self.indptr = np.zeros(len(indptr), dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(indptr) - 1), out=self.indptr[1:])
+        self.indices = indices
+
+    @classmethod
+    def from_lists(cls, neighbors):
+        indptr = np.zeros(len(neighbors) + 1, dtype=np.int64)
+        np.cumsum([len(n) for n in neighbors], out=indptr[1:])
+        return cls(indptr, np.fromiter((v for n in neighbors for v in n), dtype=np.int64, count=int(indptr[-1])))
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, position):
+        return self.indices[self.indptr[position]:self.indptr[position + 1]]
+
+
+class UNGIndex:
+    """
+    Vectors partitioned into label set groups, with one graph over all of them whose out-neighbour lists hold both
+    the edges inside a group and the cross-group edges to its minimum supersets. neighbors is an Adjacency, or one
+    list of neighbour positions per vector.
+
+    Vectors and groups are addressed by position internally, ids and group_ids are what searches report and traces
+    record. Distances are computed by a VectorStore with the given metric and storage, see distance_kernels.
+    Selectivities and the vector counts the planner weighs come from the LNGStatistics of the groups, over lng_edges
+    between group positions when given, the minimum supersets of every group otherwise.
+    """
+
+    def __init__(self, vectors, vector_groups: Sequence[int], label_sets: Sequence[Iterable], neighbors,
+                 group_entries: Sequence[Sequence[int]], ids=None, group_ids=None, metric=METRIC_L2,
+                 storage="float32", lng_edges: Iterable[Sequence[int]] = None):
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.store = VectorStore(self.vectors, metric=metric, storage=storage)
+        self.vector_groups = np.asarray(vector_groups, dtype=np.int64)
+        self.label_sets = [frozenset(labels) for labels in label_sets]
+        self.neighbors = neighbors if isinstance(neighbors, Adjacency) else Adjacency.from_lists(neighbors)
+        self.group_entries = [list(e) for e in group_entries]
+        self.ids = list(ids) if ids is not None else list(range(len(self.vectors)))
+        self.group_ids = list(group_ids) if group_ids is not None else list(range(len(self.label_sets)))
+        self.id_position = {vector_id: i for i, vector_id in enumerate(self.ids)}
+        # one stable sort rather than a pass over all vectors per group, members stay in increasing order
+        counts = np.bincount(self.vector_groups, minlength=len(self.label_sets))
+        self.group_members = np.split(np.argsort(self.vector_groups, kind="stable"), np.cumsum(counts)[:-1])
+        self.group_sizes = [len(members) for members in self.group_members]
+        self.cost_model = CostModel()
+        self._local = threading.local()  # a VisitedTable and beams by capacity, for each thread searching
+        self.group_position = {group_id: i for i, group_id in enumerate(self.group_ids)}
+        # inverted list, label -> groups whose label set holds it
+        self.label_groups: Dict[object, set] = {}
+        for group, labels in enumerate(self.label_sets):
+            for label in labels:
+                self.label_groups.setdefault(label, set()).add(group)
+        if lng_edges is None:
+            lng_edges = [(group, superset) for group in range(len(self.label_sets))
+                         for superset in self._minimum(self.superset_groups(self.label_sets[group]) - {group})]
+        self.statistics = LNGStatistics(dict(enumerate(self.label_sets)), dict(enumerate(self.group_sizes)),
+                                        [tuple(edge) for edge in lng_edges])
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def get_vectors(self, ids):
+        return self.vectors[[self.id_position[vector_id] for vector_id in ids]]
+
+    def superset_groups(self, query_labels) -> set:
+        """The groups whose label set holds every query label, so every vector in them passes the filter."""
+        query_labels = frozenset(query_labels)
+        if len(query_labels) == 0:
+            return set(range(len(self.label_sets)))
+        return set.intersection(*(self.label_groups.get(label, set()) for label in query_labels))
+
+    def selectivity(self, query_labels):
+        """The fraction of vectors passing the filter."""
+        return self.statistics.selectivity(query_labels)
+
+    def entry_sets(self, query_labels) -> List[int]:
+        """The minimum supersets of the query label set: supersets of it with no other superset of it inside them."""
+        return self._minimum(self.superset_groups(query_labels))
+
+    def _minimum(self, groups) -> List[int]:
+        """The groups of groups with no other of them inside their label set."""
+        candidates = sorted(groups, key=lambda g: len(self.label_sets[g]))
+        minimum = []
+        for group in candidates:
+            if not any(self.label_sets[m] < self.label_sets[group] for m in minimum):
+                minimum.append(group)
+        return minimum
+
+    def plan(self, query_labels, beam_width=32, strategy=PLAN_AUTO, cost_model: CostModel = None) -> QueryPlan:
+        """
+        Choose between scanning every qualifying group, searching the graph from the entry sets, or a hybrid that scans
+        the groups too small for a graph search to pay off and seeds the search with them. The qualifying groups are
+        the supersets of the query label set, which are exactly the groups reachable from the entry sets in the LNG.
+        A given strategy is kept, with the costs still estimated.
+        """
+        model = self.cost_model if cost_model is None else cost_model
+        n, num_groups = self.statistics.estimate(query_labels), self.statistics.groups(query_labels)
+        groups = sorted(self.superset_groups(query_labels))
+        small = [g for g in groups if model.scan_cost(self.group_sizes[g]) <= model.group_overhead +
+                 model.visit_per_vector * model.graph_visits(self.group_sizes[g], beam_width)]
+        costs = {PLAN_SCAN: model.scan_cost(n), PLAN_GRAPH: model.graph_cost(n, num_groups, beam_width)}
+        if 0 < len(small) < num_groups:
+            small_n = sum(self.group_sizes[g] for g in small)
+            costs[PLAN_HYBRID] = (model.scan_cost(small_n) +
+                                  model.graph_cost(n - small_n, num_groups - len(small), beam_width))
+        if strategy == PLAN_AUTO:
+            strategy = min(costs, key=costs.get)
+        scan_groups = {PLAN_SCAN: groups, PLAN_GRAPH: [], PLAN_HYBRID: small}[strategy]
+        return QueryPlan(strategy, scan_groups, costs)
+
+    def search(self, query, query_labels, k=10, beam_width=32, num_entries=None, trace: SearchTrace = None,
+               stats: SearchStats = None, seed=EXAMPLE_SEED, strategy=PLAN_GRAPH, cost_model: CostModel = None):
+        """
+        Greedy best first search from the entry vectors of the entry sets, keeping the beam_width closest candidates,
+        until every candidate in the beam is explored. Returns the ids and distances of the k closest. The
+        out-neighbours of an expanded vector are scored together, in one batch.
+
+        strategy picks how the qualifying vectors are reached, see plan. Scanned groups have all their vectors
+        compared with the query, and the closest of them seed the beam along with the entry vectors; a pure scan
+        stops there.
+        """
+        stats = SearchStats() if stats is None else stats
+        query = self.store.prepare(query)
+        plan = self.plan(query_labels, beam_width=beam_width, strategy=strategy, cost_model=cost_model)
+        entry_sets = self.entry_sets(query_labels) if plan.uses_graph else []
+        scanned = [int(p) for group in plan.scan_groups for p in self.group_members[group]]
+        entries = []
+        for group in entry_sets:
+            if group in plan.scan_groups:
+                continue
+            group_entries = self.group_entries[group]
+            if num_entries is not None and num_entries < len(group_entries):
+                rng = np.random.default_rng(seed)
+                group_entries = rng.choice(group_entries, size=num_entries, replace=False).tolist()
+            entries.extend(group_entries)
+        if trace is not None:
+            trace.record("query", labels=sorted(query_labels), k=k, beam_width=beam_width)
+            trace.record("plan", strategy=plan.strategy, scan_sets=[self.group_ids[g] for g in plan.scan_groups],
+                         costs=plan.costs)
+            trace.record("entry_sets", sets=[self.group_ids[g] for g in entry_sets])
+            if len(scanned) != 0:
+                trace.record("scan", vectors=[self.ids[p] for p in scanned])
+
+        visited, beam = self._search_state(beam_width)
+        visited.next_query()
+        # seeds are compared with the query in one batch, a scan of a whole group costs about one visit
+        seeds = visited.visit_new(np.fromiter(dict.fromkeys([*scanned, *entries]), dtype=np.int64))
+        stats.visit_many(self.vector_groups[seeds])
+        beam.fill(self.store.distances(query, seeds), seeds)
+        self._update_beam_stats(stats, beam, k)
+        if trace is not None:
+            trace.record("entry_vectors", vectors=self._beam_ids(beam), distances=beam.distances[:len(beam)].tolist())
+            trace.record("stats", **stats.as_dict())
+
+        while plan.uses_graph:
+            current = beam.pop()
+            if current is None:
+                break
+            distance, position = float(beam.distances[current]), int(beam.positions[current])
+            if trace is not None:
+                trace.record("pop", vector=self.ids[position], distance=distance)
+            fresh = visited.visit_new(self.neighbors[position])
+            groups = self.vector_groups[fresh]
+            stats.visit_many(groups)
+            stats.cross_group_hops += int(np.count_nonzero(groups != self.vector_groups[position]))
+            for neighbor, neighbor_distance in zip(fresh.tolist(), self.store.distances(query, fresh).tolist()):
+                if beam.insert(neighbor_distance, neighbor) and trace is not None:
+                    trace.record("push", vector=self.ids[neighbor], distance=neighbor_distance,
+                                 edge=[self.ids[position], self.ids[neighbor]])
+            self._update_beam_stats(stats, beam, k)
+            if trace is not None:
+                trace.record("beam", vectors=self._beam_ids(beam), distances=beam.distances[:len(beam)].tolist())
+                trace.record("stats", **stats.as_dict())
+
+        result = [self.ids[p] for p in beam.positions[:min(k, len(beam))].tolist()]
+        distances = beam.distances[:len(result)].tolist()
+        if trace is not None:
+            trace.record("result", vectors=result, distances=distances)
+        return result, distances
+
+    def search_batch(self, queries, query_labels, max_workers=1, **kwargs):
+        """Search many queries, in a pool of threads when max_workers > 1, each thread reusing its own state."""
+        if max_workers == 1:
+            return [self.search(query, labels, **kwargs) for query, labels in zip(queries, query_labels)]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(lambda args: self.search(*args, **kwargs), zip(queries, query_labels)))
+
+    def _search_state(self, beam_width):
+        local = self._local
+        if getattr(local, "visited", None) is None:
+            local.visited = VisitedTable(len(self.vectors))
+            local.beams = {}
+        beam = local.beams.get(beam_width)
+        if beam is None:
+            beam = local.beams[beam_width] = BoundedBeam(beam_width)
+        return local.visited, beam
+
+    def _beam_ids(self, beam):
+        return [self.ids[p] for p in beam.positions[:len(beam)].tolist()]
+
+    @staticmethod
+    def _update_beam_stats(stats, beam: BoundedBeam, k):
+        stats.beam_size = len(beam)
+        stats.kth_distance = beam.kth_distance(k)
+
+
+def example_index(seed=EXAMPLE_SEED, dim=2):
+    """
+    The deck's example as an index: the label sets, documents and edges of lng_data, with synthetic vectors drawn
+    around one centre per label set so distances are meaningful.
+    """
+    rng = np.random.default_rng(seed)
+    ids, vector_groups = [], []
+    for group, info in enumerate(LABEL_SETS_INFO):
+        ids.extend(info["documents"])
+        vector_groups.extend([group] * len(info["documents"]))
+    centres = rng.uniform(-1, 1, size=(len(LABEL_SETS_INFO), dim))
+    vectors = centres[vector_groups] + rng.normal(scale=.25, size=(len(ids), dim))
+    position = {doc_id: i for i, doc_id in enumerate(ids)}
+    neighbors = [[] for _ in ids]
+    for f, t in [*UNG_INNER_GRAPH_EDGE_INFOS, *UNG_CROSS_GROUP_EDGE_INFOS]:
+        neighbors[position[f]].append(position[t])
+    return UNGIndex(vectors, vector_groups, [info["labels"] for info in LABEL_SETS_INFO], neighbors,
+                    [[position[info["entry"]]] for info in LABEL_SETS_INFO],
+                    ids=ids, group_ids=list(range(1, len(LABEL_SETS_INFO) + 1)),
+                    lng_edges=[(f - 1, t - 1) for f, t in LNG_EDGE_INFOS])
+
+
+def example_query_vector(index: UNGIndex, label_set_id, seed=EXAMPLE_SEED):
+    """A synthetic query vector lying among the vectors of one label set."""
+    rng = np.random.default_rng(seed + 1)
+    members = index.vectors[index.vector_groups == index.group_position[label_set_id]]
+    return members.mean(axis=0) + rng.normal(scale=.1, size=index.vectors.shape[1])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record the trace of a filtered search over the example UNG.")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--labels", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--near", type=int, default=3, help="label set the query vector is drawn near")
+    parser.add_argument("-k", type=int, default=2)
+    parser.add_argument("--beam-width", type=int, default=4)
+    parser.add_argument("--strategy", default=PLAN_GRAPH, choices=[PLAN_AUTO, PLAN_SCAN, PLAN_GRAPH, PLAN_HYBRID])
+    parser.add_argument("--cost-model", default=None, help="cost model JSON written by benchmarks/bench_planner.py")
+    args = parser.parse_args()
+    example = example_index()
+    search_trace = SearchTrace()
+    example.search(example_query_vector(example, args.near), args.labels, k=args.k, beam_width=args.beam_width,
+                   trace=search_trace, strategy=args.strategy,
+                   cost_model=CostModel.read(args.cost_model) if args.cost_model is not None else None)
+    search_trace.write(args.output)
@@ -0,0 +1,188 @@
+# Synthetic labelled datasets and filtered query workloads, for stress testing LNG / UNG construction and search far
+# beyond the deck's example.
+import json
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+class WorkloadConfig:
+    """
+    How labels are drawn. Every vector has a value for each of num_attributes attributes, drawn from
+    values_per_attribute values with Zipf frequencies of exponent zipf. With probability correlation, an attribute
+    takes a value determined by the previous attribute's value instead, and with probability missing it is left out,
+    which is what gives label sets of different sizes and so the superset structure the LNG is built on.
+    """
+
+    def __init__(self, num_vectors=10000, dim=32, num_attributes=4, values_per_attribute=8, zipf=1.1, correlation=.3,
+                 missing=.2, label_spread=1., noise=.25, seed=0):
+        self.num_vectors = num_vectors
+        self.dim = dim
+        self.num_attributes = num_attributes
+        self.values_per_attribute = values_per_attribute
+        self.zipf = zipf
+        self.correlation = correlation
+        self.missing = missing
+        self.label_spread = label_spread
+        self.noise = noise
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    @property
+    def num_labels(self):
+        return self.num_attributes * self.values_per_attribute
+
+    def label_id(self, attribute, value):
+        """Labels are numbered from 1 like in lng_data, attribute by attribute."""
+        return attribute * self.values_per_attribute + value + 1
+
+
+def _zipf_probabilities(n, exponent):
+    weights = 1 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def _draw_labels(config: WorkloadConfig, rng, size):
+    """The value of every attribute of size vectors, and which of them are present."""
+    probabilities = _zipf_probabilities(config.values_per_attribute, config.zipf)
+    values = np.empty((size, config.num_attributes), dtype=np.int64)
+    for attribute in range(config.num_attributes):
+        values[:, attribute] = rng.choice(config.values_per_attribute, size=size, p=probabilities)
+        if attribute != 0:
+            # a fixed map ties each value of the previous attribute to one value of this one
+            follow = rng.random(size) < config.correlation
+            mapped = (values[:, attribute - 1] * 7 + attribute) % config.values_per_attribute
+            values[follow, attribute] = mapped[follow]
+    present = rng.random((size, config.num_attributes)) >= config.missing
+    return values, present
+
+
+def generate_dataset(path, config: WorkloadConfig, chunk_size=1 << 20):
+    """
+    Write a dataset in chunks, so 10^7 vectors never need to fit in memory:
+
+    - vectors.npy: float32 (n, dim), open it with np.load(mmap_mode="r")
+    - label_offsets.npy, label_ids.npy: the label ids of vector i are label_ids[label_offsets[i]:label_offsets[i + 1]]
+    - labels.json: label id -> [attribute, value]
+    - meta.json: the config the dataset was generated with
+
+    Vectors sum one random direction per label they carry, plus noise, so vectors sharing labels lie close together.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(config.seed)
+    label_embeddings = rng.normal(scale=config.label_spread, size=(config.num_labels + 1, config.dim))
+    vectors = np.lib.format.open_memmap(path / "vectors.npy", mode="w+", dtype=np.float32,
+                                        shape=(config.num_vectors, config.dim))
+    offsets = np.lib.format.open_memmap(path / "label_offsets.npy", mode="w+", dtype=np.int64,
+                                        shape=(config.num_vectors + 1,))
+    offsets[0] = 0
+    id_chunks: List[np.ndarray] = []
+    for start in range(0, config.num_vectors, chunk_size):
+        end = min(start + chunk_size, config.num_vectors)
+        values, present = _draw_labels(config, rng, end - start)
+        label_ids = np.arange(config.num_attributes) * config.values_per_attribute + values + 1
+        vectors[start:end] = ((label_embeddings[label_ids] * present[..., None]).sum(axis=1) +
+                              rng.normal(scale=config.noise, size=(end - start, config.dim)))
+        offsets[start + 1:end + 1] = offsets[start] + np.cumsum(present.sum(axis=1))
+        id_chunks.append(label_ids[present].astype(np.int32))  # row major, so each vector's labels stay together
+    np.save(path / "label_ids.npy", np.concatenate(id_chunks) if len(id_chunks) != 0 else np.empty(0, np.int32))
+    vectors.flush()
+    offsets.flush()
+    labels = {config.label_id(a, v): [f"attribute_{a}", f"value_{v}"]
+              for a in range(config.num_attributes) for v in range(config.values_per_attribute)}
+    (path / "labels.json").write_text(json.dumps(labels), encoding="utf-8")
+    (path / "meta.json").write_text(json.dumps(config.as_dict(), indent=2), encoding="utf-8")
+    return Dataset(path)
+
+
+class Dataset:
+    """A dataset written by generate_dataset, memory mapped, so opening one costs nothing whatever its size."""
+
+    def __init__(self, path, mmap=True):
+        self.path = Path(path)
+        mmap_mode = "r" if mmap else None
+        self.vectors = np.load(self.path / "vectors.npy", mmap_mode=mmap_mode)
+        self.label_offsets = np.load(self.path / "label_offsets.npy", mmap_mode=mmap_mode)
+        self.label_ids = np.load(self.path / "label_ids.npy", mmap_mode=mmap_mode)
+        labels = json.loads((self.path / "labels.json").read_text(encoding="utf-8"))
+        self.labels: Dict[int, List[str]] = {int(label_id): label for label_id, label in labels.items()}
+        self.config = WorkloadConfig(**json.loads((self.path / "meta.json").read_text(encoding="utf-8")))
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def get_labels(self, i) -> List[int]:
+        return self.label_ids[self.label_offsets[i]:self.label_offsets[i + 1]].tolist()
+
+    def label_set_groups(self) -> Dict[tuple, np.ndarray]:
+        """The vectors of every distinct label set, the groups a UNG is built over."""
+        if self.config.num_labels > 63:
+            groups: Dict[tuple, List[int]] = {}
+            for i in range(len(self)):
+                groups.setdefault(tuple(sorted(self.get_labels(i))), []).append(i)
+            return {labels: np.array(members) for labels, members in groups.items()}
+        # a label set fits in one 64 bit mask, so vectors are grouped with one reduce and one sort
+        bits = np.left_shift(np.uint64(1), np.asarray(self.label_ids, dtype=np.uint64) - np.uint64(1))
+        counts = np.diff(self.label_offsets)
+        masks = np.zeros(len(self), dtype=np.uint64)
+        labelled = counts != 0
+        if len(bits) != 0:
+            masks[labelled] = np.bitwise_or.reduceat(bits, self.label_offsets[:-1][labelled])
+        order = np.argsort(masks, kind="stable")
+        keys, starts = np.unique(masks[order], return_index=True)
+        return {tuple(label for label in range(1, self.config.num_labels + 1) if int(key) >> (label - 1) & 1): members
+                for key, members in zip(keys, np.split(order, starts[1:]))}
+
+
+def generate_queries(dataset: Dataset, num_queries, keep=.5, noise=.1, seed=0) -> List[Dict]:
+    """
+    Queries drawn from the data, so their filters follow the same skew: each takes a random vector, perturbs it, and
+    keeps every one of its labels with probability keep, at least one, so the filter always matches something.
+    """
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i in rng.integers(len(dataset), size=num_queries):
+        labels = dataset.get_labels(i)
+        kept = [label for label in labels if rng.random() < keep]
+        if len(kept) == 0 and len(labels) != 0:
+            kept = [labels[rng.integers(len(labels))]]
+        vector = dataset.vectors[i] + rng.normal(scale=noise, size=dataset.vectors.shape[1])
+        queries.append({"vector": vector.astype(float).tolist(), "labels": sorted(kept)})
+    return queries
+
+
+def write_queries(path, queries: Sequence[Dict]):
+    """One {"vector": [...], "labels": [...]} object per line, the format gallery.load_workload reads."""
+    with open(path, "w", encoding="utf-8") as f:
+        for query in queries:
+            f.write(json.dumps(query))
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic labelled dataset and a query workload.")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--vectors", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=32)
+    parser.add_argument("--attributes", type=int, default=4)
+    parser.add_argument("--values", type=int, default=8, help="values per attribute")
+    parser.add_argument("--zipf", type=float, default=1.1, help="exponent of the value frequencies")
+    parser.add_argument("--correlation", type=float, default=.3)
+    parser.add_argument("--missing", type=float, default=.2, help="probability an attribute is left out")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--keep", type=float, default=.5, help="probability a query keeps each label of its vector")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    dataset = generate_dataset(args.output, WorkloadConfig(
+        num_vectors=args.vectors, dim=args.dim, num_attributes=args.attributes, values_per_attribute=args.values,
+        zipf=args.zipf, correlation=args.correlation, missing=args.missing, seed=args.seed))
+    write_queries(args.output / "queries.jsonl", generate_queries(dataset, args.queries, keep=args.keep,
+                                                                  seed=args.seed))
+    print(f"{len(dataset)} vectors, {len(dataset.label_set_groups())} label sets, {args.queries} queries "
+          f"in {args.output}")